@@ -1,5 +1,6 @@
 from flask import Flask
-from app.controllers.pergunta_controller import pergunta_bp
+from app.controllers.pergunta_controller import pergunta_bp, iniciar_chatbot
+from app.controllers.metricas_controller import metricas_bp
 from app.controllers.views import views_bp
 
 def create_app():
@@ -8,4 +9,8 @@ def create_app():
     
     app.register_blueprint(pergunta_bp)
     app.register_blueprint(views_bp)
+    app.register_blueprint(metricas_bp)
+
+    # Não bloqueia o boot: por padrão o chatbot carrega em segundo plano
+    iniciar_chatbot()
     return app
\ No newline at end of file
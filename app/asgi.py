@@ -0,0 +1,219 @@
+import asyncio
+import functools
+import json
+import time
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app.controllers import pergunta_controller
+from app.controllers.pergunta_controller import (
+    cabecalho_espera, evento_sse, linha_ndjson, parametros_lote, resposta_recusada, validar_lote, validar_pergunta,
+)
+from app.services import metrics
+from app.services.admission import Rejected, client_address
+
+
+class PerguntaASGI:
+    """Aplicação ASGI: atende /pergunta/ de forma assíncrona e repassa o resto ao Flask.
+
+    As chamadas ao LLM usam ``achat``/``achat_stream`` (``ainvoke``/``astream``
+    da chain), então um único processo segura centenas de perguntas em
+    andamento compartilhando o mesmo modelo de embeddings e índice FAISS.
+    """
+
+    ROTAS = {
+        "/pergunta/": "_perguntar",
+        "/pergunta/stream": "_perguntar_stream",
+        "/pergunta/batch": "_perguntar_lote",
+    }
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+
+        rota = self.ROTAS.get(scope.get("path"))
+        if scope["type"] == "http" and scope["method"] == "POST" and rota:
+            await self._medir(functools.partial(self._admitir, getattr(self, rota)), scope, receive, send)
+            return
+
+        await self.wsgi(scope, receive, send)
+
+    async def _medir(self, rota, scope, receive, send):
+        """Roda a rota e observa a duração até o último byte, com o status enviado."""
+        if not metrics.enabled():
+            await rota(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        status = "500"
+
+        async def enviar(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await rota(scope, receive, enviar)
+        finally:
+            metrics.HTTP.observe(time.perf_counter() - inicio, rota=scope["path"], status=status)
+
+    async def _admitir(self, rota, scope, receive, send):
+        """Lê o corpo, passa pela admissão (limite por cliente e fila) antes da rota e devolve as vagas no fim.
+
+        O corpo é lido antes porque o custo de um lote depende de quantas perguntas ele tem.
+        """
+        data = await self._ler_json(receive)
+        cabecalhos = dict(scope.get("headers") or [])
+        encaminhado = cabecalhos.get(b"x-forwarded-for", b"").decode("latin-1") or None
+        cliente = client_address((scope.get("client") or (None,))[0], encaminhado)
+        custo, vagas = pergunta_controller.custo_admissao(scope["path"], data)
+        try:
+            espera = await pergunta_controller.aadmitir(cliente, scope["path"], custo, vagas)
+        except Rejected as erro:
+            corpo, status, headers = resposta_recusada(erro)
+            await self._responder_json(
+                send, corpo, status, [(nome.lower().encode(), valor.encode()) for nome, valor in headers.items()]
+            )
+            return
+
+        async def enviar(message):
+            if message["type"] == "http.response.start":
+                espera_ms = (b"x-queue-wait-ms", cabecalho_espera(espera).encode())
+                message = {**message, "headers": [*message.get("headers", []), espera_ms]}
+            await send(message)
+
+        try:
+            await rota(scope, data, enviar)
+        finally:
+            pergunta_controller.liberar(vagas)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _ler_json(self, receive):
+        corpo = b""
+        while True:
+            message = await receive()
+            corpo += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        try:
+            return json.loads(corpo or b"null")
+        except ValueError:
+            return None
+
+    async def _responder_json(self, send, dados: dict, status: int = 200, headers=None):
+        corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(corpo)).encode()),
+                *(headers or []),
+            ],
+        })
+        await send({"type": "http.response.body", "body": corpo})
+
+    async def _chatbot(self, send):
+        """Chatbot pronto para uso; se ainda estiver carregando, responde 503 e retorna None."""
+        bot = pergunta_controller.chatbot
+        if bot is None and pergunta_controller.modo_inicializacao() == "lazy":
+            bot = await asyncio.to_thread(pergunta_controller.obter_chatbot)
+        if bot is None:
+            await self._responder_json(
+                send, pergunta_controller.resposta_indisponivel(), 503, [(b"retry-after", b"5")]
+            )
+        return bot
+
+    async def _perguntar(self, scope, data, send):
+        erro = validar_pergunta(data)
+        if erro:
+            await self._responder_json(send, {"erro": erro}, 400)
+            return
+
+        bot = await self._chatbot(send)
+        if bot is None:
+            return
+
+        resposta = await bot.achat(data["pergunta"])
+        await self._responder_json(send, {"resposta": resposta})
+
+    async def _perguntar_stream(self, scope, data, send):
+        erro = validar_pergunta(data)
+        if erro:
+            await self._responder_json(send, {"erro": erro}, 400)
+            return
+
+        bot = await self._chatbot(send)
+        if bot is None:
+            return
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream; charset=utf-8"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+            ],
+        })
+
+        async def enviar(texto: str):
+            await send({"type": "http.response.body", "body": texto.encode("utf-8"), "more_body": True})
+
+        try:
+            async for token in bot.achat_stream(data["pergunta"]):
+                await enviar(evento_sse({"token": token}))
+        except Exception:
+            await enviar(evento_sse({"erro": "Desculpe, a resposta foi interrompida. Por favor, tente novamente."}, "erro"))
+        await enviar(evento_sse({}, "fim"))
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _perguntar_lote(self, scope, data, send):
+        erro = validar_lote(data)
+        if erro:
+            await self._responder_json(send, {"erro": erro}, 400)
+            return
+
+        bot = await self._chatbot(send)
+        if bot is None:
+            return
+
+        perguntas, parametros = data["perguntas"], parametros_lote(data)
+        if not data.get("stream"):
+            await self._responder_json(send, {"respostas": await bot.achat_batch(perguntas, **parametros)})
+            return
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"application/x-ndjson; charset=utf-8"),
+                (b"x-accel-buffering", b"no"),
+            ],
+        })
+        async for posicao, resposta in bot.achat_batch_stream(perguntas, **parametros):
+            linha = linha_ndjson(posicao, resposta).encode("utf-8")
+            await send({"type": "http.response.body", "body": linha, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def create_asgi_app(flask_app=None):
+    """Cria a aplicação ASGI em volta da aplicação Flask."""
+    if flask_app is None:
+        from app import create_app
+        flask_app = create_app()
+    return PerguntaASGI(flask_app)
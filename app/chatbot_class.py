@@ -4,36 +4,68 @@ from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain.prompts import ChatPromptTemplate
-from langchain.schema import StrOutputParser
-from langchain.schema.runnable import RunnablePassthrough
+from langchain.schema.runnable import RunnableLambda, RunnablePassthrough
 from langchain_community.vectorstores import FAISS
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 import traceback
-from typing import List, Optional
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
 import hashlib
 import json
+import uuid
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
+import atexit
+import asyncio
+import threading
+import httpx
 
-from app.controllers.func_scraping.func_scraping_main import func_scraping_main
+from app.controllers.func_scraping.func_scraping_async import executar_sincrono, raspar_fontes
+from app.controllers.func_scraping.func_scraping_descoberta import DescobridorNoticias
+from app.controllers.func_scraping.func_scraping_fontes import ARQUIVOS_LOCAIS, listar_fontes, listar_paginas
+from app.services.answer_cache import AnswerCache, normalizar_pergunta
+from app.services.bm25 import BM25_FILE, BM25Index
+from app.services.context_builder import build_context
+from app.services.dedup import document_vectors, near_duplicates
+from app.services.embedding_service import BatchingEmbeddings, create_base_embeddings
+from app.services.embedding_store import ChunkEmbeddingStore, chunk_hash
+from app.services.hybrid_retriever import HybridRetriever, score_gate_config
+from app.services.index_versions import IndexVersions
+from app.services import metrics
+from app.services.llm_router import CircuitBreaker, LLMRouter, Provider, rate_limit_delay
+from app.services.single_flight import SingleFlight
+from app.services.vector_index import (
+    create_vectorstore, index_config, load_vectorstore, save_vectorstore, supports_remove,
+)
 
 
 load_dotenv()
 
+RESPOSTA_NAO_ENCONTRADA = "Não encontrei essa informação."
+
 class JovemProgramadorChatbot:
     def __init__(self):
         """Inicializa o chatbot com configurações otimizadas."""
+        self.cache_dir = Path("data/cache")
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.answer_cache = None
+        self.single_flight = SingleFlight()
+        self.index_versions = IndexVersions()
+        self.index_path = None
+        self.index_swaps = 0
+        self._index_lock = threading.Lock()
+        self._noticias_raspadas = {}  # notícias que a descoberta já baixou: path -> ResultadoRaspagem
         self._initialize_models()
         self.vectorstore = self._load_or_create_vectorstore()
         self.chain = self._setup_chain()
-        self.cache_dir = Path("data/cache")
-        self.cache_dir.mkdir(exist_ok=True)
+        self.answer_cache = self._setup_answer_cache()
+
+        self.start_index_refresh()
+        if hasattr(os, "register_at_fork"):
+            # Threads não sobrevivem ao fork (GUNICORN_PRELOAD=1): cada worker inicia a sua
+            os.register_at_fork(after_in_child=self.start_index_refresh)
 
     def _initialize_models(self):
         """Configura os modelos LLM e embeddings."""
@@ -52,43 +84,334 @@ class JovemProgramadorChatbot:
             max_output_tokens=2048
         )
         
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="intfloat/e5-small",#sentence-transformers/all-MiniLM-L6-v2
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
+        self.embeddings = BatchingEmbeddings(
+            create_base_embeddings(),
+            max_batch=int(os.getenv("EMBEDDING_QUERY_BATCH", "32")),
+            wait_ms=float(os.getenv("EMBEDDING_QUERY_WAIT_MS", "2")),
+            cache_size=int(os.getenv("EMBEDDING_QUERY_CACHE", "1024")),
         )
 
     def _load_or_create_vectorstore(self) -> FAISS:
-        """Carrega ou cria o índice vetorial."""
-        index_path = Path("data/faiss_index")
-        cache_file = Path("data/vectorstore_cache.json")
-        
-        if self._check_vectorstore_cache(index_path, cache_file):
-            print("🔄 Carregando índice FAISS do cache...")
-            return FAISS.load_local(str(index_path), self.embeddings, allow_dangerous_deserialization=True)
+        """Carrega o índice publicado, atualizando-o antes (numa versão nova) se as fontes mudaram."""
+        # Com vários workers subindo juntos, só um raspa e indexa; os outros esperam e carregam
+        with self.index_versions.lock(esperar=True):
+            self.index_path, config_indice, alterado = self._update_index()
 
-        print("🔁 Criando novo índice FAISS...")
-        
-        # 1. Carrega todos os documentos (scraping + extras)
-        documentos = self._load_documents_parallel()
-        documentos.extend(self._carregar_extras_txt("data/extras.txt"))  # Adiciona ANTES da deduplicação
-        
-        # 2. Aplica filtros
-        documentos_filtrados = self._deduplicate_documents(documentos)
-        
-        # 3. Divide em chunks
-        splits = self._split_documents(documentos_filtrados)
-        
-        # 4. Cria e salva o índice
-        vectorstore = FAISS.from_documents(splits, self.embeddings)
-        vectorstore.save_local(str(index_path))
-        self._update_vectorstore_cache(index_path, cache_file)
-        
-        # Verificação adicional
-        self._verify_extras_in_index(vectorstore)
-        
+        with metrics.INDEXACAO.time(etapa="carregar"):
+            vectorstore = load_vectorstore(self.index_path, self.embeddings, config=config_indice)
+        if alterado:
+            self._verify_extras_in_index(vectorstore)
         return vectorstore
 
+    def _update_index(self) -> tuple:
+        """Sincroniza o índice publicado com as fontes; mudanças viram uma versão nova, publicada no fim.
+
+        Retorna (pasta do índice em uso, tipo/parâmetros do índice, se mudou).
+        Chame com o lock de ``self.index_versions``.
+        """
+        origem = self.index_versions.current()
+        destino = self.index_versions.new_version()
+        config_indice = self._sync_index(origem, destino)
+        if config_indice is None:
+            return origem, self._read_manifest(self.index_versions.manifest_file(origem))[1], False
+
+        self.index_versions.publish(destino)
+        print(f"📦 Nova versão do índice publicada: {destino.name}")
+        return destino, config_indice, True
+
+    def _sync_index(self, origem: Path, destino: Path) -> Optional[dict]:
+        """Compara o índice de ``origem`` com as fontes e grava o índice atualizado em ``destino``.
+
+        ``origem`` nunca é alterado (outros workers podem estar lendo), a não
+        ser pelos validadores HTTP do manifesto. Retorna o tipo/parâmetros do
+        índice gravado, ou None se ``origem`` continua em dia ou deve ser
+        mantido (recriação com fontes que falharam).
+        """
+        cache_file = self.index_versions.manifest_file(origem)
+
+        with metrics.INDEXACAO.time(etapa="descoberta"):
+            self._discover_news()
+        manifest, config_indice = self._read_manifest(cache_file)
+        chunk_store = ChunkEmbeddingStore(origem / "chunk_vectors.npz")
+        vectorstore = None
+
+        config_desejado = index_config()
+        # "pedido": tipo configurado quando o índice teve de ser criado como outro (ex.: IVF-PQ com poucos vetores)
+        tipo_atual = config_indice.get("pedido", config_indice.get("tipo"))
+        if manifest and tipo_atual != config_desejado["tipo"]:
+            print(f"🔁 Tipo do índice mudou ({tipo_atual} -> {config_desejado['tipo']}).")
+        elif manifest and (origem / "index.faiss").exists():
+            # 1. Verifica (GET condicional) quais fontes mudaram desde a indexação
+            with metrics.INDEXACAO.time(etapa="verificacao"):
+                obsoletas = self._check_vectorstore_cache(manifest)
+            if not obsoletas:
+                print("🔄 Índice FAISS em dia; usando o do cache...")
+                self._update_vectorstore_cache(cache_file, manifest, config_indice)  # validadores renovados
+                return None
+
+            # 2. Atualiza só as fontes que mudaram
+            print(f"🔁 Atualizando índice FAISS incrementalmente ({len(obsoletas)} fontes mudaram)...")
+            try:
+                with metrics.INDEXACAO.time(etapa="raspagem"):
+                    documentos, fontes = self._load_sources(obsoletas & set(listar_fontes()))
+                vectorstore = load_vectorstore(origem, self.embeddings, use_mmap=False, config=config_indice)
+                if not supports_remove(vectorstore.index):
+                    raise ValueError(f"índice {config_indice['tipo']} não remove vetores")
+                with metrics.INDEXACAO.time(etapa="dedup"):
+                    documentos = self._deduplicate_documents(documentos)
+                manifest, alterado = self._update_index_incremental(
+                    vectorstore, documentos, fontes, obsoletas, manifest, chunk_store
+                )
+                if not alterado:
+                    print("✅ Conteúdo das fontes não mudou; índice mantido.")
+                    self._update_vectorstore_cache(cache_file, manifest, config_indice)
+                    return None
+            except Exception as e:
+                print(f"[⚠️] Atualização incremental falhou ({str(e)}); recriando o índice.")
+                vectorstore = None
+
+        if vectorstore is None:
+            print("🔁 Criando novo índice FAISS...")
+
+            # 1. Carrega todos os documentos (scraping + extras)
+            registro = listar_fontes()
+            with metrics.INDEXACAO.time(etapa="raspagem"):
+                documentos, fontes = self._load_sources(registro)
+
+            # Recriar sem as fontes que falharam tiraria essas páginas do índice
+            # (site fora do ar viraria um índice só com o extras.txt): com um
+            # índice em uso, ele fica até a próxima atualização conseguir tudo
+            falharam = [f for f in registro if f not in fontes]
+            if falharam and (origem / "index.faiss").exists():
+                print(f"[⚠️] {len(falharam)} de {len(registro)} fontes não foram carregadas "
+                      f"({', '.join(falharam[:5])}); índice atual mantido.")
+                return None
+
+            # 2. Aplica filtros
+            with metrics.INDEXACAO.time(etapa="dedup"):
+                documentos_filtrados = self._deduplicate_documents(documentos)
+
+            # 3. Divide em chunks e cria o índice
+            vectorstore, manifest, config_indice = self._build_index(
+                documentos_filtrados, fontes, chunk_store, config_desejado
+            )
+
+        # 4. Salva o índice, os embeddings dos chunks e o manifesto na versão nova
+        with metrics.INDEXACAO.time(etapa="salvar"):
+            save_vectorstore(vectorstore, destino)
+            chunk_store.path = destino / "chunk_vectors.npz"
+            chunk_store.prune(h for fonte in manifest.values() for h in fonte.get("chunks", []))
+            chunk_store.save()
+            self._update_vectorstore_cache(self.index_versions.manifest_file(destino), manifest, config_indice)
+        return config_indice
+
+    def refresh_index(self) -> bool:
+        """Atualiza o índice com o chatbot rodando e troca o vectorstore em uso se algo mudou.
+
+        Só um processo atualiza por vez (lock em data/faiss_versions); se
+        outro já está atualizando, retorna sem fazer nada e a versão nova
+        chega por ``_watch_index``. Retorna se o índice em uso foi trocado.
+        """
+        with self.index_versions.lock() as obtido:
+            if not obtido:
+                print("⏭️ Atualização do índice já em andamento em outro processo.")
+                return False
+            index_path, _, _ = self._update_index()
+            self.index_versions.collect_garbage(float(os.getenv("INDEX_GC_GRACE_S", "600")))
+
+        if index_path == self.index_path:
+            return False
+        self._swap_index(index_path)
+        return True
+
+    def _swap_index(self, index_path: Path):
+        """Troca o índice em uso pelo de ``index_path`` sem parar de atender (hot-swap).
+
+        Perguntas em andamento terminam com a chain antiga, que continua
+        válida: os arquivos de uma versão só são apagados depois da carência.
+        """
+        with self._index_lock:
+            if index_path == self.index_path:
+                return
+            _, config_indice = self._read_manifest(self.index_versions.manifest_file(index_path))
+            with metrics.INDEXACAO.time(etapa="carregar"):
+                vectorstore = load_vectorstore(index_path, self.embeddings, config=config_indice)
+            retriever = self._create_retriever(vectorstore, index_path)
+            chain = self._build_chain(retriever)
+
+            self.vectorstore, self.retriever, self.index_path = vectorstore, retriever, index_path
+            self.chain = chain
+            self.index_swaps += 1
+            # Respostas antigas foram geradas com outro índice
+            self.answer_cache.invalidate(self._index_fingerprint())
+        print(f"🔀 Índice trocado para a versão {index_path.name} ({vectorstore.index.ntotal} chunks).")
+
+    def start_index_refresh(self):
+        """Thread que acompanha o índice publicado (INDEX_WATCH_INTERVAL_S) e, com
+        INDEX_REFRESH_INTERVAL_S, atualiza o índice periodicamente em segundo plano."""
+        if self.index_path is None:  # índice que não veio de data/ (ex.: benchmarks)
+            return
+        verificar = float(os.getenv("INDEX_WATCH_INTERVAL_S", "30"))
+        atualizar = float(os.getenv("INDEX_REFRESH_INTERVAL_S", "0"))
+        if verificar <= 0 and atualizar <= 0:
+            return
+        threading.Thread(target=self._watch_index, args=(verificar, atualizar), daemon=True,
+                         name="index-refresh").start()
+
+    def _watch_index(self, verificar: float, atualizar: float):
+        proxima_atualizacao = time.monotonic() + atualizar if atualizar > 0 else None
+        while True:
+            espera = verificar if verificar > 0 else atualizar
+            if proxima_atualizacao is not None:
+                espera = min(espera, max(0.0, proxima_atualizacao - time.monotonic()))
+            time.sleep(espera)
+            try:
+                if proxima_atualizacao is not None and time.monotonic() >= proxima_atualizacao:
+                    proxima_atualizacao = time.monotonic() + atualizar
+                    self.refresh_index()
+                elif verificar > 0:
+                    atual = self.index_versions.current()
+                    if atual != self.index_path and (atual / "index.faiss").exists():
+                        # Outro worker (ou o cron) publicou uma versão nova
+                        self._swap_index(atual)
+            except Exception as e:
+                print(f"[⚠️] Atualização do índice falhou: {str(e)}")
+                traceback.print_exc()
+
+    def _content_hash(self, docs: List[Document]) -> str:
+        """Hash do conteúdo de uma fonte (todos os seus documentos)."""
+        return hashlib.sha1("\n\n".join(d.page_content for d in docs).encode("utf-8")).hexdigest()
+
+    def _group_by_source(self, documentos: List[Document]) -> dict:
+        """Agrupa os documentos por fonte."""
+        grupos = {}
+        for doc in documentos:
+            grupos.setdefault(doc.metadata.get("source", ""), []).append(doc)
+        return grupos
+
+    def _embed_sources(self, grupos: dict, chunk_store: ChunkEmbeddingStore, existentes=None) -> dict:
+        """Divide e vetoriza as fontes de uma vez e descarta quase-duplicatas.
+
+        Os embeddings dos chunks são calculados uma única vez (ou reaproveitados)
+        e servem tanto para a deduplicação quanto para o índice:
+        1. documentos (vetor = soma dos seus chunks sem a direção média do
+           corpus), se houver mais de DEDUP_MIN_DOCS, com cosseno >=
+           DEDUP_DOC_THRESHOLD;
+        2. chunks, entre si e contra o índice ``existentes``, com cosseno >=
+           DEDUP_CHUNK_THRESHOLD.
+
+        Retorna {fonte: (chunks, vetores, ids, entrada do manifesto)}.
+        """
+        docs, chunks, origem = [], [], []
+        for fonte, docs_fonte in grupos.items():
+            for doc in docs_fonte:
+                for chunk in self._split_documents([doc]):
+                    chunks.append(chunk)
+                    origem.append(len(docs))
+                docs.append((fonte, doc))
+
+        vetores = chunk_store.embed_array([c.page_content for c in chunks], self.embeddings)
+        origem = np.asarray(origem, dtype=np.int64)
+        manter = np.ones(len(chunks), dtype=bool)
+
+        if chunks and len(docs) > int(os.getenv("DEDUP_MIN_DOCS", "50")):
+            vetores_docs = document_vectors(vetores, origem, len(docs))
+            docs_mantidos = near_duplicates(vetores_docs, float(os.getenv("DEDUP_DOC_THRESHOLD", "0.9")))
+            manter &= docs_mantidos[origem]
+
+        if manter.any():
+            restantes = np.flatnonzero(manter)
+            manter[restantes] = near_duplicates(
+                vetores[restantes], float(os.getenv("DEDUP_CHUNK_THRESHOLD", "0.97")), existentes=existentes
+            )
+        if chunks:
+            print(f"🧹 Quase-duplicatas descartadas: {len(chunks) - int(manter.sum())} de {len(chunks)} chunks.")
+
+        # Todos os hashes ficam no manifesto, para o embedding dos descartados
+        # continuar guardado e a próxima deduplicação não recalcular nada
+        por_fonte = {fonte: ([], [], [], []) for fonte in grupos}
+        for chunk, vetor, doc_idx, ok in zip(chunks, vetores, origem, manter):
+            chunks_fonte, vetores_fonte, ids, hashes = por_fonte[docs[doc_idx][0]]
+            hashes.append(chunk_hash(chunk.page_content))
+            if ok:
+                chunks_fonte.append(chunk)
+                vetores_fonte.append(vetor)
+                ids.append(str(uuid.uuid4()))
+
+        return {
+            fonte: (chunks_fonte, vetores_fonte, ids,
+                    {"hash": self._content_hash(grupos[fonte]), "ids": ids, "chunks": hashes})
+            for fonte, (chunks_fonte, vetores_fonte, ids, hashes) in por_fonte.items()
+        }
+
+    def _build_index(self, documentos: List[Document], fontes: dict, chunk_store: ChunkEmbeddingStore,
+                     config: dict = None):
+        """Cria o índice do zero, reaproveitando embeddings de chunks já conhecidos.
+
+        Retorna o vectorstore, o manifesto {fonte: validadores + hash + ids dos
+        chunks} e o tipo/parâmetros do índice FAISS criado.
+        """
+        textos, vetores, metadados, ids = [], [], [], []
+        manifest = {}
+
+        grupos = self._group_by_source(documentos)
+        # Fontes lidas mas sem conteúdo também entram, para não parecerem novas
+        grupos.update({fonte: [] for fonte in fontes if fonte not in grupos})
+        with metrics.INDEXACAO.time(etapa="embeddings"):
+            por_fonte = self._embed_sources(grupos, chunk_store)
+        for fonte, (chunks, vetores_fonte, ids_fonte, entrada) in por_fonte.items():
+            manifest[fonte] = {**fontes.get(fonte, {}), **entrada}
+            textos.extend(c.page_content for c in chunks)
+            metadados.extend(c.metadata for c in chunks)
+            vetores.extend(vetores_fonte)
+            ids.extend(ids_fonte)
+
+        with metrics.INDEXACAO.time(etapa="indice"):
+            vectorstore, config = create_vectorstore(textos, vetores, self.embeddings, metadados, ids, config)
+        print(f"📐 Índice FAISS: {config['tipo']} com {len(ids)} chunks.")
+        return vectorstore, manifest, config
+
+    def _update_index_incremental(self, vectorstore: FAISS, documentos: List[Document], fontes: dict,
+                                  obsoletas: set, manifest: dict, chunk_store: ChunkEmbeddingStore) -> tuple:
+        """Reindexa só as fontes cujo conteúdo mudou.
+
+        Fontes retiradas do registro saem do índice; as que falharam ao baixar
+        ficam como estavam. Retorna (novo manifesto, se o índice mudou).
+        """
+        grupos = self._group_by_source(documentos)
+        atualizar = obsoletas & set(fontes)
+        mudaram = {f for f in atualizar if self._content_hash(grupos.get(f, [])) != manifest.get(f, {}).get("hash")}
+        remover = (obsoletas - set(listar_fontes())) & set(manifest)
+
+        novo_manifest = {f: dict(e) for f, e in manifest.items() if f not in remover}
+        for fonte in atualizar - mudaram:
+            novo_manifest[fonte].update(fontes[fonte])  # só renova os validadores
+
+        if not mudaram and not remover:
+            return novo_manifest, False
+
+        ids_remover = [doc_id for fonte in mudaram | remover for doc_id in manifest.get(fonte, {}).get("ids", [])]
+        if ids_remover:
+            vectorstore.delete(ids_remover)
+
+        # Ordem do registro, para a deduplicação manter sempre os mesmos chunks
+        reindexar = {fonte: grupos.get(fonte, []) for fonte in listar_fontes() if fonte in mudaram}
+        with metrics.INDEXACAO.time(etapa="embeddings"):
+            novos = self._embed_sources(reindexar, chunk_store, existentes=vectorstore.index)
+        for fonte, (chunks, vetores, ids, entrada) in novos.items():
+            if chunks:
+                with metrics.INDEXACAO.time(etapa="indice"):
+                    vectorstore.add_embeddings(
+                        list(zip([c.page_content for c in chunks], vetores)),
+                        metadatas=[c.metadata for c in chunks],
+                        ids=ids,
+                    )
+            novo_manifest[fonte] = {**fontes[fonte], **entrada}
+
+        print(f"🔁 Fontes reindexadas: {len(mudaram)}, removidas: {len(remover)}, "
+              f"com falha (mantidas): {len(obsoletas - set(fontes) - remover)}")
+        return novo_manifest, True
+
     def _verify_extras_in_index(self, vectorstore):
         """Verifica se o extras.txt foi corretamente indexado"""
         print("\n🔍 Verificando inclusão do extras.txt no índice...")
@@ -116,55 +439,107 @@ class JovemProgramadorChatbot:
                 for doc in docs:
                     print(f"Documento de {doc.metadata.get('source')}: {doc.page_content[:200]}...")
 
-    def _load_documents_parallel(self) -> List[Document]:
-        """Carrega documentos em paralelo."""
-        paths = [
-            "sobre.php", "duvidas.php", "patrocinadores.php", "parceiros.php", 
-            "apoiadores.php", "index.php", "hackathon/", "lgpd.php", 
-            "privacidade.php", "n.php?ID=136", "n.php?ID=135", "n.php?ID=134",
-            "n.php?ID=133", "n.php?ID=132", "n.php?ID=131", "n.php?ID=129", 
-            "n.php?ID=128"
-        ]
+    def _index_fingerprint(self) -> str:
+        """Identifica a versão do índice em uso (pasta, tamanho e mtime do arquivo FAISS)."""
+        if self.index_path is None:
+            return ""
+        index_file = self.index_path / "index.faiss"
+        if not index_file.exists():
+            return ""
+        stat = index_file.stat()
+        return f"{self.index_path.name}-{stat.st_size}-{stat.st_mtime_ns}"
+
+    def _setup_answer_cache(self) -> AnswerCache:
+        """Cria o cache de respostas, persistido em data/cache se habilitado."""
+        persist = os.getenv("ANSWER_CACHE_PERSIST", "1") == "1"
+        # Busca semântica desligada por padrão: perguntas quase iguais com sentidos opostos passam de 0.95
+        limiar = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0"))
+        cache = AnswerCache(
+            embeddings=self.embeddings,
+            max_size=int(os.getenv("ANSWER_CACHE_SIZE", "256")),
+            ttl=float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+            threshold=limiar if limiar > 0 else None,
+            persist_path=self.cache_dir / "respostas.json" if persist else None,
+            fingerprint=self._index_fingerprint(),
+        )
+        if persist:
+            atexit.register(cache.save)
+        return cache
+
+    def _load_sources(self, fontes) -> tuple:
+        """Carrega os documentos das fontes pedidas (páginas do site e arquivos locais).
+
+        Retorna (documentos, validadores) onde validadores = {fonte: {...}} só
+        para as fontes lidas com sucesso.
+        """
+        paginas = [f for f in fontes if f not in ARQUIVOS_LOCAIS]
+        documentos, validadores = self._load_documents_parallel(paginas)
+
+        for fonte in fontes:
+            caminho = ARQUIVOS_LOCAIS.get(fonte)
+            if caminho is None:
+                continue
+            documentos.extend(self._carregar_extras_txt(caminho))  # Adiciona ANTES da deduplicação
+            mtime = os.path.getmtime(caminho) if os.path.exists(caminho) else 0
+            validadores[fonte] = {"arquivo": caminho, "mtime": mtime}
+
+        return documentos, validadores
+
+    def _load_documents_parallel(self, paths: List[str] = None) -> tuple:
+        """Carrega documentos em paralelo (raspagem assíncrona com conexões reaproveitadas).
+
+        Retorna (documentos, validadores HTTP por página raspada com sucesso).
+        Notícias que respondem 404 (removidas ou IDs que nunca existiram) entram
+        sem conteúdo, para não serem baixadas de novo a cada atualização. As que
+        a descoberta acabou de achar já foram raspadas por ela e não são baixadas de novo.
+        """
+        if paths is None:
+            paths = listar_paginas()
         
         documentos = []
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            futures = {executor.submit(self._fetch_document, path): path for path in paths}
-            
-            for future in as_completed(futures):
-                path = futures[future]
-                try:
-                    doc = future.result()
-                    if doc:
-                        documentos.append(doc)
-                except Exception as e:
-                    print(f"[❌] Erro ao carregar '{path}': {str(e)}")
+        validadores = {}
+        # Notícias novas já vêm da descoberta; só o resto é baixado
+        prontas = {path: self._noticias_raspadas.pop(path) for path in paths if path in self._noticias_raspadas}
+        pendentes = [path for path in paths if path not in prontas]
+        baixadas = raspar_fontes({path: (None, None) for path in pendentes}) if pendentes else {}
+        for path in paths:
+            resultado = prontas[path] if path in prontas else baixadas[path]
+            if (isinstance(resultado, httpx.HTTPStatusError) and resultado.response.status_code == 404
+                    and path.startswith("n.php?ID=")):
+                print(f"[⚠️] Notícia não existe mais: {path}")
+                validadores[path] = {"url": str(resultado.request.url), "etag": None, "last_modified": None}
+                continue
+            if isinstance(resultado, Exception):
+                print(f"[❌] Erro ao carregar '{path}': {str(resultado)}")
+                continue
+
+            validadores[path] = {"url": resultado.url, "etag": resultado.etag, "last_modified": resultado.last_modified}
+            doc = self._document_from_content(path, resultado.conteudo)
+            if doc:
+                documentos.append(doc)
+            else:
+                print(f"[⚠️] Conteúdo vazio ou ignorado: {path}")
         
-        return documentos
+        return documentos, validadores
 
-    def _fetch_document(self, path: str) -> Optional[Document]:
-        """Busca um documento individual."""
-        try:
-            # Substitua por sua função de scraping real
-            conteudo = func_scraping_main(path)
-            
-            if isinstance(conteudo, list):
-                conteudo = "\n\n".join(conteudo)
-            
-            if isinstance(conteudo, str) and len(conteudo.strip()) > 50:
-                return Document(
-                    page_content=conteudo.strip(), 
-                    metadata={"source": path, "timestamp": int(time.time())}
-                )
-            print(f"[⚠️] Conteúdo vazio ou ignorado: {path}")
-            return None
-                
-        except Exception as e:
-            print(f"[❌] Erro ao carregar '{path}': {str(e)}")
-            traceback.print_exc()
-            return None
+    def _document_from_content(self, path: str, conteudo) -> Optional[Document]:
+        """Cria o Document da página, ignorando conteúdo vazio ou curto demais."""
+        if isinstance(conteudo, list):
+            conteudo = "\n\n".join(conteudo)
+
+        if isinstance(conteudo, str) and len(conteudo.strip()) > 50:
+            return Document(
+                page_content=conteudo.strip(), 
+                metadata={"source": path, "timestamp": int(time.time())}
+            )
+        return None
 
     def _deduplicate_documents(self, documentos: List[Document]) -> List[Document]:
-        """Remove documentos duplicados."""
+        """Remove documentos duplicados (texto idêntico).
+
+        Quase-duplicatas são removidas depois, em _embed_sources, reaproveitando
+        os embeddings dos chunks.
+        """
         if not documentos:
             return []
             
@@ -178,25 +553,7 @@ class JovemProgramadorChatbot:
                 seen_hashes.add(content_hash)
                 unique_docs.append(doc)
         
-        return self._semantic_deduplication(unique_docs) if len(unique_docs) > 50 else unique_docs
-
-    def _semantic_deduplication(self, documentos: List[Document]) -> List[Document]:
-        """Deduplicação semântica com similaridade de cosseno."""
-        textos = [doc.page_content for doc in documentos]
-        embeddings = self.embeddings.embed_documents(textos)
-        embeddings_array = np.array(embeddings)
-        similarity_matrix = cosine_similarity(embeddings_array)
-        
-        to_remove = set()
-        n = len(embeddings_array)
-        
-        for i in range(n):
-            if i not in to_remove:
-                for j in range(i+1, n):
-                    if similarity_matrix[i,j] >= 0.55:
-                        to_remove.add(j)
-        
-        return [doc for idx, doc in enumerate(documentos) if idx not in to_remove]
+        return unique_docs
 
     def _split_documents(self, documentos: List[Document]) -> List[Document]:
         """Divide documentos em chunks."""
@@ -215,39 +572,92 @@ class JovemProgramadorChatbot:
         
         return splits
 
-    def _check_vectorstore_cache(self, index_path: Path, cache_file: Path) -> bool:
-        """Verifica se o cache está válido."""
-        if not index_path.exists() or not cache_file.exists():
-            return False
-            
+    def _read_manifest(self, cache_file: Path) -> tuple:
+        """Lê o manifesto: ({fonte: validadores + hash + ids dos chunks}, tipo do índice).
+
+        Manifestos de versões antigas não têm o necessário para atualizar o
+        índice e são ignorados (forçando uma reconstrução). Sem o tipo, o
+        índice é o flat que o LangChain cria por padrão.
+        """
         try:
             with open(cache_file, 'r') as f:
                 cache_data = json.load(f)
-                
-            for path, timestamp in cache_data.items():
-                if not os.path.exists(path) or os.path.getmtime(path) > timestamp:
-                    return False
-            return True
-        except:
+        except Exception:
+            return {}, {}
+
+        if cache_data.get("versao") != 3:
+            return {}, {}
+        return cache_data.get("fontes", {}), cache_data.get("indice", {"tipo": "flat"})
+
+    def _check_stale_source(self, fonte: str, entrada: dict, resultado) -> bool:
+        """Verifica se uma fonte mudou; atualiza os validadores da entrada."""
+        if "arquivo" in entrada:
+            caminho = entrada["arquivo"]
+            return not os.path.exists(caminho) or os.path.getmtime(caminho) > entrada.get("mtime", 0)
+
+        if resultado.conteudo is None:  # 304
             return False
 
-    def _update_vectorstore_cache(self, index_path: Path, cache_file: Path):
-        """Atualiza o cache do vectorstore."""
-        cache_data = {}
-        paths = [
-            "sobre.php", "duvidas.php", "patrocinadores.php", "parceiros.php", 
-            "apoiadores.php", "index.php", "hackathon/", "lgpd.php", 
-            "privacidade.php", "n.php?ID=139", "n.php?ID=136", "n.php?ID=135", "n.php?ID=134",
-            "n.php?ID=133", "n.php?ID=132", "n.php?ID=131", "n.php?ID=128", 
-            "n.php?ID=123","n.php?ID=122", "n.php?ID=121", "n.php?ID=120", "n.php?ID=115", "n.php?ID=114", "n.php?ID=119", "data/extras.txt"
+        doc = self._document_from_content(fonte, resultado.conteudo)
+        if self._content_hash([doc] if doc else []) != entrada.get("hash"):
+            return True
+
+        # Conteúdo igual com validadores novos: guarda para o próximo GET virar 304
+        entrada["etag"], entrada["last_modified"] = resultado.etag, resultado.last_modified
+        return False
+
+    def _discover_news(self):
+        """Procura notícias novas no site e as acrescenta à fronteira (e ao registro de fontes)."""
+        self._noticias_raspadas = {}
+        if os.getenv("NEWS_DISCOVERY", "1") != "1":
+            return
+        try:
+            descobridor = DescobridorNoticias()
+            executar_sincrono(descobridor.descobrir)
+            self._noticias_raspadas = descobridor.raspadas
+        except Exception as e:
+            # Sem descoberta o índice segue com as notícias já conhecidas
+            print(f"[⚠️] Descoberta de notícias falhou: {str(e)}")
+
+    def _check_vectorstore_cache(self, manifest: dict) -> set:
+        """Retorna as fontes que precisam ser reindexadas (vazio = índice em dia).
+
+        Fontes novas ou retiradas do registro contam como obsoletas; as demais
+        são verificadas com GET condicional (If-None-Match/If-Modified-Since),
+        então páginas inalteradas custam um 304. Notícias já indexadas não são
+        reverificadas (publicadas, quase nunca mudam), salvo com NEWS_RECHECK=1.
+        """
+        registro = set(listar_fontes())
+        obsoletas = registro ^ set(manifest)
+
+        reverificar_noticias = os.getenv("NEWS_RECHECK", "0") == "1"
+        verificar = [
+            f for f in registro
+            if f in manifest and (reverificar_noticias or not f.startswith("n.php?ID="))
         ]
-        
-        for path in paths:
-            if os.path.exists(path):
-                cache_data[path] = os.path.getmtime(path)
-                
-        with open(cache_file, 'w') as f:
-            json.dump(cache_data, f)
+        pedidos = {
+            f: (manifest[f].get("etag"), manifest[f].get("last_modified"))
+            for f in verificar if f not in ARQUIVOS_LOCAIS
+        }
+        resultados = raspar_fontes(pedidos) if pedidos else {}
+
+        for fonte in verificar:
+            resultado = resultados.get(fonte)
+            if isinstance(resultado, Exception):
+                # Sem resposta não dá para saber; mantém o que está indexado
+                print(f"[⚠️] Não foi possível verificar '{fonte}': {str(resultado)}")
+                continue
+            if self._check_stale_source(fonte, manifest[fonte], resultado):
+                obsoletas.add(fonte)
+
+        return obsoletas
+
+    def _update_vectorstore_cache(self, cache_file: Path, manifest: dict, config_indice: dict):
+        """Atualiza o cache do vectorstore."""
+        tmp = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+        with open(tmp, 'w') as f:
+            json.dump({"versao": 3, "indice": config_indice, "fontes": manifest}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, cache_file)
 
     def _carregar_extras_txt(self, caminho: str) -> List[Document]:
         """Carrega arquivo extras.txt."""
@@ -287,6 +697,15 @@ class JovemProgramadorChatbot:
             print(f"⚠️ Erro ao ler 'extras.txt': {str(e)}")
             return []
 
+    def _load_bm25(self, vectorstore: FAISS, index_path: Optional[Path]) -> BM25Index:
+        """Índice BM25 salvo junto do FAISS; reconstruído em memória se não bater com os chunks carregados."""
+        bm25 = BM25Index.load(index_path / BM25_FILE) if index_path is not None else None
+        if bm25 is None or set(bm25.doc_ids) != set(vectorstore.index_to_docstore_id.values()):
+            print("🔁 Montando índice BM25 a partir do docstore...")
+            bm25 = BM25Index.from_vectorstore(vectorstore)
+        print(f"🔤 Índice BM25: {len(bm25)} chunks, {len(bm25.vocab)} termos")
+        return bm25
+
     def _setup_chain(self):
         """Configura a chain de processamento."""
         template = """ Você é um assistente especializado em ajudar usuários com informações sobre o site Jovem Programador.
@@ -308,49 +727,406 @@ class JovemProgramadorChatbot:
         - Nunca invente URLs ou links.                    
         """
         
-        prompt = ChatPromptTemplate.from_template(template)
-        retriever = self.vectorstore.as_retriever(
-            search_type="mmr",
-            search_kwargs={
-                "k": 3,
-                "score_threshold": 0.7,
-                "fetch_k": 20
-            }
+        self.prompt = prompt = ChatPromptTemplate.from_template(template)
+        self.context_max_tokens = int(os.getenv("CONTEXT_MAX_TOKENS", "800"))
+        self.retriever = self._create_retriever(self.vectorstore, self.index_path)
+
+        falhas = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+        cooldown = float(os.getenv("LLM_BREAKER_COOLDOWN_S", "30"))
+        self.llm_router = LLMRouter(
+            [
+                Provider("groq", self.groq_model, CircuitBreaker(falhas, cooldown)),
+                Provider("gemini", self.gemini_model, CircuitBreaker(falhas, cooldown)),
+            ],
+            hedge=os.getenv("LLM_HEDGE", "1") == "1",
+            prazo_inicial=float(os.getenv("LLM_HEDGE_DEADLINE_S", "2.0")),
+            prazo_maximo=float(os.getenv("LLM_HEDGE_MAX_S", "5.0")),
         )
-        
-        groq_chain = (
-            {"context": retriever, "question": RunnablePassthrough()}
-            | prompt
-            | self.groq_model
-            | StrOutputParser()
+        self.llm_chain = prompt | self.llm_router
+        return self._build_chain(self.retriever)
+
+    def _create_retriever(self, vectorstore: FAISS, index_path: Optional[Path]) -> HybridRetriever:
+        return HybridRetriever(
+            vectorstore=vectorstore,
+            bm25=self._load_bm25(vectorstore, index_path) if os.getenv("HYBRID_SEARCH", "1") == "1" else None,
+            k=3,
+            fetch_k=20,
+            **score_gate_config(),
         )
-        
-        gemini_chain = (
-            {"context": retriever, "question": RunnablePassthrough()}
-            | prompt
-            | self.gemini_model
-            | StrOutputParser()
+
+    def _build_chain(self, retriever: HybridRetriever):
+        # A busca roda uma vez só; sem contexto relevante o LLM nem é chamado
+        return (
+            {"context": retriever | RunnableLambda(self._format_context), "question": RunnablePassthrough()}
+            | RunnableLambda(self._answer_or_skip)
         )
-        
-        self.fallback_chain = groq_chain.with_fallbacks([gemini_chain])
-        return self.fallback_chain
+
+    def _format_context(self, documentos: List[Document]) -> str:
+        """Texto dos chunks para o prompt: sem metadados, sem sobreposição e dentro do limite de tokens."""
+        with metrics.ETAPA.time(etapa="contexto"):
+            return build_context(documentos, self.context_max_tokens)
+
+    def _answer_or_skip(self, entrada: dict):
+        """Chain do LLM para a pergunta, ou a resposta padrão se a busca não achou nada acima do limiar."""
+        if not entrada["context"]:
+            return RESPOSTA_NAO_ENCONTRADA
+        return self.llm_chain
+
+    def stats(self) -> dict:
+        """Contadores do cache de respostas, da busca, do roteador de LLMs, da coalescência, do índice e dos embeddings."""
+        dados = {
+            "cache_respostas": self.answer_cache.stats(),
+            "busca": self.retriever.stats(),
+            "llm": self.llm_router.stats(),
+            "coalescencia": self.single_flight.stats(),
+            "indice": {
+                "versao": self.index_path.name if self.index_path else None,
+                "chunks": self.vectorstore.index.ntotal,
+                "trocas": self.index_swaps,
+            },
+        }
+        if isinstance(self.embeddings, BatchingEmbeddings):
+            dados["embeddings"] = self.embeddings.stats()
+        return dados
 
     
+    def _answer(self, question: str) -> str:
+        """Busca + LLM para a pergunta (sem cache) e guarda a resposta no cache."""
+        response = self.chain.invoke(question)
+        self.answer_cache.put(question, response)
+        return response
+
+    def _answer_stream(self, question: str) -> Iterator[str]:
+        partes = []
+        for chunk in self.chain.stream(question):
+            if chunk:
+                partes.append(chunk)
+                yield chunk
+        self.answer_cache.put(question, "".join(partes))
+
+    async def _aanswer(self, question: str) -> str:
+        response = await self.chain.ainvoke(question)
+        await asyncio.to_thread(self.answer_cache.put, question, response)
+        return response
+
+    async def _aanswer_stream(self, question: str) -> AsyncIterator[str]:
+        partes = []
+        async for chunk in self.chain.astream(question):
+            if chunk:
+                partes.append(chunk)
+                yield chunk
+        await asyncio.to_thread(self.answer_cache.put, question, "".join(partes))
+
+    def _registrar_pergunta(self, metodo: str, origem: str, inicio: float):
+        metrics.PERGUNTA.observe(time.perf_counter() - inicio, metodo=metodo, origem=origem)
+
     def chat(self, question: str) -> str:
         
         if not question.strip():
             return "Por favor, faça uma pergunta sobre o Jovem Programador."
 
-        try:           
-            response = self.chain.invoke(question) 
+        inicio = time.perf_counter()
+        try:
+            cached = self.answer_cache.get(question)
+            if cached is not None:
+                self._registrar_pergunta("chat", "cache", inicio)
+                return cached
+
+            # Perguntas iguais em andamento compartilham a mesma busca + LLM
+            response = self.single_flight.do(normalizar_pergunta(question), lambda: self._answer(question))
+            self._registrar_pergunta("chat", "busca", inicio)
             return response
 
         except Exception as e:
+            self._registrar_pergunta("chat", "erro", inicio)
             error_msg = "Desculpe, ocorreu um erro. Por favor, tente novamente."
             print(f"Erro no chat: {str(e)}")
             traceback.print_exc()
             return error_msg
 
+    def chat_stream(self, question: str) -> Iterator[str]:
+        """Gera a resposta em pedaços conforme o LLM produz os tokens.
+
+        O Gemini entra (fallback ou hedge do LLMRouter) enquanto o Groq não
+        entregou o primeiro token.
+        """
+        if not question.strip():
+            yield "Por favor, faça uma pergunta sobre o Jovem Programador."
+            return
+
+        partes = []
+        inicio = time.perf_counter()
+        try:
+            cached = self.answer_cache.get(question)
+            if cached is not None:
+                self._registrar_pergunta("chat_stream", "cache", inicio)
+                yield cached
+                return
+
+            gerar = lambda: self._answer_stream(question)
+            for chunk in self.single_flight.stream(normalizar_pergunta(question), gerar):
+                partes.append(chunk)
+                yield chunk
+            self._registrar_pergunta("chat_stream", "busca", inicio)
+
+        except Exception as e:
+            self._registrar_pergunta("chat_stream", "erro", inicio)
+            print(f"Erro no chat (stream): {str(e)}")
+            traceback.print_exc()
+            if partes:
+                # Parte da resposta já foi enviada; quem consome decide como avisar
+                raise
+            yield "Desculpe, ocorreu um erro. Por favor, tente novamente."
+
+
+
+    async def achat(self, question: str) -> str:
+        """Versão assíncrona de chat: a chamada ao LLM não prende uma thread."""
+        if not question.strip():
+            return "Por favor, faça uma pergunta sobre o Jovem Programador."
+
+        inicio = time.perf_counter()
+        try:
+            # O cache pode calcular embedding (CPU), então roda fora do event loop
+            cached = await asyncio.to_thread(self.answer_cache.get, question)
+            if cached is not None:
+                self._registrar_pergunta("achat", "cache", inicio)
+                return cached
+
+            response = await self.single_flight.ado(normalizar_pergunta(question), lambda: self._aanswer(question))
+            self._registrar_pergunta("achat", "busca", inicio)
+            return response
+
+        except Exception as e:
+            self._registrar_pergunta("achat", "erro", inicio)
+            error_msg = "Desculpe, ocorreu um erro. Por favor, tente novamente."
+            print(f"Erro no chat: {str(e)}")
+            traceback.print_exc()
+            return error_msg
+
+    async def achat_stream(self, question: str) -> AsyncIterator[str]:
+        """Versão assíncrona de chat_stream."""
+        if not question.strip():
+            yield "Por favor, faça uma pergunta sobre o Jovem Programador."
+            return
+
+        partes = []
+        inicio = time.perf_counter()
+        try:
+            cached = await asyncio.to_thread(self.answer_cache.get, question)
+            if cached is not None:
+                self._registrar_pergunta("achat_stream", "cache", inicio)
+                yield cached
+                return
+
+            gerar = lambda: self._aanswer_stream(question)
+            async for chunk in self.single_flight.astream(normalizar_pergunta(question), gerar):
+                partes.append(chunk)
+                yield chunk
+            self._registrar_pergunta("achat_stream", "busca", inicio)
+
+        except Exception as e:
+            self._registrar_pergunta("achat_stream", "erro", inicio)
+            print(f"Erro no chat (stream): {str(e)}")
+            traceback.print_exc()
+            if partes:
+                raise
+            yield "Desculpe, ocorreu um erro. Por favor, tente novamente."
+
+
+    def _plan_batch(self, questions: List[str], retriever: HybridRetriever, usar_cache: bool) -> tuple:
+        """Parte de um lote que não precisa do LLM.
+
+        Perguntas vazias, do cache e barradas pela busca já saem com a
+        resposta; repetidas (mesmo texto normalizado) viram uma entrada só.
+        Retorna (prontas [(posição, resposta, origem)], entradas do LLM
+        [(chave, {"context", "question"})], posições de cada chave, vetores
+        do cache de respostas por chave).
+        """
+        prontas, grupos = [], {}
+        for posicao, pergunta in enumerate(questions):
+            if pergunta.strip():
+                grupos.setdefault(normalizar_pergunta(pergunta), []).append(posicao)
+            else:
+                prontas.append((posicao, "Por favor, faça uma pergunta sobre o Jovem Programador.", None))
+
+        vetores = {}
+        if usar_cache and grupos:
+            # Um lote só no modelo para o cache semântico (get agora, put quando o LLM responder)
+            vetores = dict(zip(grupos, self.answer_cache.vectors([questions[p[0]] for p in grupos.values()])))
+            for chave in list(grupos):
+                cached = self.answer_cache.get(questions[grupos[chave][0]], vetores[chave])
+                if cached is not None:
+                    prontas += [(posicao, cached, "cache") for posicao in grupos.pop(chave)]
+
+        chaves = list(grupos)
+        documentos = retriever.search_batch([questions[grupos[chave][0]] for chave in chaves])
+        entradas = []
+        for chave, docs in zip(chaves, documentos):
+            contexto = self._format_context(docs)
+            if contexto:
+                entradas.append((chave, {"context": contexto, "question": questions[grupos[chave][0]]}))
+            else:
+                prontas += [(posicao, RESPOSTA_NAO_ENCONTRADA, "busca") for posicao in grupos.pop(chave)]
+        return prontas, entradas, grupos, vetores
+
+    def _batch_retry(self, limitadas: list, atraso: float, espera: float, concorrencia: int) -> tuple:
+        """Próxima rodada depois de limite de taxa: (segundos de espera, nova concorrência)."""
+        concorrencia = max(1, concorrencia // 2)
+        atraso = max(atraso, espera)
+        print(f"⏳ Limite de taxa do LLM: {len(limitadas)} perguntas de novo em {atraso:.1f}s "
+              f"(concorrência {concorrencia})")
+        return atraso, concorrencia
+
+    def _llm_batch(self, llm_chain, entradas: list, concorrencia: int) -> Iterator[tuple]:
+        """Chama o LLM para cada (chave, entrada) com no máximo ``concorrencia`` chamadas simultâneas.
+
+        Entrega (chave, resposta) conforme ficam prontas. Limite de taxa (429)
+        não conta como erro: essas entradas voltam numa nova rodada depois do
+        Retry-After (ou de um backoff exponencial) com metade da concorrência,
+        até LLM_BATCH_RETRIES rodadas. Outros erros entregam resposta None.
+        """
+        tentativas = int(os.getenv("LLM_BATCH_RETRIES", "3"))
+        espera = 1.0
+        for rodada in range(tentativas + 1):
+            limitadas, atraso = [], 0.0
+            resultados = llm_chain.batch_as_completed(
+                [entrada for _, entrada in entradas], {"max_concurrency": concorrencia}, return_exceptions=True
+            )
+            for indice, resultado in resultados:
+                chave = entradas[indice][0]
+                if not isinstance(resultado, Exception):
+                    yield chave, resultado
+                    continue
+                retry_after = rate_limit_delay(resultado)
+                if retry_after is None or rodada == tentativas:
+                    print(f"Erro no lote: {str(resultado)}")
+                    yield chave, None
+                    continue
+                limitadas.append(entradas[indice])
+                atraso = max(atraso, retry_after)
+            if not limitadas:
+                return
+            atraso, concorrencia = self._batch_retry(limitadas, atraso, espera, concorrencia)
+            espera *= 2
+            time.sleep(atraso)
+            entradas = limitadas
+
+    async def _allm_batch(self, llm_chain, entradas: list, concorrencia: int) -> AsyncIterator[tuple]:
+        """Versão assíncrona de _llm_batch (``abatch_as_completed`` da chain)."""
+        tentativas = int(os.getenv("LLM_BATCH_RETRIES", "3"))
+        espera = 1.0
+        for rodada in range(tentativas + 1):
+            limitadas, atraso = [], 0.0
+            resultados = llm_chain.abatch_as_completed(
+                [entrada for _, entrada in entradas], {"max_concurrency": concorrencia}, return_exceptions=True
+            )
+            async for indice, resultado in resultados:
+                chave = entradas[indice][0]
+                if not isinstance(resultado, Exception):
+                    yield chave, resultado
+                    continue
+                retry_after = rate_limit_delay(resultado)
+                if retry_after is None or rodada == tentativas:
+                    print(f"Erro no lote: {str(resultado)}")
+                    yield chave, None
+                    continue
+                limitadas.append(entradas[indice])
+                atraso = max(atraso, retry_after)
+            if not limitadas:
+                return
+            atraso, concorrencia = self._batch_retry(limitadas, atraso, espera, concorrencia)
+            espera *= 2
+            await asyncio.sleep(atraso)
+            entradas = limitadas
+
+    def _batch_answers(self, grupos: dict, vetores: dict, chave: str, resposta: Optional[str], question: str,
+                       inicio: float) -> list:
+        """(posição, resposta) de todas as perguntas iguais a ``chave``; guarda a resposta no cache."""
+        if resposta is None:
+            self._registrar_pergunta("chat_batch", "erro", inicio)
+            resposta = "Desculpe, ocorreu um erro. Por favor, tente novamente."
+        else:
+            self._registrar_pergunta("chat_batch", "busca", inicio)
+            self.answer_cache.put(question, resposta, vetores.get(chave))
+        return [(posicao, resposta) for posicao in grupos[chave]]
+
+    def _batch_ready(self, prontas: list, inicio: float) -> list:
+        for _, _, origem in prontas:
+            if origem is not None:
+                self._registrar_pergunta("chat_batch", origem, inicio)
+        return [(posicao, resposta) for posicao, resposta, _ in prontas]
+
+    def chat_batch_stream(self, questions: List[str], concorrencia: Optional[int] = None,
+                          usar_cache: bool = True) -> Iterator[Tuple[int, str]]:
+        """Responde várias perguntas, entregando (posição, resposta) conforme ficam prontas.
+
+        Para reavaliar muitas perguntas de uma vez (/pergunta/batch): um lote
+        só de embeddings e uma busca só no FAISS para todas, e as chamadas ao
+        LLM pelo ``batch`` da chain com no máximo ``concorrencia``
+        (LLM_BATCH_CONCURRENCY) simultâneas. ``usar_cache=False`` ignora as
+        respostas do cache (útil para avaliar o índice novo).
+        """
+        inicio = time.perf_counter()
+        concorrencia = concorrencia or int(os.getenv("LLM_BATCH_CONCURRENCY", "4"))
+        # Um hot-swap do índice no meio do lote não mistura versões
+        retriever, llm_chain = self.retriever, self.llm_chain
+        try:
+            prontas, entradas, grupos, vetores = self._plan_batch(questions, retriever, usar_cache)
+        except Exception as e:
+            print(f"Erro no lote: {str(e)}")
+            traceback.print_exc()
+            yield from ((posicao, "Desculpe, ocorreu um erro. Por favor, tente novamente.")
+                        for posicao in range(len(questions)))
+            return
+
+        yield from self._batch_ready(prontas, inicio)
+        perguntas = {chave: entrada["question"] for chave, entrada in entradas}
+        for chave, resposta in self._llm_batch(llm_chain, entradas, concorrencia):
+            yield from self._batch_answers(grupos, vetores, chave, resposta, perguntas[chave], inicio)
+
+    def chat_batch(self, questions: List[str], concorrencia: Optional[int] = None,
+                   usar_cache: bool = True) -> List[str]:
+        """Respostas de várias perguntas, na ordem das perguntas (ver chat_batch_stream)."""
+        respostas = [None] * len(questions)
+        for posicao, resposta in self.chat_batch_stream(questions, concorrencia, usar_cache):
+            respostas[posicao] = resposta
+        return respostas
+
+    async def achat_batch_stream(self, questions: List[str], concorrencia: Optional[int] = None,
+                                 usar_cache: bool = True) -> AsyncIterator[Tuple[int, str]]:
+        """Versão assíncrona de chat_batch_stream."""
+        inicio = time.perf_counter()
+        concorrencia = concorrencia or int(os.getenv("LLM_BATCH_CONCURRENCY", "4"))
+        retriever, llm_chain = self.retriever, self.llm_chain
+        try:
+            # Embeddings, cache e FAISS são CPU: fora do event loop
+            prontas, entradas, grupos, vetores = await asyncio.to_thread(
+                self._plan_batch, questions, retriever, usar_cache
+            )
+        except Exception as e:
+            print(f"Erro no lote: {str(e)}")
+            traceback.print_exc()
+            for posicao in range(len(questions)):
+                yield posicao, "Desculpe, ocorreu um erro. Por favor, tente novamente."
+            return
+
+        for item in self._batch_ready(prontas, inicio):
+            yield item
+        perguntas = {chave: entrada["question"] for chave, entrada in entradas}
+        async for chave, resposta in self._allm_batch(llm_chain, entradas, concorrencia):
+            respostas = await asyncio.to_thread(
+                self._batch_answers, grupos, vetores, chave, resposta, perguntas[chave], inicio
+            )
+            for item in respostas:
+                yield item
+
+    async def achat_batch(self, questions: List[str], concorrencia: Optional[int] = None,
+                          usar_cache: bool = True) -> List[str]:
+        respostas = [None] * len(questions)
+        async for posicao, resposta in self.achat_batch_stream(questions, concorrencia, usar_cache):
+            respostas[posicao] = resposta
+        return respostas
 
 
 # Exemplo de uso
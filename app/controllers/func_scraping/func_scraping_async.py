@@ -0,0 +1,132 @@
+import asyncio
+import random
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from dotenv import load_dotenv
+
+from .func_scraping_http import Pagina, cabecalhos_condicionais, cabecalhos_padrao
+from .func_scraping_main import ResultadoRaspagem, extrair_conteudo, montar_url
+
+load_dotenv()
+
+# Status que valem nova tentativa (instabilidade do servidor ou limite de taxa)
+STATUS_REPETIR = {429, 500, 502, 503, 504}
+
+
+class MotorRaspagem:
+    """Raspador assíncrono com conexões reaproveitadas (keep-alive).
+
+    - limita requisições simultâneas por host;
+    - repete falhas de rede e 429/5xx com backoff exponencial;
+    - envia If-None-Match/If-Modified-Since, então página inalterada custa um 304.
+    """
+
+    def __init__(self, max_por_host: int = 8, max_conexoes: int = 20, tentativas: int = 3,
+                 backoff: float = 0.5, timeout: float = 10):
+        self.max_por_host = max_por_host
+        self.max_conexoes = max_conexoes
+        self.tentativas = tentativas
+        self.backoff = backoff
+        self.timeout = timeout
+        self._semaforos: Dict[str, asyncio.Semaphore] = {}
+
+    def _semaforo(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._semaforos:
+            self._semaforos[host] = asyncio.Semaphore(self.max_por_host)
+        return self._semaforos[host]
+
+    async def baixar(self, client: httpx.AsyncClient, url: str, etag: Optional[str] = None,
+                     last_modified: Optional[str] = None) -> Pagina:
+        """GET (condicional, se houver validadores) com novas tentativas."""
+        headers = cabecalhos_condicionais(etag, last_modified)
+
+        for tentativa in range(self.tentativas):
+            try:
+                async with self._semaforo(url):
+                    response = await client.get(url, headers=headers)
+                if response.status_code not in STATUS_REPETIR:
+                    break
+                erro = httpx.HTTPStatusError(f"status {response.status_code}", request=response.request, response=response)
+            except httpx.TransportError as e:
+                erro = e
+
+            if tentativa == self.tentativas - 1:
+                raise erro
+            espera = self.backoff * (2 ** tentativa) * (1 + random.random() / 2)
+            await asyncio.sleep(espera)
+
+        if response.status_code == 304:
+            return Pagina(url, 304, etag=etag, last_modified=last_modified)
+
+        response.raise_for_status()
+        return Pagina(
+            url,
+            response.status_code,
+            response.content,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+
+    @asynccontextmanager
+    async def sessao(self) -> AsyncIterator[httpx.AsyncClient]:
+        """Cliente HTTP com keep-alive para uma rodada de raspagem.
+
+        Os limites por host recomeçam a cada sessão: cada rodada síncrona roda
+        num event loop novo, e um semáforo fica preso ao loop em que foi usado.
+        """
+        limites = httpx.Limits(max_connections=self.max_conexoes, max_keepalive_connections=self.max_conexoes)
+        self._semaforos = {}
+        async with httpx.AsyncClient(
+            headers=cabecalhos_padrao(), limits=limites, timeout=self.timeout, follow_redirects=True
+        ) as client:
+            yield client
+
+    async def raspar(self, client: httpx.AsyncClient, path: str, etag: Optional[str] = None,
+                     last_modified: Optional[str] = None) -> ResultadoRaspagem:
+        url_full = montar_url(path)
+        pagina = await self.baixar(client, url_full, etag, last_modified)
+
+        if pagina.nao_modificada:
+            return ResultadoRaspagem(path, url_full, 304, None, etag, last_modified)
+
+        # O parse é CPU; fora do event loop as outras páginas seguem baixando
+        conteudo = await asyncio.to_thread(extrair_conteudo, path, pagina.conteudo)
+        return ResultadoRaspagem(path, url_full, pagina.status, conteudo, pagina.etag, pagina.last_modified)
+
+    async def raspar_varias(self, pedidos: Dict[str, Tuple[Optional[str], Optional[str]]]) -> dict:
+        """Raspa várias páginas: {path: (etag, last_modified)} -> {path: ResultadoRaspagem | Exception}."""
+        async with self.sessao() as client:
+            resultados = await asyncio.gather(
+                *(self.raspar(client, path, etag, lm) for path, (etag, lm) in pedidos.items()),
+                return_exceptions=True,
+            )
+        return dict(zip(pedidos, resultados))
+
+
+def executar_sincrono(criar_coro):
+    """Roda a corrotina criada por ``criar_coro`` e espera o resultado.
+
+    Se já houver um event loop nesta thread (ex.: dentro do servidor ASGI),
+    roda num loop próprio em outra thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(criar_coro())
+
+    resultado = []
+    thread = threading.Thread(target=lambda: resultado.append(asyncio.run(criar_coro())))
+    thread.start()
+    thread.join()
+    return resultado[0]
+
+
+def raspar_fontes(pedidos: Dict[str, Tuple[Optional[str], Optional[str]]], motor: MotorRaspagem = None) -> dict:
+    """Versão síncrona de MotorRaspagem.raspar_varias."""
+    motor = motor or MotorRaspagem()
+    return executar_sincrono(lambda: motor.raspar_varias(pedidos))
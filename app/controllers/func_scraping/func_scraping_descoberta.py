@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import httpx
+from dotenv import load_dotenv
+
+from .func_scraping_async import MotorRaspagem, executar_sincrono
+from .func_scraping_fontes import FRONTEIRA_NOTICIAS, NOTICIAS, path_noticia
+from .func_scraping_main import ResultadoRaspagem, montar_url
+
+load_dotenv()
+
+# Páginas do site que listam notícias (links n.php?ID=...)
+PAGINAS_LISTAGEM = ["index.php", "noticias.php"]
+
+RE_NOTICIA = re.compile(r"n\.php\?ID=(\d+)", re.IGNORECASE)
+
+
+class FronteiraNoticias:
+    """IDs de notícias já descobertos, persistidos entre execuções.
+
+    Guarda também os validadores das páginas de listagem, para que uma
+    listagem inalterada custe só um 304.
+    """
+
+    def __init__(self, path: Path = FRONTEIRA_NOTICIAS):
+        self.path = Path(path)
+        self.ids: Set[int] = set(NOTICIAS)
+        self.listagens = {}  # path -> {"etag", "last_modified"}
+        self.atualizado = 0.0
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    dados = json.load(f)
+                self.ids.update(dados.get("ids", []))
+                self.listagens = dados.get("listagens", {})
+                self.atualizado = dados.get("atualizado", 0.0)
+            except Exception as e:
+                print(f"⚠️ Erro ao ler a fronteira de notícias: {str(e)}")
+
+    @property
+    def maior_id(self) -> int:
+        return max(self.ids, default=0)
+
+    def salvar(self):
+        self.atualizado = time.time()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"ids": sorted(self.ids, reverse=True), "listagens": self.listagens,
+                       "atualizado": self.atualizado}, f, indent=1)
+        os.replace(tmp, self.path)
+
+
+class DescobridorNoticias:
+    """Descobre notícias novas sem lista fixa de IDs.
+
+    1. Lê as páginas de listagem (GET condicional) e coleta os links n.php?ID=.
+    2. Sonda em paralelo os IDs acima do maior conhecido, em janelas de
+       ``janela`` IDs, até uma janela inteira não ter nenhuma notícia.
+
+    A sonda já é a raspagem da notícia: as que ela acha ficam em ``raspadas``
+    ({path: ResultadoRaspagem}) para a indexação não baixá-las de novo.
+    """
+
+    def __init__(self, fronteira: FronteiraNoticias = None, motor: MotorRaspagem = None, janela: int = 10):
+        self.fronteira = fronteira or FronteiraNoticias()
+        self.motor = motor or MotorRaspagem()
+        self.janela = janela
+        self.raspadas: Dict[str, ResultadoRaspagem] = {}
+
+    async def _ler_listagem(self, client: httpx.AsyncClient, path: str) -> Set[int]:
+        validadores = self.fronteira.listagens.get(path, {})
+        pagina = await self.motor.baixar(
+            client, montar_url(path), validadores.get("etag"), validadores.get("last_modified")
+        )
+        if pagina.nao_modificada:
+            return set()
+
+        self.fronteira.listagens[path] = {"etag": pagina.etag, "last_modified": pagina.last_modified}
+        return {int(i) for i in RE_NOTICIA.findall(pagina.conteudo.decode("utf-8", errors="ignore"))}
+
+    async def _sondar_id(self, client: httpx.AsyncClient, noticia_id: int) -> Optional[ResultadoRaspagem]:
+        """Raspa a notícia; None se ela não existe (404) ou não tem corpo."""
+        try:
+            resultado = await self.motor.raspar(client, path_noticia(noticia_id))
+        except httpx.HTTPError:
+            return None
+        return resultado if resultado.status == 200 and resultado.conteudo else None
+
+    async def _sondar(self, client: httpx.AsyncClient, inicio: int) -> Set[int]:
+        encontrados = set()
+        while True:
+            ids = list(range(inicio, inicio + self.janela))
+            resultados = await asyncio.gather(*(self._sondar_id(client, i) for i in ids))
+            novos = {i for i, resultado in zip(ids, resultados) if resultado is not None}
+            if not novos:
+                return encontrados
+            self.raspadas.update((resultado.path, resultado) for resultado in resultados if resultado is not None)
+            encontrados |= novos
+            inicio = max(novos) + 1
+
+    async def descobrir(self) -> List[int]:
+        """Atualiza a fronteira e retorna os IDs que ainda não eram conhecidos."""
+        self.raspadas = {}
+        async with self.motor.sessao() as client:
+            listagens = await asyncio.gather(
+                *(self._ler_listagem(client, path) for path in PAGINAS_LISTAGEM), return_exceptions=True
+            )
+            encontrados = set()
+            for path, resultado in zip(PAGINAS_LISTAGEM, listagens):
+                if isinstance(resultado, Exception):
+                    print(f"[⚠️] Erro ao ler a listagem '{path}': {str(resultado)}")
+                else:
+                    encontrados |= resultado
+
+            maior = max(max(encontrados, default=0), self.fronteira.maior_id)
+            if maior:
+                encontrados |= await self._sondar(client, maior + 1)
+
+        novos = sorted(encontrados - self.fronteira.ids)
+        self.fronteira.ids |= encontrados
+        self.fronteira.salvar()
+        if novos:
+            print(f"📰 Notícias novas descobertas: {novos}")
+        return novos
+
+
+def descobrir_noticias(fronteira: FronteiraNoticias = None, motor: MotorRaspagem = None) -> List[int]:
+    """Versão síncrona de DescobridorNoticias.descobrir."""
+    descobridor = DescobridorNoticias(fronteira, motor)
+    return executar_sincrono(descobridor.descobrir)
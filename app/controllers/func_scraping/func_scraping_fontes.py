@@ -0,0 +1,47 @@
+# Registro único das fontes indexadas pelo chatbot. Tanto a raspagem quanto o
+# manifesto do índice (data/vectorstore_cache.json) usam estas listas.
+import json
+from pathlib import Path
+
+# Páginas do site (relativas a URL_JOVEM_PROGRAMADOR)
+PAGINAS = [
+    "sobre.php", "duvidas.php", "patrocinadores.php", "parceiros.php",
+    "apoiadores.php", "index.php", "hackathon/", "lgpd.php", "privacidade.php",
+]
+
+# Notícias conhecidas (n.php?ID=...): ponto de partida da descoberta automática.
+# As descobertas depois ficam na fronteira (data/crawl_frontier.json).
+NOTICIAS = [139, 136, 135, 134, 133, 132, 131, 129, 128, 123, 122, 121, 120, 119, 115, 114]
+
+# Arquivos locais: nome da fonte -> caminho
+ARQUIVOS_LOCAIS = {
+    "extras.txt": "data/extras.txt",
+}
+
+FRONTEIRA_NOTICIAS = Path("data/crawl_frontier.json")
+
+
+def path_noticia(noticia_id: int) -> str:
+    return f"n.php?ID={noticia_id}"
+
+
+def listar_noticias() -> list:
+    """IDs das notícias: os fixos acima mais os descobertos na fronteira."""
+    ids = set(NOTICIAS)
+    if FRONTEIRA_NOTICIAS.exists():
+        try:
+            with open(FRONTEIRA_NOTICIAS, "r", encoding="utf-8") as f:
+                ids.update(json.load(f).get("ids", []))
+        except Exception as e:
+            print(f"⚠️ Erro ao ler a fronteira de notícias: {str(e)}")
+    return sorted(ids, reverse=True)
+
+
+def listar_paginas() -> list:
+    """Caminhos de todas as páginas do site que devem ser raspadas."""
+    return PAGINAS + [path_noticia(noticia_id) for noticia_id in listar_noticias()]
+
+
+def listar_fontes() -> list:
+    """Todas as fontes do índice: páginas do site e arquivos locais."""
+    return listar_paginas() + list(ARQUIVOS_LOCAIS)
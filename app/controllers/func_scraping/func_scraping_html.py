@@ -0,0 +1,96 @@
+# Leitura de HTML comum aos extratores (lxml).
+#
+# O texto sai numa passada só pela árvore: cada bloco (p, li, div, h1...)
+# fica só com o próprio texto, sem o dos blocos de dentro, que saem como
+# blocos separados. Com o BeautifulSoup o get_text() de cada div repetia o
+# texto de todas as divs aninhadas (custo quadrático na profundidade).
+import threading
+from typing import List, Union
+
+from bs4.dammit import UnicodeDammit
+from lxml import html as lxml_html
+
+IGNORADAS = frozenset(['script', 'style', 'noscript', 'nav', 'footer', 'header', 'form'])
+BLOCOS = frozenset([
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'li', 'div', 'section', 'article', 'main', 'aside',
+    'blockquote', 'pre', 'td', 'th', 'dt', 'dd', 'figcaption', 'body',
+])
+
+_local = threading.local()  # parsers do lxml não podem ser compartilhados entre threads
+
+
+def _parser() -> lxml_html.HTMLParser:
+    parser = getattr(_local, "parser", None)
+    if parser is None:
+        parser = _local.parser = lxml_html.HTMLParser(encoding="utf-8", remove_comments=True, remove_pis=True)
+    return parser
+
+
+def parse_html(conteudo: Union[str, bytes]):
+    """Árvore lxml da página (bytes em UTF-8 ou, se não forem, na codificação detectada)."""
+    if isinstance(conteudo, str):
+        conteudo = conteudo.encode("utf-8")
+    else:
+        try:
+            conteudo.decode("utf-8")
+        except UnicodeDecodeError:
+            # Sem isso o libxml2 assume latin-1; o UnicodeDammit respeita o <meta charset>
+            conteudo = UnicodeDammit(conteudo, is_html=True).unicode_markup.encode("utf-8")
+    return lxml_html.document_fromstring(conteudo or b"<html></html>", parser=_parser())
+
+
+def limpar_texto(texto: str) -> str:
+    return ' '.join(texto.split())
+
+
+def texto_do_elemento(elemento) -> str:
+    """Texto do elemento com os espaços normalizados (inclui o dos filhos)."""
+    return limpar_texto(elemento.text_content())
+
+
+def com_classe(tag: str, classe: str) -> str:
+    """XPath de ``tag`` com ``classe`` entre as classes (como o seletor ``tag.classe``)."""
+    return f".//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {classe} ')]"
+
+
+def remover_ignoradas(raiz):
+    """Tira script, style, nav, footer, header e form da árvore (o texto depois deles fica)."""
+    for elemento in list(raiz.iter(*IGNORADAS)):
+        elemento.drop_tree()
+
+
+def blocos_de_texto(raiz) -> List[str]:
+    """Texto próprio de cada bloco, na ordem do documento, com espaços normalizados.
+
+    Inline (a, span, strong...) fica no texto do bloco em que está; ``br``
+    vira espaço. Tags de IGNORADAS são puladas com tudo o que têm dentro.
+    """
+    resultados = []
+
+    def visitar(elemento, partes: list):
+        tag = elemento.tag
+        if tag in IGNORADAS or not isinstance(tag, str):
+            return
+        bloco = tag in BLOCOS
+        if bloco:
+            posicao = len(resultados)
+            resultados.append("")  # reserva a posição: o bloco vem antes dos que estão dentro dele
+            partes_bloco = []
+        else:
+            partes_bloco = partes
+
+        if tag == 'br':
+            partes_bloco.append(" ")
+        if elemento.text:
+            partes_bloco.append(elemento.text)
+        for filho in elemento:
+            visitar(filho, partes_bloco)
+            if filho.tail:
+                partes_bloco.append(filho.tail)
+
+        if bloco:
+            resultados[posicao] = limpar_texto("".join(partes_bloco))
+            partes.append(" ")  # o texto do bloco de fora não gruda antes e depois deste
+
+    visitar(raiz, [])
+    return resultados
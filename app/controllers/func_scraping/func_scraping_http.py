@@ -0,0 +1,58 @@
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+@dataclass
+class Pagina:
+    """Resposta HTTP de uma página com os validadores de cache."""
+    url: str
+    status: int
+    conteudo: bytes = b""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def nao_modificada(self) -> bool:
+        return self.status == 304
+
+
+def cabecalhos_padrao() -> dict:
+    return {"User-Agent": os.getenv("USER_AGENT", "projetoIntegrador/1.0")}
+
+
+def cabecalhos_condicionais(etag: Optional[str] = None, last_modified: Optional[str] = None) -> dict:
+    """Cabeçalhos If-None-Match/If-Modified-Since para um GET condicional."""
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+def baixar_pagina(url: str, etag: Optional[str] = None, last_modified: Optional[str] = None,
+                  timeout: float = 10) -> Pagina:
+    """Baixa a página; com etag/last_modified faz GET condicional (304 = não mudou).
+
+    Lança requests.exceptions.RequestException em erro de rede ou status >= 400.
+    """
+    headers = {**cabecalhos_padrao(), **cabecalhos_condicionais(etag, last_modified)}
+    response = requests.get(url, headers=headers, timeout=timeout)
+
+    if response.status_code == 304:
+        return Pagina(url, 304, etag=etag, last_modified=last_modified)
+
+    response.raise_for_status()
+    return Pagina(
+        url,
+        response.status_code,
+        response.content,
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+    )
@@ -1,56 +1,69 @@
-import os
 import requests
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 
+from .func_scraping_html import com_classe, parse_html
+from .func_scraping_http import baixar_pagina
+
 load_dotenv()
 
-def raspar_imagens_por_tipo(url: str, tipo: str):
+def extrair_imagens_por_tipo(html, tipo: str):
     """
-    Raspador de imagens com base no tipo (Patrocinadores, Parceiros, Apoiadores)
+    Extrai os alt das imagens da seção do tipo pedido (Patrocinadores, Parceiros, Apoiadores)
 
     Parâmetros:
-        url  -> str: URL da página que será raspada
+        html -> str | bytes: HTML da página
         tipo -> str: Título da seção desejada ("Patrocinadores", "Parceiros", "Apoiadores")
 
     Retorna:
-        Lista de strings com os atributos alt das imagens ou mensagens de erro
+        Texto com as empresas encontradas ou "" se nenhuma imagem tiver alt
     """
 
-    try:
+    # Converte o conteúdo HTML numa árvore lxml para facilitar a manipulação
+    raiz = parse_html(html)
+
+    # Localiza todas as seções com id específico onde estão as imagens
+    secoes = raiz.xpath(".//div[@id='fh5co-blog-section']")
 
-        headers = {"User-Agent": os.getenv("USER_AGENT", "projetoIntegrador/1.0")}
+    # Lista que vai armazenar os textos (alt) das imagens
+    alts = []
 
-        # Faz requisição HTTP para obter o conteúdo da página
-        response = requests.get(url,headers=headers, timeout=10)
+    # Percorre cada seção para encontrar o título correspondente ao tipo
+    for secao in secoes:
+        titulo = secao.find('.//h2')  # Procura o título da seção
+        # Compara o título com o tipo esperado (ignora letras maiúsculas/minúsculas)
+        if titulo is not None and tipo.lower() in titulo.text_content().lower():
+            # Procura todas as imagens dentro da seção com a classe específica
+            imagens = secao.xpath(com_classe('img', 'img-responsive'))
+            for img in imagens:
+                alt = img.get('alt')  # Extrai o texto alternativo da imagem
+                if alt:
+                    alts.append(alt)  # Adiciona na lista se não for vazio
 
-        # Lança erro caso o status da resposta não seja 200 (OK)
-        response.raise_for_status()
+    if not alts:
+        return ""
 
-        # Converte o conteúdo HTML em um objeto BeautifulSoup para facilitar a manipulação
-        soup = BeautifulSoup(response.content, 'html.parser')
+    return f"Estas são as empresas {tipo.capitalize()} do Projeto Jovem Programador ou 'PJP': " + ", ".join(alts) + ".\n\n"
+
+def raspar_imagens_por_tipo(url: str, tipo: str):
+    """
+    Raspador de imagens com base no tipo (Patrocinadores, Parceiros, Apoiadores)
 
-        # Localiza todas as seções com id específico onde estão as imagens
-        secoes = soup.find_all('div', id='fh5co-blog-section')
+    Parâmetros:
+        url  -> str: URL da página que será raspada
+        tipo -> str: Título da seção desejada ("Patrocinadores", "Parceiros", "Apoiadores")
 
-        # Lista que vai armazenar os textos (alt) das imagens
-        alts = []
+    Retorna:
+        Lista de strings com os atributos alt das imagens ou mensagens de erro
+    """
 
-        # Percorre cada seção para encontrar o título correspondente ao tipo
-        for secao in secoes:
-            titulo = secao.find('h2')  # Procura o título da seção
-            # Compara o título com o tipo esperado (ignora letras maiúsculas/minúsculas)
-            if titulo and tipo.lower() in titulo.text.lower():
-                # Procura todas as imagens dentro da seção com a classe específica
-                imagens = secao.find_all('img', class_='img-responsive')
-                for img in imagens:
-                    alt = img.get('alt')  # Extrai o texto alternativo da imagem
-                    if alt:
-                        alts.append(alt)  # Adiciona na lista se não for vazio
+    try:
+        # Faz requisição HTTP (lança erro caso o status não seja de sucesso)
+        pagina = baixar_pagina(url)
 
         # Retorna os resultados ou uma mensagem se nada foi encontrado
-        if alts:
-            return f"Estas são as empresas {tipo.capitalize()} do Projeto Jovem Programador ou 'PJP': " + ", ".join(alts) + ".\n\n"
+        conteudo = extrair_imagens_por_tipo(pagina.conteudo, tipo)
+        if conteudo:
+            return conteudo
         
         else:
             return f"Nenhuma imagem com alt encontrada para '{tipo}' em {url}"
@@ -61,4 +74,4 @@ def raspar_imagens_por_tipo(url: str, tipo: str):
 
     except Exception as e:
         # Captura qualquer outro erro inesperado
-        return [f"Erro inesperado: {e}"]
\ No newline at end of file
+        return [f"Erro inesperado: {e}"]
@@ -1,18 +1,71 @@
 import os
+from dataclasses import dataclass
+from typing import Optional
 from dotenv import load_dotenv
-from bs4 import BeautifulSoup
-from .func_scraping_img import raspar_imagens_por_tipo
-from .func_scraping_generic import raspar_texto_generic
-from .func_scraping_news import raspar_noticias
+from .func_scraping_img import raspar_imagens_por_tipo, extrair_imagens_por_tipo
+from .func_scraping_generic import raspar_texto_generic, extrair_texto_generic
+from .func_scraping_news import raspar_noticias, extrair_noticia
+from .func_scraping_http import baixar_pagina
 
 load_dotenv()
 
+PAGINAS_IMAGENS = ['patrocinadores.php', 'apoiadores.php', 'parceiros.php']
+
+
+@dataclass
+class ResultadoRaspagem:
+    """Conteúdo extraído de uma fonte e os validadores HTTP da resposta.
+
+    ``conteudo`` é None quando o servidor respondeu 304 (não modificada).
+    """
+    path: str
+    url: str
+    status: int
+    conteudo: Optional[str]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+def montar_url(path):
+    base = os.getenv("URL_JOVEM_PROGRAMADOR")
+    if not base:
+        raise ValueError("URL_JOVEM_PROGRAMADOR não definida (ex.: https://www.jovemprogramador.com.br/)")
+    return base + path
+
+
+def extrair_conteudo(path, html):
+    """Escolhe o extrator certo para a página e devolve o texto ("" se vazio)."""
+    if path in PAGINAS_IMAGENS:
+        return extrair_imagens_por_tipo(html, path.replace(".php", ""))
+
+    elif path.startswith("n.php?ID="):
+        return extrair_noticia(html)
+
+    else:
+        return extrair_texto_generic(html)
+
+
+def func_scraping_fonte(path, etag=None, last_modified=None):
+    """Raspa a página guardando ETag/Last-Modified; com validadores faz GET condicional.
+
+    Lança requests.exceptions.RequestException em erro de rede ou HTTP.
+    """
+    url_full = montar_url(path)
+    pagina = baixar_pagina(url_full, etag, last_modified)
+
+    if pagina.nao_modificada:
+        return ResultadoRaspagem(path, url_full, 304, None, etag, last_modified)
+
+    return ResultadoRaspagem(
+        path, url_full, pagina.status, extrair_conteudo(path, pagina.conteudo),
+        pagina.etag, pagina.last_modified,
+    )
+
 
 def func_scraping_main(path):
-    url_base = os.getenv("URL_JOVEM_PROGRAMADOR")
-    url_full = url_base + path
+    url_full = montar_url(path)
 
-    if path in ['patrocinadores.php', 'apoiadores.php', 'parceiros.php']:
+    if path in PAGINAS_IMAGENS:
         tipo = path.replace(".php", "")
         content = raspar_imagens_por_tipo(url_full, tipo)
         return content
@@ -24,4 +77,3 @@ def func_scraping_main(path):
     else:
         content = raspar_texto_generic(url_full)
         return content
-
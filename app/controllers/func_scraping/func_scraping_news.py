@@ -1,45 +1,45 @@
-import os
 import requests
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 
+from .func_scraping_html import com_classe, parse_html, remover_ignoradas, texto_do_elemento
+from .func_scraping_http import baixar_pagina
+
 load_dotenv()
 
-def raspar_noticias(url):
-    try:
-        headers = {
-            "User-Agent": os.getenv("USER_AGENT", "projeto_integrador/1.0")
-        }
+def extrair_noticia(html):
+    """Extrai título, data e corpo de uma página de notícia ("" se não houver corpo)."""
+    raiz = parse_html(html)
 
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
+    # Remove tags desnecessárias
+    remover_ignoradas(raiz)
 
-        soup = BeautifulSoup(response.content, 'html.parser')
+    # Extrai título
+    titulo = raiz.xpath(com_classe("h1", "title"))
+    titulo_texto = texto_do_elemento(titulo[0]) if titulo else "Título não encontrado"
 
-        # Remove tags desnecessárias
-        for tag in soup.select('script, style, nav, footer, header, form'):
-            tag.decompose()
+    # Extrai data
+    data = raiz.xpath(com_classe("h5", "date"))
+    data_texto = texto_do_elemento(data[0]) if data else "Data não encontrada"
 
-        # Extrai título
-        titulo = soup.select_one("h1.title")
-        titulo_texto = titulo.get_text(strip=True) if titulo else "Título não encontrado"
+    # Extrai conteúdo (o texto de cada parágrafo é calculado uma vez só)
+    conteudo_div = raiz.xpath(com_classe("div", "v-align-middle"))
+    paragrafos = (texto_do_elemento(p) for p in conteudo_div[0].iter("p")) if conteudo_div else ()
+    corpo = "\n\n".join(texto for texto in paragrafos if len(texto) > 30)
 
-        # Extrai data
-        data = soup.select_one("h5.date")
-        data_texto = data.get_text(strip=True) if data else "Data não encontrada"
+    if not corpo:
+        return ""
 
-        # Extrai conteúdo
-        conteudo_div = soup.select_one("div.v-align-middle")
-        paragrafos = conteudo_div.find_all("p") if conteudo_div else []
-        corpo = "\n\n".join([
-            p.get_text(strip=True)
-            for p in paragrafos if len(p.get_text(strip=True)) > 30
-        ])
+    return f"Conteúdo tipo: Notícia\n Título: {titulo_texto} Data: \n{data_texto}\n\nConteúdo: {corpo}"
+
+def raspar_noticias(url):
+    try:
+        pagina = baixar_pagina(url)
+        noticia = extrair_noticia(pagina.conteudo)
 
-        if not corpo:
+        if not noticia:
             return f"[⚠️] Conteúdo não encontrado em: {url}"
 
-        return f"Conteúdo tipo: Notícia\n Título: {titulo_texto} Data: \n{data_texto}\n\nConteúdo: {corpo}"
+        return noticia
 
     except requests.exceptions.RequestException as e:
         return f"[Erro de requisição] {e}"
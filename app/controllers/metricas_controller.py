@@ -0,0 +1,76 @@
+from flask import Blueprint, Response
+
+from app.controllers import pergunta_controller
+from app.services import metrics
+
+metricas_bp = Blueprint("metricas", __name__)
+
+
+def series_chatbot(bot) -> list:
+    """Contadores que o chatbot já mantém (``stats()``), no formato de ``Registry.render``."""
+    status = pergunta_controller.status_chatbot()
+    series = [
+        ("chatbot_pronto", "gauge", "1 quando o chatbot terminou de carregar.", [({}, int(status["pronto"]))]),
+    ]
+    if status["tempo_inicializacao_s"] is not None:
+        series.append(("chatbot_inicializacao_segundos", "gauge", "Tempo para carregar modelo e índice.",
+                       [({}, status["tempo_inicializacao_s"])]))
+    if pergunta_controller.fila_admissao is not None:
+        fila = pergunta_controller.fila_admissao.stats()
+        series += [
+            ("chatbot_admissao_andamento", "gauge", "Perguntas admitidas em andamento neste processo.",
+             [({}, fila["andamento"])]),
+            ("chatbot_admissao_fila", "gauge", "Perguntas esperando vaga na fila de admissão.", [({}, fila["fila"])]),
+        ]
+    if bot is None:
+        return series
+
+    dados = bot.stats()
+    cache, busca, llm, coalescencia = dados["cache_respostas"], dados["busca"], dados["llm"], dados["coalescencia"]
+    series += [
+        ("chatbot_cache_respostas_total", "counter", "Consultas ao cache de respostas.", [
+            ({"resultado": "hit_exato"}, cache["hits_exatos"]),
+            ({"resultado": "hit_semantico"}, cache["hits_semanticos"]),
+            ({"resultado": "miss"}, cache["misses"]),
+        ]),
+        ("chatbot_cache_respostas_entradas", "gauge", "Respostas guardadas no cache.", [({}, cache["entradas"])]),
+        ("chatbot_busca_total", "counter",
+         "Buscas aprovadas pelo filtro vetorial, só pelo BM25 e barradas (sem chamar o LLM).", [
+            ({"resultado": "aprovada"}, busca["aprovadas"] - busca["pelo_bm25"]),
+            ({"resultado": "aprovada_bm25"}, busca["pelo_bm25"]),
+            ({"resultado": "bloqueada"}, busca["bloqueadas"]),
+        ]),
+        ("chatbot_coalescencia_total", "counter", "Perguntas calculadas e coalescidas com uma igual em andamento.", [
+            ({"tipo": "calculada"}, coalescencia["calculadas"]),
+            ({"tipo": "coalescida"}, coalescencia["coalescidas"]),
+        ]),
+        ("chatbot_llm_hedges_total", "counter", "Provedores disparados em paralelo por estouro do prazo.", [
+            ({"resultado": "disparado"}, llm["hedges"]),
+            ({"resultado": "vencido"}, llm["hedges_vencidos"]),
+        ]),
+        ("chatbot_llm_circuito", "gauge", "Estado do circuit breaker de cada provedor (1 no estado atual).", [
+            ({"provedor": nome, "estado": estado}, int(provedor["circuito"] == estado))
+            for nome, provedor in llm["provedores"].items()
+            for estado in ("fechado", "aberto", "meio-aberto")
+        ]),
+        ("chatbot_indice_chunks", "gauge", "Chunks no índice em uso.", [({}, dados["indice"]["chunks"])]),
+        ("chatbot_indice_trocas_total", "counter", "Trocas do índice em uso sem reiniciar (hot-swap).", [
+            ({}, dados["indice"]["trocas"]),
+        ]),
+    ]
+    if "embeddings" in dados:
+        embeddings = dados["embeddings"]
+        series.append(("chatbot_embeddings_cache_total", "counter", "Consultas ao cache de vetores de perguntas.", [
+            ({"resultado": "hit"}, embeddings["cache_hits"]),
+            ({"resultado": "miss"}, embeddings["cache_misses"]),
+        ]))
+    return series
+
+
+@metricas_bp.route('/metrics', methods=['GET'])
+def exportar():
+    """Métricas no formato de texto do Prometheus (deste processo)."""
+    if not metrics.enabled():
+        return Response("métricas desligadas (METRICS_ENABLED=0)\n", status=404, mimetype="text/plain")
+    texto = metrics.REGISTRY.render(series_chatbot(pergunta_controller.chatbot))
+    return Response(texto, mimetype="text/plain; version=0.0.4; charset=utf-8")
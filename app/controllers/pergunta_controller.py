@@ -1,20 +1,332 @@
-from flask import Blueprint, request, jsonify, render_template
-from app.chatbot_class import JovemProgramadorChatbot  # ajuste caminho se necessário
+import functools
+import importlib
+import json
+import os
+import threading
+import time
+import traceback
+from typing import Optional
+
+from flask import Blueprint, Response, g, request, jsonify, render_template, stream_with_context
+
+from app.services import metrics
+from app.services.admission import AdmissionQueue, RateLimiter, Rejected, client_address
 
 pergunta_bp = Blueprint("pergunta", __name__, url_prefix="/pergunta")
 
-# Instância global (carrega tudo uma vez só ao iniciar)
-chatbot = JovemProgramadorChatbot()
+# Instância global, criada fora do caminho de import: carregar o modelo de
+# embeddings e o índice FAISS leva segundos (ou minutos, se precisar raspar o
+# site), e o servidor precisa abrir a porta antes disso.
+#
+# CHATBOT_STARTUP=background (padrão): inicializa numa thread ao criar o app;
+#                 até ficar pronto as perguntas recebem 503.
+# CHATBOT_STARTUP=lazy: inicializa na primeira pergunta (que espera).
+# CHATBOT_STARTUP=eager: inicializa antes de create_app retornar (modo antigo).
+chatbot = None
+_erro_inicializacao = None
+_inicio_inicializacao = None
+_tempo_inicializacao = None
+_lock_inicializacao = threading.Lock()
+
+# Controle de admissão nas rotas que chamam o LLM: limite por cliente (429) e
+# fila de perguntas em andamento no processo (503 com a fila cheia). None
+# desliga (RATE_LIMIT_PER_MIN=0, ADMISSION_MAX_INFLIGHT=0).
+ROTAS_ADMITIDAS = frozenset(["/pergunta/", "/pergunta/stream", "/pergunta/batch"])
+limitador = RateLimiter.from_env()
+fila_admissao = AdmissionQueue.from_env()
+
+
+def modo_inicializacao() -> str:
+    return os.getenv("CHATBOT_STARTUP", "background")
+
+
+def _criar_chatbot():
+    """Importa e instancia a classe do chatbot (CHATBOT_CLASS="modulo:Classe")."""
+    modulo, classe = os.getenv("CHATBOT_CLASS", "app.chatbot_class:JovemProgramadorChatbot").split(":")
+    return getattr(importlib.import_module(modulo), classe)()
+
+
+def obter_chatbot():
+    """Retorna o chatbot, inicializando-o se ainda não existir (bloqueia)."""
+    global chatbot, _erro_inicializacao, _inicio_inicializacao, _tempo_inicializacao
+    if chatbot is not None:
+        return chatbot
+
+    with _lock_inicializacao:
+        if chatbot is None:
+            _inicio_inicializacao = time.perf_counter()
+            _erro_inicializacao = None
+            try:
+                print("🚀 Inicializando chatbot...")
+                chatbot = _criar_chatbot()
+                _tempo_inicializacao = time.perf_counter() - _inicio_inicializacao
+                print(f"✅ Chatbot pronto em {_tempo_inicializacao:.1f}s")
+            except Exception as e:
+                _erro_inicializacao = str(e)
+                print(f"[❌] Erro ao inicializar o chatbot: {str(e)}")
+                traceback.print_exc()
+    return chatbot
+
+
+def iniciar_chatbot(modo: str = None):
+    """Dispara a inicialização do chatbot conforme CHATBOT_STARTUP."""
+    modo = modo or modo_inicializacao()
+    if modo == "eager":
+        obter_chatbot()
+    elif modo == "background" and chatbot is None:
+        threading.Thread(target=obter_chatbot, name="chatbot-init", daemon=True).start()
+
+
+def chatbot_disponivel():
+    """Chatbot para atender a requisição atual, ou None se ainda estiver carregando."""
+    if chatbot is None and modo_inicializacao() == "lazy":
+        return obter_chatbot()
+    return chatbot
+
+
+def resposta_indisponivel() -> dict:
+    if _erro_inicializacao:
+        return {"erro": "Chatbot indisponível. Tente novamente mais tarde."}
+    return {"erro": "Chatbot inicializando. Tente novamente em alguns segundos."}
+
+
+def status_chatbot() -> dict:
+    return {
+        "pronto": chatbot is not None,
+        "modo": modo_inicializacao(),
+        "erro": _erro_inicializacao,
+        "tempo_inicializacao_s": round(_tempo_inicializacao, 2) if _tempo_inicializacao else None,
+    }
+
+
+def validar_pergunta(data) -> Optional[str]:
+    """Retorna a mensagem de erro do corpo da requisição, ou None se estiver ok."""
+    if not isinstance(data, dict) or 'pergunta' not in data:
+        return "Campo 'pergunta' é obrigatório"
+    if not isinstance(data['pergunta'], str):
+        return "Campo 'pergunta' deve ser texto"
+    return None
+
+
+def validar_lote(data) -> Optional[str]:
+    """Erro do corpo de /pergunta/batch, ou None se estiver ok."""
+    if not isinstance(data, dict) or 'perguntas' not in data:
+        return "Campo 'perguntas' é obrigatório"
+    perguntas = data['perguntas']
+    if not isinstance(perguntas, list) or not all(isinstance(p, str) for p in perguntas):
+        return "Campo 'perguntas' deve ser uma lista de textos"
+    limite = int(os.getenv("BATCH_MAX_QUESTIONS", "5000"))
+    if len(perguntas) > limite:
+        return f"No máximo {limite} perguntas por lote"
+    concorrencia = data.get('concorrencia')
+    if concorrencia is not None and (not isinstance(concorrencia, int) or concorrencia < 1):
+        return "Campo 'concorrencia' deve ser um inteiro positivo"
+    return None
+
+
+def parametros_lote(data: dict) -> dict:
+    """Argumentos de chat_batch a partir do corpo; a concorrência pedida não passa de LLM_BATCH_CONCURRENCY."""
+    maximo = int(os.getenv("LLM_BATCH_CONCURRENCY", "4"))
+    return {
+        "concorrencia": min(data.get('concorrencia') or maximo, maximo),
+        "usar_cache": data.get('cache', True) is not False,
+    }
+
+
+def linha_ndjson(posicao: int, resposta: str) -> str:
+    return json.dumps({"indice": posicao, "resposta": resposta}, ensure_ascii=False) + "\n"
+
+
+def custo_admissao(rota: str, data) -> tuple:
+    """(fichas, vagas) que o pedido gasta na admissão.
+
+    Uma pergunta gasta uma ficha e uma vaga; um lote válido gasta uma ficha por
+    pergunta e ocupa uma vaga por pergunta simultânea (a concorrência do lote).
+    """
+    if rota != "/pergunta/batch" or validar_lote(data):
+        return 1, 1
+    return max(1, len(data['perguntas'])), parametros_lote(data)["concorrencia"]
+
+
+def admitir(cliente: str, rota: str, custo: float = 1, vagas: int = 1) -> float:
+    """Gasta as fichas do cliente e espera a vez na fila; devolve os segundos de espera.
+
+    Lança Rejected (429 ou 503). Quem foi admitido chama ``liberar(vagas)`` no fim.
+    """
+    try:
+        if limitador is not None:
+            limitador.check(cliente, custo)
+        espera = fila_admissao.acquire(vagas) if fila_admissao is not None else 0.0
+    except Rejected as erro:
+        metrics.ADMISSAO_REJEITADAS.inc(rota=rota, motivo=erro.motivo)
+        raise
+    metrics.ADMISSAO_ESPERA.observe(espera, rota=rota)
+    return espera
+
+
+async def aadmitir(cliente: str, rota: str, custo: float = 1, vagas: int = 1) -> float:
+    """Mesmo que ``admitir`` esperando a vez sem bloquear o event loop."""
+    try:
+        if limitador is not None:
+            limitador.check(cliente, custo)
+        espera = await fila_admissao.aacquire(vagas) if fila_admissao is not None else 0.0
+    except Rejected as erro:
+        metrics.ADMISSAO_REJEITADAS.inc(rota=rota, motivo=erro.motivo)
+        raise
+    metrics.ADMISSAO_ESPERA.observe(espera, rota=rota)
+    return espera
+
+
+def liberar(vagas: int = 1):
+    if fila_admissao is not None:
+        fila_admissao.release(vagas)
+
+
+def resposta_recusada(erro: Rejected) -> tuple:
+    """Corpo, status e cabeçalhos da recusa da admissão."""
+    return {"erro": str(erro)}, erro.status, {"Retry-After": str(erro.retry_after)}
+
+
+def cabecalho_espera(espera: float) -> str:
+    """Valor de X-Queue-Wait-Ms: quanto a pergunta esperou na fila de admissão."""
+    return str(round(espera * 1000))
+
+
+def evento_sse(dados: dict, evento: str = None) -> str:
+    """Formata um evento Server-Sent Events com payload JSON."""
+    linha = f"event: {evento}\n" if evento else ""
+    return linha + f"data: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+
+@pergunta_bp.before_request
+def iniciar_medicao():
+    g.inicio_requisicao = time.perf_counter()
+
+
+@pergunta_bp.before_request
+def admitir_requisicao():
+    """Limite por cliente e fila de admissão antes das rotas que chamam o LLM."""
+    rota = request.url_rule.rule if request.url_rule is not None else None
+    if request.method != "POST" or rota not in ROTAS_ADMITIDAS:
+        return None
+    cliente = client_address(request.remote_addr, request.headers.get("X-Forwarded-For"))
+    custo, vagas = custo_admissao(rota, request.get_json(silent=True))
+    try:
+        g.espera_admissao = admitir(cliente, rota, custo, vagas)
+        g.vagas_admissao = vagas
+    except Rejected as erro:
+        corpo, status, headers = resposta_recusada(erro)
+        return jsonify(corpo), status, headers
+    return None
+
+
+@pergunta_bp.after_request
+def liberar_admissao(response):
+    """Devolve a vaga quando a resposta termina de sair (no streaming, no fim do stream)."""
+    espera = g.pop("espera_admissao", None)
+    if espera is not None:
+        response.headers["X-Queue-Wait-Ms"] = cabecalho_espera(espera)
+        response.call_on_close(functools.partial(liberar, g.pop("vagas_admissao", 1)))
+    return response
+
+
+@pergunta_bp.after_request
+def registrar_medicao(response):
+    """Duração da requisição até o último byte (no streaming, até o fim do SSE)."""
+    if metrics.enabled() and request.url_rule is not None:
+        inicio, rota, status = g.inicio_requisicao, request.url_rule.rule, str(response.status_code)
+        response.call_on_close(
+            lambda: metrics.HTTP.observe(time.perf_counter() - inicio, rota=rota, status=status)
+        )
+    return response
+
+
+@pergunta_bp.route('/status', methods=['GET'])
+def status():
+    """Readiness: 200 quando o chatbot está pronto para responder, 503 enquanto carrega."""
+    dados = status_chatbot()
+    return jsonify(dados), 200 if dados["pronto"] else 503
+
+
+@pergunta_bp.route('/stats', methods=['GET'])
+def stats():
+    """Contadores do chatbot (cache de respostas, perguntas barradas pela busca sem chamar o LLM)."""
+    if chatbot is None:
+        return jsonify(resposta_indisponivel()), 503
+    return jsonify(chatbot.stats()), 200
+
 
 @pergunta_bp.route('/', methods=['POST'])
 def perguntar():
-    data = request.get_json()
+    data = request.get_json(silent=True)
+
+    erro = validar_pergunta(data)
+    if erro:
+        return jsonify({"erro": erro}), 400
 
-    if not data or 'pergunta' not in data:
-        return jsonify({"erro": "Campo 'pergunta' é obrigatório"}), 400
+    bot = chatbot_disponivel()
+    if bot is None:
+        return jsonify(resposta_indisponivel()), 503, {"Retry-After": "5"}
 
     pergunta = data['pergunta']
-    resposta = chatbot.chat(pergunta)
+    resposta = bot.chat(pergunta)
 
     return jsonify({"resposta": resposta}), 200
 
+
+@pergunta_bp.route('/stream', methods=['POST'])
+def perguntar_stream():
+    data = request.get_json(silent=True)
+
+    erro = validar_pergunta(data)
+    if erro:
+        return jsonify({"erro": erro}), 400
+
+    bot = chatbot_disponivel()
+    if bot is None:
+        return jsonify(resposta_indisponivel()), 503, {"Retry-After": "5"}
+
+    pergunta = data['pergunta']
+
+    def gerar():
+        try:
+            for token in bot.chat_stream(pergunta):
+                yield evento_sse({"token": token})
+        except Exception:
+            yield evento_sse({"erro": "Desculpe, a resposta foi interrompida. Por favor, tente novamente."}, "erro")
+        yield evento_sse({}, "fim")
+
+    headers = {
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # evita buffer em proxies (nginx)
+    }
+    return Response(stream_with_context(gerar()), mimetype="text/event-stream", headers=headers)
+
+
+@pergunta_bp.route('/batch', methods=['POST'])
+def perguntar_lote():
+    """Várias perguntas de uma vez: {"perguntas": [...]} -> {"respostas": [...]} na mesma ordem.
+
+    Com "stream": true responde NDJSON, uma linha {"indice", "resposta"} por
+    pergunta conforme ficam prontas. "cache": false ignora o cache de respostas.
+    """
+    data = request.get_json(silent=True)
+
+    erro = validar_lote(data)
+    if erro:
+        return jsonify({"erro": erro}), 400
+
+    bot = chatbot_disponivel()
+    if bot is None:
+        return jsonify(resposta_indisponivel()), 503, {"Retry-After": "5"}
+
+    perguntas, parametros = data['perguntas'], parametros_lote(data)
+    if not data.get('stream'):
+        return jsonify({"respostas": bot.chat_batch(perguntas, **parametros)}), 200
+
+    def gerar():
+        for posicao, resposta in bot.chat_batch_stream(perguntas, **parametros):
+            yield linha_ndjson(posicao, resposta)
+
+    return Response(stream_with_context(gerar()), mimetype="application/x-ndjson",
+                    headers={"X-Accel-Buffering": "no"})
@@ -0,0 +1,295 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Optional, Tuple
+
+# Controle de admissão na frente do chatbot:
+#
+# - RateLimiter: token bucket por cliente (IP). Cada pergunta gasta uma ficha;
+#   o balde enche a RATE_LIMIT_PER_MIN por minuto até RATE_LIMIT_BURST. Sem
+#   ficha o pedido volta na hora com 429 e Retry-After. Um lote gasta uma ficha
+#   por pergunta: com o balde cheio ele passa mesmo acima do burst, e o balde
+#   fica negativo, mas no máximo ``-capacidade``: depois de um lote de milhares
+#   de perguntas o cliente espera 2 x burst / taxa, não horas (atrás de um
+#   proxy sem RATE_LIMIT_TRUST_PROXY o "cliente" seria todo mundo).
+# - AdmissionQueue: no máximo ADMISSION_MAX_INFLIGHT perguntas em andamento no
+#   processo (um lote ocupa uma vaga por pergunta simultânea); as seguintes
+#   esperam em fila (até ADMISSION_MAX_QUEUE, por até ADMISSION_QUEUE_TIMEOUT_S).
+#   Fila cheia ou espera estourada: 503.
+#
+# Os baldes ficam no processo (MemoryBucketBackend) ou num Redis compartilhado
+# entre workers e instâncias (RATE_LIMIT_BACKEND=redis). A fila é sempre do
+# processo: ela protege os workers deste processo e a cota do LLM.
+
+
+class Rejected(Exception):
+    """Pedido recusado: status HTTP (429/503), motivo e Retry-After em segundos."""
+
+    MENSAGENS = {
+        "taxa": "Muitas perguntas em pouco tempo. Tente novamente em alguns segundos.",
+        "fila_cheia": "Servidor ocupado. Tente novamente em alguns segundos.",
+        "espera": "Servidor ocupado. Tente novamente em alguns segundos.",
+    }
+
+    def __init__(self, status: int, motivo: str, retry_after: float):
+        super().__init__(self.MENSAGENS[motivo])
+        self.status = status
+        self.motivo = motivo
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class MemoryBucketBackend:
+    """Baldes no próprio processo; os menos usados saem acima de ``max_chaves``.
+
+    Tirar um balde parado não muda nada: parado tempo suficiente ele estaria
+    cheio, que é como um balde novo começa.
+    """
+
+    def __init__(self, max_chaves: int = 100_000):
+        self.max_chaves = max_chaves
+        self._baldes = OrderedDict()  # chave -> (fichas, instante)
+        self._lock = threading.Lock()
+
+    def take(self, chave: str, taxa: float, capacidade: float, custo: float = 1.0) -> Tuple[bool, float, float]:
+        """Tira ``custo`` fichas do balde: (permitido, fichas restantes, segundos até haver fichas).
+
+        Custo acima da capacidade passa com o balde cheio e deixa as fichas
+        negativas, até ``-capacidade``.
+        """
+        agora = time.monotonic()
+        with self._lock:
+            fichas, instante = self._baldes.pop(chave, (capacidade, agora))
+            fichas = min(capacidade, fichas + (agora - instante) * taxa)
+            necessario = min(custo, capacidade)
+            permitido = fichas >= necessario
+            if permitido:
+                fichas = max(fichas - custo, -capacidade)
+            self._baldes[chave] = (fichas, agora)
+            if len(self._baldes) > self.max_chaves:
+                self._baldes.popitem(last=False)
+        return permitido, fichas, 0.0 if permitido else (necessario - fichas) / taxa
+
+
+class RedisBucketBackend:
+    """Baldes num Redis, compartilhados entre workers e instâncias (script Lua atômico).
+
+    ``cliente`` é um ``redis.Redis`` (ou qualquer objeto com ``register_script``).
+    """
+
+    SCRIPT = """
+local taxa, capacidade, custo = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local t = redis.call('TIME')
+local agora = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local balde = redis.call('HMGET', KEYS[1], 'fichas', 'instante')
+local fichas = tonumber(balde[1]) or capacidade
+local instante = tonumber(balde[2]) or agora
+fichas = math.min(capacidade, fichas + math.max(0, agora - instante) * taxa)
+local necessario = math.min(custo, capacidade)
+local permitido, espera = 0, 0
+if fichas >= necessario then
+  fichas = math.max(fichas - custo, -capacidade)
+  permitido = 1
+else
+  espera = (necessario - fichas) / taxa
+end
+redis.call('HSET', KEYS[1], 'fichas', tostring(fichas), 'instante', tostring(agora))
+redis.call('EXPIRE', KEYS[1], math.ceil((capacidade - fichas) / taxa) + 1)
+return {permitido, tostring(fichas), tostring(espera)}
+"""
+
+    def __init__(self, cliente, prefixo: str = "chatbot:ratelimit:"):
+        self.prefixo = prefixo
+        self._script = cliente.register_script(self.SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBucketBackend":
+        import redis  # opcional: só com RATE_LIMIT_BACKEND=redis
+
+        return cls(redis.Redis.from_url(url, socket_timeout=0.5))
+
+    def take(self, chave: str, taxa: float, capacidade: float, custo: float = 1.0) -> Tuple[bool, float, float]:
+        permitido, fichas, espera = self._script(keys=[self.prefixo + chave], args=[taxa, capacidade, custo])
+        return bool(int(permitido)), float(fichas), float(espera)
+
+
+class RateLimiter:
+    """Token bucket por cliente: ``por_minuto`` perguntas de média, rajadas de até ``rajada``."""
+
+    def __init__(self, por_minuto: float, rajada: float, backend=None):
+        self.taxa = por_minuto / 60.0
+        self.capacidade = max(1.0, float(rajada))
+        self.backend = backend or MemoryBucketBackend()
+        self._ultimo_aviso = 0.0
+
+    @classmethod
+    def from_env(cls) -> Optional["RateLimiter"]:
+        """Limitador conforme RATE_LIMIT_*, ou None com RATE_LIMIT_PER_MIN=0."""
+        por_minuto = float(os.getenv("RATE_LIMIT_PER_MIN", "30"))
+        if por_minuto <= 0:
+            return None
+        backend = None
+        if os.getenv("RATE_LIMIT_BACKEND", "memory") == "redis":
+            backend = RedisBucketBackend.from_url(os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0"))
+        return cls(por_minuto, float(os.getenv("RATE_LIMIT_BURST", "10")), backend)
+
+    def check(self, cliente: str, custo: float = 1.0) -> float:
+        """Gasta ``custo`` fichas do cliente e devolve as restantes; sem ficha lança Rejected (429)."""
+        try:
+            permitido, fichas, espera = self.backend.take(cliente, self.taxa, self.capacidade, custo)
+        except Exception as e:
+            # Backend fora do ar não derruba o chatbot: a pergunta passa sem limite
+            if time.monotonic() - self._ultimo_aviso > 60:
+                self._ultimo_aviso = time.monotonic()
+                print(f"[⚠️] Limite por cliente indisponível, seguindo sem limite: {e}")
+            return self.capacidade
+        if not permitido:
+            raise Rejected(429, "taxa", espera)
+        return fichas
+
+
+class _Vez:
+    """Lugar na fila de admissão; ``concedida`` muda (sob o lock da fila) quando as vagas são repassadas."""
+
+    __slots__ = ("vagas", "concedida", "evento", "loop", "futuro")
+
+    def __init__(self, vagas: int = 1, loop=None):
+        self.vagas = vagas
+        self.concedida = False
+        self.loop = loop
+        self.evento = None if loop else threading.Event()
+        self.futuro = loop.create_future() if loop else None
+
+    def conceder(self):
+        self.concedida = True
+        if self.loop is None:
+            self.evento.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolver)
+
+    def _resolver(self):
+        if not self.futuro.done():
+            self.futuro.set_result(None)
+
+
+class AdmissionQueue:
+    """No máximo ``max_andamento`` perguntas em andamento; as demais esperam em ordem de chegada.
+
+    A mesma fila serve threads (``acquire``) e o event loop (``aacquire``), já
+    que no modo ASGI as rotas do Flask rodam em threads no mesmo processo.
+    Um pedido pode ocupar várias ``vagas`` (um lote, uma por pergunta
+    simultânea). Ao liberar, as vagas passam direto para o primeiro da fila,
+    que só entra quando couber inteiro.
+    """
+
+    def __init__(self, max_andamento: int, max_fila: int, espera_max: float):
+        self.max_andamento = max_andamento
+        self.max_fila = max_fila
+        self.espera_max = espera_max
+        self._andamento = 0
+        self._fila = deque()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["AdmissionQueue"]:
+        """Fila conforme ADMISSION_*, ou None com ADMISSION_MAX_INFLIGHT=0."""
+        max_andamento = int(os.getenv("ADMISSION_MAX_INFLIGHT", "32"))
+        if max_andamento <= 0:
+            return None
+        return cls(max_andamento, int(os.getenv("ADMISSION_MAX_QUEUE", "128")),
+                   float(os.getenv("ADMISSION_QUEUE_TIMEOUT_S", "10")))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"andamento": self._andamento, "fila": len(self._fila)}
+
+    def vagas(self, pedidas: int) -> int:
+        """Vagas que um pedido ocupa: entre 1 e ``max_andamento``."""
+        return max(1, min(int(pedidas), self.max_andamento))
+
+    def _entrar(self, vagas: int, loop=None) -> Optional[_Vez]:
+        """Vagas imediatas (None) ou lugar na fila; fila cheia lança Rejected (503)."""
+        with self._lock:
+            if self._andamento + vagas <= self.max_andamento and not self._fila:
+                self._andamento += vagas
+                return None
+            if len(self._fila) >= self.max_fila:
+                raise Rejected(503, "fila_cheia", 1)
+            vez = _Vez(vagas, loop)
+            self._fila.append(vez)
+            return vez
+
+    def _repassar(self):
+        """Concede as vagas livres aos primeiros da fila, em ordem (chamado sob o lock)."""
+        while self._fila and self._andamento + self._fila[0].vagas <= self.max_andamento:
+            vez = self._fila.popleft()
+            self._andamento += vez.vagas
+            vez.conceder()
+
+    def _desistir(self, vez: _Vez) -> bool:
+        """Sai da fila; False se as vagas já tinham sido concedidas (e agora são de quem desistiu)."""
+        with self._lock:
+            if vez.concedida:
+                return False
+            self._fila.remove(vez)
+            self._repassar()  # um lote esperando na frente pode estar segurando os de trás
+            return True
+
+    def acquire(self, vagas: int = 1) -> float:
+        """Espera a vez (bloqueia a thread) e devolve os segundos na fila."""
+        inicio = time.perf_counter()
+        vez = self._entrar(self.vagas(vagas))
+        if vez is not None and not vez.evento.wait(self.espera_max) and self._desistir(vez):
+            raise Rejected(503, "espera", 1)
+        return time.perf_counter() - inicio
+
+    async def aacquire(self, vagas: int = 1) -> float:
+        """Mesmo que ``acquire`` sem bloquear o event loop."""
+        inicio = time.perf_counter()
+        vez = self._entrar(self.vagas(vagas), asyncio.get_running_loop())
+        if vez is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(vez.futuro), self.espera_max)
+            except asyncio.TimeoutError:
+                if self._desistir(vez):
+                    raise Rejected(503, "espera", 1)
+            except asyncio.CancelledError:
+                # Cliente desconectou: se a vaga chegou junto com o cancelamento, devolve
+                if not self._desistir(vez):
+                    self.release(vez.vagas)
+                raise
+        return time.perf_counter() - inicio
+
+    def release(self, vagas: int = 1):
+        """Devolve as vagas de quem foi admitido (o mesmo ``vagas`` passado em ``acquire``)."""
+        with self._lock:
+            self._andamento -= self.vagas(vagas)
+            self._repassar()
+
+
+_avisou_proxy = False
+
+
+def client_address(remote_addr: Optional[str], forwarded_for: Optional[str]) -> str:
+    """IP do cliente; com RATE_LIMIT_TRUST_PROXY=N usa o N-ésimo endereço do fim do X-Forwarded-For.
+
+    Só confie no cabeçalho atrás de proxies que o reescrevem (Render, Heroku,
+    nginx), senão qualquer cliente escolhe o próprio IP. Com
+    RATE_LIMIT_TRUST_PROXY=0 e o cabeçalho presente, avisa uma vez: atrás do
+    roteador de uma PaaS todo pedido chega do IP do roteador, e todos os
+    clientes dividiriam um balde só.
+    """
+    global _avisou_proxy
+    proxies = int(os.getenv("RATE_LIMIT_TRUST_PROXY", "0"))
+    if proxies > 0 and forwarded_for:
+        enderecos = [e.strip() for e in forwarded_for.split(",") if e.strip()]
+        if enderecos:
+            return enderecos[-min(proxies, len(enderecos))]
+    elif forwarded_for and not _avisou_proxy:
+        _avisou_proxy = True
+        print(f"[⚠️] Pedido de {remote_addr} com X-Forwarded-For e RATE_LIMIT_TRUST_PROXY=0: o limite por "
+              f"cliente usa o IP do proxy para todos. Atrás de um proxy, configure RATE_LIMIT_TRUST_PROXY=1.")
+    return remote_addr or "desconhecido"
+
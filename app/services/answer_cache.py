@@ -0,0 +1,236 @@
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+
+def normalizar_pergunta(texto: str) -> str:
+    """Normaliza a pergunta: minúsculas, sem acentos, sem pontuação e espaços únicos."""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = re.sub(r"[^\w\s]", " ", texto)
+    return " ".join(texto.split())
+
+
+class AnswerCache:
+    """Cache de respostas do chatbot com busca exata e semântica.
+
+    Primeiro procura a pergunta normalizada; com ``threshold``, se não achar,
+    compara o embedding da pergunta com os das respostas guardadas. Sem
+    ``threshold`` (o padrão) a busca é só exata: no e5-small "quando abrem as
+    inscrições?" e "quando encerram as inscrições?" passam de 0.95 e
+    receberiam a mesma resposta. As entradas expiram pelo TTL e as menos
+    usadas saem quando o limite de tamanho é atingido.
+    """
+
+    def __init__(
+        self,
+        embeddings=None,
+        max_size: int = 256,
+        ttl: float = 3600,
+        threshold: Optional[float] = None,
+        persist_path: Optional[Path] = None,
+        fingerprint: str = "",
+    ):
+        self.embeddings = embeddings
+        self.max_size = max_size
+        self.ttl = ttl
+        self.threshold = threshold
+        self.persist_path = Path(persist_path) if persist_path else None
+        self.fingerprint = fingerprint
+
+        self._entries = OrderedDict()  # chave -> {"resposta", "criado", "vetor"}
+        self._vetores_recentes = OrderedDict()  # chave -> vetor da última consulta
+        self._matriz = None
+        self._chaves_matriz = []
+        self._lock = threading.RLock()
+        self._ultimo_save = 0.0
+        self.hits_exatos = 0
+        self.hits_semanticos = 0
+        self.misses = 0
+
+        self._load()
+
+    # ------------------------------------------------------------------ consulta
+
+    def get(self, question: str, vetor: Optional[np.ndarray] = None) -> Optional[str]:
+        """Retorna a resposta em cache para a pergunta ou None (``vetor``: de ``vectors``)."""
+        chave = normalizar_pergunta(question)
+        if not chave:
+            return None
+
+        with self._lock:
+            self._expirar()
+            entrada = self._entries.get(chave)
+            if entrada is not None:
+                self._entries.move_to_end(chave)
+                self.hits_exatos += 1
+                return entrada["resposta"]
+
+        if not self._semantico():
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if vetor is None:
+            vetor = self._vetor(chave)
+        with self._lock:
+            similar = self._buscar_semantico(vetor)
+            if similar is not None:
+                self._entries.move_to_end(similar)
+                self.hits_semanticos += 1
+                return self._entries[similar]["resposta"]
+            self.misses += 1
+        return None
+
+    def put(self, question: str, answer: str, vetor: Optional[np.ndarray] = None):
+        """Guarda a resposta da pergunta, descartando a menos usada se estiver cheio."""
+        chave = normalizar_pergunta(question)
+        if not chave or not answer:
+            return
+
+        if vetor is None and self._semantico():
+            vetor = self._vetor(chave)
+        with self._lock:
+            self._entries[chave] = {"resposta": answer, "criado": time.time(), "vetor": vetor}
+            self._entries.move_to_end(chave)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._matriz = None
+
+        if self.persist_path and time.time() - self._ultimo_save > 30:
+            self.save()
+
+    def invalidate(self, fingerprint: Optional[str] = None):
+        """Esvazia o cache (ex.: depois de reconstruir o índice FAISS)."""
+        with self._lock:
+            self._entries.clear()
+            self._matriz = None
+            if fingerprint is not None:
+                self.fingerprint = fingerprint
+        if self.persist_path:
+            self.save()
+
+    def vectors(self, questions: List[str]) -> List[Optional[np.ndarray]]:
+        """Vetores de várias perguntas numa chamada só ao modelo, para get/put de um lote."""
+        if not self._semantico() or not questions:
+            return [None] * len(questions)
+        chaves = [normalizar_pergunta(q) for q in questions]
+        embed = getattr(self.embeddings, "embed_queries", self.embeddings.embed_documents)
+        matriz = np.asarray(embed(chaves), dtype=np.float32)
+        normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+        return list(matriz / np.where(normas > 0, normas, 1.0))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entradas": len(self._entries),
+                "hits_exatos": self.hits_exatos,
+                "hits_semanticos": self.hits_semanticos,
+                "misses": self.misses,
+            }
+
+    # ------------------------------------------------------------------ internos
+
+    def _semantico(self) -> bool:
+        return self.embeddings is not None and self.threshold is not None
+
+    def _vetor(self, chave: str) -> np.ndarray:
+        """Embedding normalizado da pergunta, reaproveitado entre get e put."""
+        with self._lock:
+            vetor = self._vetores_recentes.get(chave)
+        if vetor is None:
+            vetor = np.asarray(self.embeddings.embed_query(chave), dtype=np.float32)
+            norma = np.linalg.norm(vetor)
+            if norma > 0:
+                vetor = vetor / norma
+            with self._lock:
+                self._vetores_recentes[chave] = vetor
+                while len(self._vetores_recentes) > 64:
+                    self._vetores_recentes.popitem(last=False)
+        return vetor
+
+    def _buscar_semantico(self, vetor: np.ndarray) -> Optional[str]:
+        if self._matriz is None:
+            self._chaves_matriz = [k for k, e in self._entries.items() if e["vetor"] is not None]
+            if not self._chaves_matriz:
+                return None
+            self._matriz = np.vstack([self._entries[k]["vetor"] for k in self._chaves_matriz])
+
+        if not self._chaves_matriz:
+            return None
+
+        similaridades = self._matriz @ vetor
+        melhor = int(np.argmax(similaridades))
+        if similaridades[melhor] >= self.threshold:
+            return self._chaves_matriz[melhor]
+        return None
+
+    def _expirar(self):
+        limite = time.time() - self.ttl
+        expiradas = [k for k, e in self._entries.items() if e["criado"] < limite]
+        for chave in expiradas:
+            del self._entries[chave]
+        if expiradas:
+            self._matriz = None
+
+    # ------------------------------------------------------------------ disco
+
+    def save(self):
+        """Grava o cache em disco de forma atômica."""
+        if not self.persist_path:
+            return
+        with self._lock:
+            dados = {
+                "fingerprint": self.fingerprint,
+                "entradas": [
+                    {
+                        "chave": chave,
+                        "resposta": e["resposta"],
+                        "criado": e["criado"],
+                        "vetor": e["vetor"].tolist() if e["vetor"] is not None else None,
+                    }
+                    for chave, e in self._entries.items()
+                ],
+            }
+            self._ultimo_save = time.time()
+
+        try:
+            self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.persist_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(dados, f, ensure_ascii=False)
+            os.replace(tmp, self.persist_path)
+        except Exception as e:
+            print(f"⚠️ Erro ao salvar cache de respostas: {str(e)}")
+
+    def _load(self):
+        if not self.persist_path or not self.persist_path.exists():
+            return
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                dados = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Erro ao ler cache de respostas: {str(e)}")
+            return
+
+        if dados.get("fingerprint") != self.fingerprint:
+            print("🔁 Índice mudou desde o último cache de respostas; descartando.")
+            return
+
+        limite = time.time() - self.ttl
+        for e in dados.get("entradas", []):
+            if e["criado"] < limite:
+                continue
+            vetor = np.asarray(e["vetor"], dtype=np.float32) if e.get("vetor") is not None else None
+            self._entries[e["chave"]] = {"resposta": e["resposta"], "criado": e["criado"], "vetor": vetor}
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        print(f"📦 Cache de respostas carregado com {len(self._entries)} entradas.")
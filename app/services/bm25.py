@@ -0,0 +1,149 @@
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+from langchain_core.documents import Document
+
+from app.services.answer_cache import normalizar_pergunta
+
+BM25_FILE = "bm25.npz"
+
+# Palavras muito frequentes que só somariam ruído ao placar
+STOPWORDS = frozenset("""
+a ao aos as com como da das de del do dos e ela ele em entre essa esse esta este eu foi ha isso
+ja mais mas me na nas no nos o os ou para pela pelas pelo pelos por qual quais quando que quem
+se sem ser seu sua sao tem um uma umas uns voce
+""".split())
+
+
+def tokenizar(texto: str) -> List[str]:
+    """Termos do texto: normalizados como as perguntas (sem acento/pontuação), sem stopwords."""
+    return [t for t in normalizar_pergunta(texto).split() if t not in STOPWORDS and (len(t) > 1 or t.isdigit())]
+
+
+class BM25Index:
+    """Índice invertido BM25 compacto sobre os mesmos chunks do FAISS.
+
+    As postings ficam em formato CSR (``inicio`` por termo, ``docs`` e
+    ``pesos``) com o peso BM25 de cada par termo/chunk já calculado, então a
+    consulta é só somar os pesos dos termos da pergunta e pegar os maiores.
+    """
+
+    def __init__(self, vocab: Iterable[str], inicio: np.ndarray, docs: np.ndarray, pesos: np.ndarray,
+                 doc_ids: List[str]):
+        self.vocab = {termo: i for i, termo in enumerate(vocab)}
+        self.inicio = inicio
+        self.docs = docs
+        self.pesos = pesos
+        self.doc_ids = doc_ids
+        self._posicoes = {doc_id: i for i, doc_id in enumerate(doc_ids)}
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @classmethod
+    def from_documents(cls, documentos: Dict[str, Document], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        doc_ids = list(documentos)
+        termos_doc = [tokenizar(doc.page_content) for doc in documentos.values()]
+        tamanhos = np.array([len(t) for t in termos_doc], dtype=np.float32)
+        media = float(tamanhos.mean()) if len(tamanhos) and tamanhos.mean() > 0 else 1.0
+
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for posicao, termos in enumerate(termos_doc):
+            contagem: Dict[str, int] = {}
+            for termo in termos:
+                contagem[termo] = contagem.get(termo, 0) + 1
+            for termo, tf in contagem.items():
+                postings.setdefault(termo, []).append((posicao, tf))
+
+        vocab = sorted(postings)
+        inicio = np.zeros(len(vocab) + 1, dtype=np.int64)
+        docs, pesos = [], []
+        n = len(doc_ids)
+        for i, termo in enumerate(vocab):
+            lista = postings[termo]
+            idf = np.log(1 + (n - len(lista) + 0.5) / (len(lista) + 0.5))
+            for posicao, tf in lista:
+                norma = k1 * (1 - b + b * tamanhos[posicao] / media)
+                docs.append(posicao)
+                pesos.append(idf * tf * (k1 + 1) / (tf + norma))
+            inicio[i + 1] = len(docs)
+
+        return cls(vocab, inicio, np.asarray(docs, dtype=np.int32), np.asarray(pesos, dtype=np.float32), doc_ids)
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore) -> "BM25Index":
+        documentos = {}
+        for doc_id in vectorstore.index_to_docstore_id.values():
+            doc = vectorstore.docstore.search(doc_id)
+            if isinstance(doc, Document):
+                documentos[doc_id] = doc
+        return cls.from_documents(documentos)
+
+    def search(self, consulta: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Os ``k`` chunks com maior placar BM25 para a consulta: [(doc_id, placar)]."""
+        termos = [self.vocab[t] for t in dict.fromkeys(tokenizar(consulta)) if t in self.vocab]
+        if not termos:
+            return []
+
+        placar = np.zeros(len(self.doc_ids), dtype=np.float32)
+        for termo in termos:
+            fatia = slice(self.inicio[termo], self.inicio[termo + 1])
+            placar[self.docs[fatia]] += self.pesos[fatia]  # cada chunk aparece uma vez por termo
+
+        candidatos = np.flatnonzero(placar)
+        if len(candidatos) > k:
+            candidatos = candidatos[np.argpartition(-placar[candidatos], k - 1)[:k]]
+        candidatos = candidatos[np.argsort(-placar[candidatos], kind="stable")]
+        return [(self.doc_ids[i], float(placar[i])) for i in candidatos]
+
+    def coverage(self, consulta: str, doc_id: str) -> float:
+        """Fração dos termos da consulta, pesados pelo idf, que aparecem no chunk (0 a 1).
+
+        Termos que não existem no índice contam com o idf máximo: "Copa do
+        Mundo de 2002" casa só "mundo" e fica longe de 1, enquanto "telefone
+        do Seprosc" casa tudo num chunk só.
+        """
+        termos = list(dict.fromkeys(tokenizar(consulta)))
+        if not termos or doc_id not in self._posicoes:
+            return 0.0
+        posicao = self._posicoes[doc_id]
+        n = len(self.doc_ids)
+        total = casado = 0.0
+        for termo in termos:
+            i = self.vocab.get(termo)
+            postings = self.docs[self.inicio[i]:self.inicio[i + 1]] if i is not None else self.docs[:0]
+            idf = float(np.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5)))
+            total += idf
+            if posicao in postings:
+                casado += idf
+        return casado / total
+
+    def save(self, arquivo: Union[str, Path]):
+        """Grava num temporário e troca com os.replace, como o resto do índice."""
+        arquivo = Path(arquivo)
+        temporario = arquivo.with_name(f"{arquivo.name}.{os.getpid()}.tmp")
+        with open(temporario, "wb") as f:
+            np.savez_compressed(
+                f,
+                vocab=np.array(sorted(self.vocab, key=self.vocab.get), dtype=str),
+                inicio=self.inicio,
+                docs=self.docs,
+                pesos=self.pesos,
+                doc_ids=np.array(self.doc_ids, dtype=str),
+            )
+        os.replace(temporario, arquivo)
+
+    @classmethod
+    def load(cls, arquivo: Union[str, Path]) -> Optional["BM25Index"]:
+        arquivo = Path(arquivo)
+        if not arquivo.exists():
+            return None
+        try:
+            with np.load(arquivo, allow_pickle=False) as dados:
+                return cls(dados["vocab"].tolist(), dados["inicio"], dados["docs"], dados["pesos"],
+                           dados["doc_ids"].tolist())
+        except Exception as e:
+            print(f"⚠️ Índice BM25 inválido em {arquivo}: {str(e)}")
+            return None
@@ -0,0 +1,95 @@
+import math
+import re
+from typing import List
+
+from langchain_core.documents import Document
+
+from app.services.answer_cache import normalizar_pergunta
+
+# Fim de frase ou quebra de linha; o separador fica capturado para remontar o texto
+SEPARADOR_FRASES = re.compile(r"((?<=[.!?])\s+|\n+)")
+
+
+def estimate_tokens(texto: str) -> int:
+    """Estimativa de tokens do LLM (~4 caracteres por token), sem depender do tokenizer."""
+    return math.ceil(len(texto) / 4)
+
+
+def merge_overlap(a: str, b: str, minimo: int = 20):
+    """Junta dois chunks vizinhos do splitter (o fim de ``a`` repete o começo de ``b``).
+
+    Retorna o texto unido, ``a`` se ``b`` já está contido nele, ou None se não
+    há sobreposição de pelo menos ``minimo`` caracteres.
+    """
+    if b in a:
+        return a
+    sonda = b[:minimo]
+    if len(sonda) < minimo:
+        return None
+    posicao = a.find(sonda)
+    while posicao != -1:
+        if b.startswith(a[posicao:]):
+            return a + b[len(a) - posicao:]
+        posicao = a.find(sonda, posicao + 1)
+    return None
+
+
+def _juntar_chunks(textos: List[str]) -> List[str]:
+    """Une os chunks de uma mesma fonte que se sobrepõem (em qualquer ordem)."""
+    blocos = list(textos)
+    unido = True
+    while unido:
+        unido = False
+        for i in range(len(blocos)):
+            for j in range(len(blocos)):
+                if i == j:
+                    continue
+                junto = merge_overlap(blocos[i], blocos[j])
+                if junto is not None:
+                    blocos[i] = junto
+                    del blocos[j]
+                    unido = True
+                    break
+            if unido:
+                break
+    return blocos
+
+
+def build_context(documentos: List[Document], max_tokens: int = 800) -> str:
+    """Monta o {context} do prompt a partir dos chunks recuperados.
+
+    - só o texto (page_content), sem repr de Document/metadados;
+    - chunks da mesma fonte que se sobrepõem (chunk_overlap) viram um bloco só;
+    - frases repetidas (mesmo texto normalizado) aparecem uma vez;
+    - os blocos seguem a ordem da busca e o texto é cortado, em fim de
+      frase, ao chegar em ``max_tokens`` (0 desliga o limite).
+    """
+    fontes = {}
+    for doc in documentos:
+        fontes.setdefault(doc.metadata.get("source"), []).append(doc.page_content.strip())
+
+    vistas = set()
+    blocos = []
+    tokens = 0
+    cheio = False
+    for textos in fontes.values():
+        for bloco in _juntar_chunks(textos):
+            partes = SEPARADOR_FRASES.split(bloco)
+            frases = []
+            for frase, separador in zip(partes[::2], partes[1::2] + [""]):
+                chave = normalizar_pergunta(frase)
+                if not chave or chave in vistas:
+                    continue
+                custo = estimate_tokens(frase + separador)
+                if max_tokens and tokens + custo > max_tokens:
+                    cheio = True
+                    break
+                vistas.add(chave)
+                frases.append(frase + separador)
+                tokens += custo
+            texto = "".join(frases).strip()
+            if texto:
+                blocos.append(texto)
+            if cheio:
+                return "\n\n".join(blocos)
+    return "\n\n".join(blocos)
@@ -0,0 +1,79 @@
+from typing import Optional
+
+import faiss
+import numpy as np
+
+
+def normalize_rows(vetores) -> np.ndarray:
+    """Vetores float32 contíguos com norma 1 (produto interno = cosseno)."""
+    vetores = np.ascontiguousarray(vetores, dtype=np.float32)
+    if vetores.size == 0:
+        return vetores.reshape(len(vetores), -1)
+    normas = np.linalg.norm(vetores, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return vetores / normas
+
+
+def document_vectors(vetores, origem, n_docs: int) -> np.ndarray:
+    """Vetor de cada documento para a deduplicação: soma dos seus chunks menos o vetor médio do corpus.
+
+    Os vetores do e5-small apontam quase todos para o mesmo lado e a média
+    dos chunks de uma página converge para essa direção comum: páginas
+    diferentes do site chegam a 0.99 de cosseno. Sem a parte comum sobra o
+    que cada página tem de próprio, e só cópias ficam perto de 1.
+    """
+    vetores = np.asarray(vetores, dtype=np.float32)
+    documentos = np.zeros((n_docs, vetores.shape[1]), dtype=np.float32)
+    np.add.at(documentos, np.asarray(origem, dtype=np.int64), vetores - vetores.mean(axis=0))
+    return documentos
+
+
+def near_duplicates(vetores, limiar: float, bloco: int = 1024, bloco_colunas: int = 8192,
+                    existentes: Optional[faiss.Index] = None) -> np.ndarray:
+    """Máscara dos vetores a manter depois de remover quase-duplicatas.
+
+    Mesmo critério guloso da versão com matriz completa: percorre em ordem e
+    cada vetor mantido descarta os seguintes com cosseno >= ``limiar``. A
+    busca por raio é feita em ladrilhos de ``bloco`` x ``bloco_colunas`` do
+    triângulo superior (BLAS): a memória fica limitada ao ladrilho e aos pares
+    parecidos (não há matriz n x n) e o laço em Python só visita esses pares.
+
+    ``existentes`` é um índice FAISS já preenchido com vetores normalizados
+    (ex.: o índice atual numa atualização incremental); vetores parecidos com
+    algo dele também são descartados.
+    """
+    vetores = normalize_rows(vetores)
+    n = len(vetores)
+    manter = np.ones(n, dtype=bool)
+    if n == 0:
+        return manter
+
+    if existentes is not None and existentes.ntotal:
+        distancias, _ = existentes.search(vetores, 1)
+        if existentes.metric_type == faiss.METRIC_L2:
+            similaridade = 1 - distancias[:, 0] / 2  # L2 ao quadrado entre vetores unitários
+        else:
+            similaridade = distancias[:, 0]
+        manter &= similaridade < limiar
+
+    for inicio in range(0, n, bloco):
+        fim = min(inicio + bloco, n)
+        linhas, colunas = [], []
+        for coluna in range(inicio, n, bloco_colunas):
+            similaridade = vetores[inicio:fim] @ vetores[coluna:coluna + bloco_colunas].T
+            i, j = np.nonzero(similaridade >= limiar)
+            linhas.append(i + inicio)
+            colunas.append(j + coluna)
+
+        linhas, colunas = np.concatenate(linhas), np.concatenate(colunas)
+        seguintes = colunas > linhas
+        linhas, colunas = linhas[seguintes], colunas[seguintes]
+        ordem = np.argsort(linhas, kind="stable")
+        linhas, colunas = linhas[ordem], colunas[ordem]
+        limites = np.searchsorted(linhas, np.arange(inicio, fim + 1))
+
+        for i in range(inicio, fim):
+            if manter[i] and limites[i - inicio] < limites[i - inicio + 1]:
+                manter[colunas[limites[i - inicio]:limites[i - inicio + 1]]] = False
+
+    return manter
@@ -0,0 +1,175 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+from langchain_huggingface import HuggingFaceEmbeddings
+
+from app.services.answer_cache import normalizar_pergunta
+from app.services.onnx_embeddings import OnnxEmbeddings, onnx_dir
+
+
+def create_base_embeddings() -> Embeddings:
+    """Modelo de embeddings conforme EMBEDDING_BACKEND (torch, onnx ou onnx-int8)."""
+    backend = os.getenv("EMBEDDING_BACKEND", "torch")
+    batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+    threads = int(os.getenv("EMBEDDING_THREADS", "0")) or None
+
+    if backend in ("onnx", "onnx-int8"):
+        print(f"⚙️ Embeddings via ONNX Runtime ({backend})")
+        return OnnxEmbeddings(onnx_dir(), quantizado=backend == "onnx-int8", batch_size=batch_size, threads=threads)
+    if backend != "torch":
+        raise ValueError(f"EMBEDDING_BACKEND inválido: {backend}")
+
+    if threads:
+        import torch  # import pesado, só usado neste backend
+        torch.set_num_threads(threads)
+
+    return HuggingFaceEmbeddings(
+        model_name="intfloat/e5-small",#sentence-transformers/all-MiniLM-L6-v2
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True, 'batch_size': batch_size}
+    )
+
+
+class BatchingEmbeddings(Embeddings):
+    """Camada sobre o modelo de embeddings usada nas consultas.
+
+    - ``embed_query`` de requisições simultâneas é agrupado: uma thread junta
+      as perguntas que chegam em ``wait_ms`` (até ``max_batch``) e roda o
+      modelo uma vez só para o lote;
+    - vetores de consultas ficam num LRU pela pergunta normalizada
+      (normalizar_pergunta), então perguntas repetidas não passam pelo modelo;
+    - ``embed_documents`` (indexação) vai direto para o modelo, que já
+      processa em lotes (batch_size do encode_kwargs);
+    - ``embed_queries`` (perguntas em lote, /pergunta/batch) usa o cache e
+      manda as que faltam ao modelo numa chamada só.
+
+    O modelo base precisa dar o mesmo vetor em ``embed_query`` e em
+    ``embed_documents`` (é o caso do HuggingFaceEmbeddings).
+    """
+
+    def __init__(self, base: Embeddings, max_batch: int = 32, wait_ms: float = 2.0, cache_size: int = 1024):
+        self.base = base
+        self.max_batch = max_batch
+        self.wait_ms = wait_ms
+        self.cache_size = cache_size
+
+        self._cache = OrderedDict()  # pergunta normalizada -> vetor
+        self._lock = threading.Lock()
+        self._fila = None
+        self._thread = None
+        self._pid = None
+        self.hits = 0
+        self.misses = 0
+        self.lotes = 0
+        self.consultas_em_lote = 0
+
+    # ------------------------------------------------------------------ API
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        vetor = self._do_cache(text)
+        if vetor is not None:
+            return vetor
+        return self._enviar(text).result()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        vetor = self._do_cache(text)
+        if vetor is not None:
+            return vetor
+        return await asyncio.wrap_future(self._enviar(text))
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Vetores de várias perguntas numa chamada só ao modelo (as que estão no cache não passam por ele)."""
+        vetores = [self._do_cache(texto) for texto in texts]
+        faltando = list(dict.fromkeys(texto for texto, vetor in zip(texts, vetores) if vetor is None))
+        if faltando:
+            novos = dict(zip(faltando, self.base.embed_documents(faltando)))
+            for texto, vetor in novos.items():
+                self._guardar(texto, vetor)
+            with self._lock:
+                self.lotes += 1
+                self.consultas_em_lote += len(faltando)
+            vetores = [novos[texto] if vetor is None else vetor for texto, vetor in zip(texts, vetores)]
+        return vetores
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "cache_entradas": len(self._cache),
+                "cache_hits": self.hits,
+                "cache_misses": self.misses,
+                "lotes": self.lotes,
+                "media_lote": round(self.consultas_em_lote / self.lotes, 2) if self.lotes else 0.0,
+            }
+
+    # ------------------------------------------------------------------ internos
+
+    def _do_cache(self, text: str):
+        chave = normalizar_pergunta(text)
+        with self._lock:
+            vetor = self._cache.get(chave)
+            if vetor is not None:
+                self._cache.move_to_end(chave)
+                self.hits += 1
+                return vetor
+            self.misses += 1
+        return None
+
+    def _guardar(self, text: str, vetor: List[float]):
+        chave = normalizar_pergunta(text)
+        with self._lock:
+            self._cache[chave] = vetor
+            self._cache.move_to_end(chave)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _enviar(self, text: str) -> Future:
+        future = Future()
+        with self._lock:
+            # Threads não sobrevivem ao fork (gunicorn com preload): recria no worker
+            if self._pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+                self._fila = queue.Queue()
+                self._thread = threading.Thread(target=self._loop, args=(self._fila,), daemon=True,
+                                                name="embedding-batcher")
+                self._thread.start()
+                self._pid = os.getpid()
+            fila = self._fila
+        fila.put((text, future))
+        return future
+
+    def _loop(self, fila: queue.Queue):
+        while True:
+            lote = [fila.get()]
+            limite = time.monotonic() + self.wait_ms / 1000
+            while len(lote) < self.max_batch:
+                restante = limite - time.monotonic()
+                try:
+                    lote.append(fila.get(timeout=restante) if restante > 0 else fila.get_nowait())
+                except queue.Empty:
+                    break
+            self._processar(lote)
+
+    def _processar(self, lote: list):
+        textos = list(dict.fromkeys(texto for texto, _ in lote))
+        try:
+            vetores = dict(zip(textos, self.base.embed_documents(textos)))
+        except Exception as e:
+            for _, future in lote:
+                future.set_exception(e)
+            return
+
+        with self._lock:
+            self.lotes += 1
+            self.consultas_em_lote += len(lote)
+        for texto, future in lote:
+            self._guardar(texto, vetores[texto])
+            future.set_result(vetores[texto])
@@ -0,0 +1,68 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Union
+
+import numpy as np
+
+
+def chunk_hash(texto: str) -> str:
+    """Hash do conteúdo de um chunk (chave para reaproveitar o embedding)."""
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+
+class ChunkEmbeddingStore:
+    """Embeddings já calculados, indexados pelo hash do texto do chunk.
+
+    Persistido num .npz ao lado do índice; numa atualização só os chunks com
+    texto novo passam pelo modelo de embeddings.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._vetores: Dict[str, np.ndarray] = {}
+        if self.path.exists():
+            try:
+                dados = np.load(self.path, allow_pickle=False)
+                self._vetores = dict(zip(dados["hashes"].tolist(), dados["vetores"]))
+            except Exception as e:
+                print(f"⚠️ Erro ao ler embeddings salvos ({str(e)}); recalculando.")
+
+    def __len__(self) -> int:
+        return len(self._vetores)
+
+    def embed(self, textos: List[str], embeddings) -> List[List[float]]:
+        """Embeddings dos textos, calculando só os que ainda não estão guardados."""
+        return self.embed_array(textos, embeddings).tolist()
+
+    def embed_array(self, textos: List[str], embeddings) -> np.ndarray:
+        """Como ``embed``, mas numa matriz float32 (n x dim)."""
+        hashes = [chunk_hash(t) for t in textos]
+        faltando = {}
+        for h, texto in zip(hashes, textos):
+            if h not in self._vetores:
+                faltando.setdefault(h, texto)
+
+        if faltando:
+            novos = embeddings.embed_documents(list(faltando.values()))
+            for h, vetor in zip(faltando, novos):
+                self._vetores[h] = np.asarray(vetor, dtype=np.float32)
+
+        print(f"🧮 Embeddings: {len(textos) - len(faltando)} reaproveitados, {len(faltando)} calculados.")
+        if not hashes:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack([self._vetores[h] for h in hashes])
+
+    def prune(self, hashes_vivos: Iterable[str]):
+        """Descarta vetores de chunks que não estão mais no índice."""
+        vivos = set(hashes_vivos)
+        self._vetores = {h: v for h, v in self._vetores.items() if h in vivos}
+
+    def save(self):
+        hashes = list(self._vetores)
+        vetores = np.vstack([self._vetores[h] for h in hashes]) if hashes else np.zeros((0, 0), dtype=np.float32)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, hashes=np.asarray(hashes, dtype=str), vetores=vetores)
+        os.replace(tmp, self.path)
@@ -0,0 +1,222 @@
+import asyncio
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy, maximal_marginal_relevance
+from pydantic import PrivateAttr
+
+from app.services import metrics
+from app.services.bm25 import BM25Index
+
+
+def cosine_similarity(vectorstore: FAISS, score: float) -> float:
+    """Cosseno a partir do score do FAISS (vetores normalizados, como os do e5-small).
+
+    Com L2 o FAISS devolve a distância ao quadrado: ||a - b||² = 2 - 2·cos.
+    """
+    if vectorstore.distance_strategy == DistanceStrategy.MAX_INNER_PRODUCT:
+        return float(score)
+    return 1.0 - float(score) / 2.0
+
+
+def score_gate_config() -> dict:
+    """``score_threshold``, ``score_margin`` e ``bm25_coverage`` conforme RETRIEVAL_SCORE_THRESHOLD,
+    RETRIEVAL_SCORE_MARGIN e RETRIEVAL_BM25_COVERAGE (0 desliga).
+
+    O filtro vetorial vem desligado: limiar e margem só devem ser ligados
+    depois de calibrados com o modelo nas perguntas reais (benchmarks.bench_limiar).
+    A cobertura do BM25 foi calibrada nas perguntas reais (``bench_limiar --bm25``).
+    """
+    limiar = float(os.getenv("RETRIEVAL_SCORE_THRESHOLD", "0"))
+    margem = float(os.getenv("RETRIEVAL_SCORE_MARGIN", "0"))
+    cobertura = float(os.getenv("RETRIEVAL_BM25_COVERAGE", "0.5"))
+    return {
+        "score_threshold": limiar if limiar > 0 else None,
+        "score_margin": margem if margem > 0 else None,
+        "bm25_coverage": cobertura if cobertura > 0 else None,
+    }
+
+
+class HybridRetriever(BaseRetriever):
+    """Busca híbrida: MMR no FAISS + BM25, fundidos por reciprocal rank fusion.
+
+    Cada lista contribui com ``1 / (rrf_k + posição)`` para o chunk; chunks
+    que aparecem nas duas sobem, e termos exatos (nomes de empresas, datas,
+    "LGPD", telefones) que o e5-small não pega entram pela lista do BM25.
+    Em empate vale a ordem da busca vetorial. Sem ``bm25`` é só a busca vetorial.
+
+    Com ``score_threshold``, os chunks do FAISS com cosseno abaixo do limite
+    são descartados; com ``score_margin``, também os que não passam do cosseno
+    médio da pergunta com o índice por pelo menos essa margem. Se nenhum
+    passar, só os chunks do BM25 que cobrem ao menos ``bm25_coverage`` dos
+    termos da pergunta (pesados pelo idf) entram: um "telefone do Seprosc" que
+    o vetor não pega continua respondido, mas palavras soltas como "programa"
+    ou "mundo" não seguram uma pergunta fora do escopo. Sem nenhum dos dois a
+    pergunta está fora do escopo do site e nada é devolvido. As contagens
+    ficam em ``stats()``.
+
+    A margem existe porque os vetores do e5-small apontam quase todos para o
+    mesmo lado: qualquer texto tem cosseno alto com todos os chunks, e só o
+    quanto o melhor chunk se destaca da média separa o assunto do site.
+    """
+
+    vectorstore: FAISS
+    bm25: Optional[BM25Index] = None
+    k: int = 3
+    fetch_k: int = 20
+    candidatos: int = 10
+    rrf_k: int = 60
+    score_threshold: Optional[float] = None
+    score_margin: Optional[float] = None
+    bm25_coverage: Optional[float] = None
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _media: Optional[np.ndarray] = PrivateAttr(default=None)
+    _aprovadas: int = PrivateAttr(default=0)
+    _bloqueadas: int = PrivateAttr(default=0)
+    _pelo_bm25: int = PrivateAttr(default=0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._aprovadas + self._bloqueadas
+            return {
+                "limiar": self.score_threshold,
+                "margem": self.score_margin,
+                "cobertura_bm25": self.bm25_coverage,
+                "consultas": total,
+                "aprovadas": self._aprovadas,
+                "pelo_bm25": self._pelo_bm25,  # aprovadas só pelo BM25, com o filtro vetorial barrando todos
+                "bloqueadas": self._bloqueadas,  # chamadas ao LLM evitadas
+                "taxa_bloqueio": round(self._bloqueadas / total, 4) if total else 0.0,
+            }
+
+    def _vetor_medio(self) -> np.ndarray:
+        """Média dos vetores do índice, calculada na primeira pergunta (cada versão do índice tem o seu retriever)."""
+        if self._media is None:
+            index = self.vectorstore.index
+            soma = np.zeros(index.d, dtype=np.float64)
+            for inicio in range(0, index.ntotal, 10_000):
+                soma += index.reconstruct_n(inicio, min(10_000, index.ntotal - inicio)).sum(axis=0)
+            self._media = (soma / max(1, index.ntotal)).astype(np.float32)
+        return self._media
+
+    def _filtrar(self, resultados: List[Tuple[Document, float]], vetor: List[float]) -> List[Document]:
+        if self.score_threshold is None and self.score_margin is None:
+            return [doc for doc, _ in resultados]
+
+        minimo = self.score_threshold if self.score_threshold is not None else -1.0
+        if self.score_margin is not None:
+            # Cosseno médio da pergunta com todos os chunks = produto com o vetor médio
+            consulta = np.asarray(vetor, dtype=np.float32)
+            media = float(self._vetor_medio() @ consulta) / (float(np.linalg.norm(consulta)) or 1.0)
+            minimo = max(minimo, media + self.score_margin)
+        return [doc for doc, score in resultados if cosine_similarity(self.vectorstore, score) >= minimo]
+
+    def _buscar_vetorial(self, vetor: List[float]) -> List[Tuple[Document, float]]:
+        return self._buscar_vetoriais([vetor])[0]
+
+    def _buscar_vetoriais(self, vetores: List[List[float]]) -> List[List[Tuple[Document, float]]]:
+        """Mesmo MMR de ``max_marginal_relevance_search_with_score_by_vector``, com a
+        busca no FAISS (uma só para todas as consultas) e a seleção MMR medidas separadamente."""
+        consultas = np.array(vetores, dtype=np.float32)
+        with metrics.ETAPA.time(etapa="faiss"):
+            scores, indices = self.vectorstore.index.search(consultas, self.fetch_k)
+
+        todos = []
+        for linha, consulta in enumerate(consultas):
+            with metrics.ETAPA.time(etapa="mmr"):
+                validos = [int(i) for i in indices[linha] if i != -1]  # -1: menos vetores que fetch_k
+                candidatos = [self.vectorstore.index.reconstruct(i) for i in validos]
+                selecionados = maximal_marginal_relevance(consulta[None, :], candidatos, k=self.candidatos,
+                                                          lambda_mult=0.5)
+
+            resultados = []
+            for posicao in selecionados:
+                doc_id = self.vectorstore.index_to_docstore_id[validos[posicao]]
+                doc = self.vectorstore.docstore.search(doc_id)
+                if not isinstance(doc, Document):
+                    raise ValueError(f"documento {doc_id} não encontrado no docstore")
+                resultados.append((doc, scores[linha][posicao]))
+            todos.append(resultados)
+        return todos
+
+    def _recuperar(self, resultados: List[Tuple[Document, float]], vetor: List[float], consulta: str) -> List[Document]:
+        """Filtro vetorial + fusão com o BM25; conta a pergunta como aprovada ou barrada."""
+        vetoriais = self._filtrar(resultados, vetor)
+        documentos = self._fundir(vetoriais, consulta)
+        if self.score_threshold is not None or self.score_margin is not None:
+            with self._lock:
+                if documentos:
+                    self._aprovadas += 1
+                    self._pelo_bm25 += not vetoriais
+                else:
+                    self._bloqueadas += 1
+        return documentos
+
+    def _fundir(self, vetoriais: List[Document], consulta: str) -> List[Document]:
+        if self.bm25 is None:
+            return vetoriais[:self.k]
+
+        with metrics.ETAPA.time(etapa="bm25"):
+            encontrados = self.bm25.search(consulta, self.candidatos)
+        if not vetoriais:
+            # O filtro vetorial barrou tudo: fica só o que o BM25 casa com força
+            if self.bm25_coverage is None:
+                return []
+            encontrados = [(doc_id, placar) for doc_id, placar in encontrados
+                           if self.bm25.coverage(consulta, doc_id) >= self.bm25_coverage]
+
+        placar: Dict[str, float] = {}
+        documentos: Dict[str, Document] = {}
+        for posicao, doc in enumerate(vetoriais):
+            chave = doc.id or doc.page_content
+            documentos.setdefault(chave, doc)
+            placar[chave] = placar.get(chave, 0.0) + 1 / (self.rrf_k + posicao + 1)
+        for posicao, (doc_id, _) in enumerate(encontrados):
+            placar[doc_id] = placar.get(doc_id, 0.0) + 1 / (self.rrf_k + posicao + 1)
+
+        resultado = []
+        for chave in sorted(placar, key=placar.get, reverse=True):
+            doc = documentos.get(chave)
+            if doc is None:
+                doc = self.vectorstore.docstore.search(chave)
+                if not isinstance(doc, Document):  # removido do índice depois do BM25
+                    continue
+            resultado.append(doc)
+            if len(resultado) == self.k:
+                break
+        return resultado
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        with metrics.ETAPA.time(etapa="embedding"):
+            vetor = self.vectorstore.embeddings.embed_query(query)
+        resultados = self._buscar_vetorial(vetor)
+        return self._recuperar(resultados, vetor, query)
+
+    async def _aget_relevant_documents(self, query: str, *,
+                                       run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        with metrics.ETAPA.time(etapa="embedding"):
+            vetor = await self.vectorstore.embeddings.aembed_query(query)
+        resultados = await asyncio.to_thread(self._buscar_vetorial, vetor)
+        return self._recuperar(resultados, vetor, query)
+
+    def search_batch(self, queries: List[str]) -> List[List[Document]]:
+        """Busca de várias perguntas: um lote só de embeddings e uma busca só no FAISS.
+
+        Com ``BatchingEmbeddings`` os vetores passam pelo cache de consultas
+        (``embed_queries``); outros modelos usam ``embed_documents``, que dá o
+        mesmo vetor de ``embed_query`` no e5-small.
+        """
+        if not queries:
+            return []
+        embeddings = self.vectorstore.embeddings
+        with metrics.ETAPA.time(etapa="embedding"):
+            vetores = getattr(embeddings, "embed_queries", embeddings.embed_documents)(list(queries))
+        resultados = self._buscar_vetoriais(vetores)
+        return [self._recuperar(r, v, q) for q, r, v in zip(queries, resultados, vetores)]
@@ -0,0 +1,125 @@
+import contextlib
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Iterator, List, Union
+
+VERSIONS_DIR = Path("data/faiss_versions")
+LEGACY_INDEX = Path("data/faiss_index")
+LEGACY_MANIFEST = Path("data/vectorstore_cache.json")
+
+CURRENT_FILE = "CURRENT"
+RETIRED_FILE = "RETIRED"
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = ".lock"
+
+
+class IndexVersions:
+    """Versões do índice FAISS em ``data/faiss_versions/<versão>``.
+
+    Cada versão é uma pasta completa (índice, docstore, BM25, embeddings dos
+    chunks e o próprio manifesto) que não muda depois de publicada. O arquivo
+    ``CURRENT`` aponta para a versão em uso e é trocado com ``os.replace``
+    (atômico), então quem lê o ponteiro sempre acha uma versão inteira. A
+    versão substituída ganha um ``RETIRED`` com a hora da troca e só é
+    apagada depois da carência, quando nenhum worker deve mais usá-la.
+
+    Sem ``CURRENT`` vale o layout antigo (``data/faiss_index`` +
+    ``data/vectorstore_cache.json``); a primeira atualização migra.
+    """
+
+    def __init__(self, raiz: Union[str, Path] = VERSIONS_DIR, legado: Union[str, Path] = LEGACY_INDEX,
+                 manifesto_legado: Union[str, Path] = LEGACY_MANIFEST):
+        self.raiz = Path(raiz)
+        self.legado = Path(legado)
+        self.manifesto_legado = Path(manifesto_legado)
+
+    def current(self) -> Path:
+        """Pasta do índice publicado."""
+        try:
+            nome = (self.raiz / CURRENT_FILE).read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            return self.legado
+        return self.raiz / nome if nome else self.legado
+
+    def manifest_file(self, pasta: Path) -> Path:
+        if Path(pasta) == self.legado:
+            return self.manifesto_legado
+        return Path(pasta) / MANIFEST_FILE
+
+    def new_version(self) -> Path:
+        """Caminho para uma versão nova (a pasta é criada por quem grava o índice)."""
+        return self.raiz / f"v{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+    def publish(self, pasta: Path):
+        """Aponta CURRENT para ``pasta`` e marca a versão anterior como aposentada."""
+        anterior = self.current()
+        tmp = self.raiz / f"{CURRENT_FILE}.{os.getpid()}.tmp"
+        tmp.write_text(Path(pasta).name, encoding="utf-8")
+        os.replace(tmp, self.raiz / CURRENT_FILE)
+        if anterior != Path(pasta) and anterior.parent == self.raiz and anterior.exists():
+            (anterior / RETIRED_FILE).write_text(str(time.time()), encoding="utf-8")
+
+    def collect_garbage(self, carencia: float) -> List[Path]:
+        """Apaga versões aposentadas há mais de ``carencia`` segundos e builds abandonados.
+
+        Chame com o lock (``lock()``): assim nenhuma versão está sendo
+        construída e toda pasta sem RETIRED além da atual é resto de falha.
+        """
+        if not self.raiz.exists():
+            return []
+        atual = self.current()
+        removidas = []
+        for pasta in sorted(self.raiz.iterdir()):
+            if not pasta.is_dir() or pasta == atual:
+                continue
+            try:
+                aposentada = float((pasta / RETIRED_FILE).read_text(encoding="utf-8"))
+            except (FileNotFoundError, ValueError):
+                aposentada = 0.0  # nunca publicada
+            if time.time() - aposentada < carencia:
+                continue
+            try:
+                shutil.rmtree(pasta)
+                removidas.append(pasta)
+            except OSError as e:
+                # Ex.: Windows com o arquivo ainda mapeado; tenta na próxima coleta
+                print(f"⚠️ Não foi possível apagar a versão {pasta.name} do índice ({str(e)})")
+        if removidas:
+            print(f"🧹 Versões antigas do índice apagadas: {', '.join(p.name for p in removidas)}")
+        return removidas
+
+    @contextlib.contextmanager
+    def lock(self, esperar: bool = False, validade: float = 3600.0) -> Iterator[bool]:
+        """Lock entre processos para construir/publicar versões; devolve se foi obtido.
+
+        Um lock mais velho que ``validade`` segundos é de um processo que
+        morreu no meio e é descartado.
+        """
+        self.raiz.mkdir(parents=True, exist_ok=True)
+        arquivo = self.raiz / LOCK_FILE
+        while True:
+            try:
+                fd = os.open(arquivo, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - arquivo.stat().st_mtime > validade:
+                        arquivo.unlink()
+                        continue
+                except FileNotFoundError:
+                    continue
+                if not esperar:
+                    yield False
+                    return
+                time.sleep(1.0)
+
+        try:
+            os.write(fd, str(os.getpid()).encode())
+            yield True
+        finally:
+            os.close(fd)
+            with contextlib.suppress(FileNotFoundError):
+                arquivo.unlink()
@@ -0,0 +1,499 @@
+import asyncio
+import math
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from app.services import metrics
+from app.services.context_builder import estimate_tokens
+
+
+def rate_limit_delay(erro: BaseException) -> Optional[float]:
+    """Segundos a esperar se ``erro`` é limite de taxa do provedor (HTTP 429), senão None.
+
+    Groq levanta ``RateLimitError`` e o Gemini ``ResourceExhausted``; o
+    Retry-After da resposta vale quando vem, senão 0.0 (quem chama decide o backoff).
+    """
+    resposta = getattr(erro, "response", None)
+    status = getattr(erro, "status_code", None) or getattr(resposta, "status_code", None)
+    nome = type(erro).__name__
+    if status != 429 and "RateLimit" not in nome and "ResourceExhausted" not in nome:
+        return None
+    try:
+        return max(0.0, float(resposta.headers.get("retry-after")))
+    except (AttributeError, TypeError, ValueError):
+        return 0.0
+
+
+class CircuitoAberto(Exception):
+    """Chamada recusada: o circuito está meio-aberto e a chamada de teste ainda não terminou."""
+
+
+class CircuitBreaker:
+    """Abre depois de ``falhas_max`` erros seguidos e deixa o provedor de fora por ``cooldown`` segundos.
+
+    Passado o cooldown o circuito fica meio-aberto: só uma chamada de teste
+    passa (``chamar``) e as outras continuam recusadas até ela terminar; um
+    sucesso fecha o circuito e um erro abre de novo. Se a chamada de teste
+    for cancelada (perdeu o hedge), ``liberar`` deixa a próxima testar.
+    """
+
+    def __init__(self, falhas_max: int = 3, cooldown: float = 30.0):
+        self.falhas_max = falhas_max
+        self.cooldown = cooldown
+        self.falhas = 0
+        self.aberto_em = None
+        self.aberturas = 0
+        self._sonda = None  # número da chamada de teste em andamento
+        self._sondas = 0
+        self._lock = threading.Lock()
+
+    def _meio_aberto(self) -> bool:
+        return self.aberto_em is not None and time.monotonic() - self.aberto_em >= self.cooldown
+
+    def permite(self) -> bool:
+        """Se o provedor pode ser chamado agora (não reserva a chamada de teste)."""
+        with self._lock:
+            return self.aberto_em is None or (self._meio_aberto() and self._sonda is None)
+
+    def chamar(self) -> Optional[int]:
+        """Registra uma chamada que vai começar; devolve o número da chamada de teste, se for ela.
+
+        No meio-aberto a primeira chamada vira o teste e as seguintes levantam
+        CircuitoAberto até ele terminar. Fechado (ou aberto, quando o roteador
+        tenta todos os provedores) a chamada passa sem ser teste (None).
+        """
+        with self._lock:
+            if not self._meio_aberto():
+                return None
+            if self._sonda is not None:
+                raise CircuitoAberto("circuito meio-aberto: chamada de teste em andamento")
+            self._sondas += 1
+            self._sonda = self._sondas
+            return self._sonda
+
+    def liberar(self, sonda: Optional[int]):
+        """Fim de uma chamada sem sucesso nem falha (cancelada): a próxima pode testar."""
+        with self._lock:
+            if sonda is not None and self._sonda == sonda:
+                self._sonda = None
+
+    def sucesso(self):
+        with self._lock:
+            self.falhas = 0
+            self.aberto_em = None
+            self._sonda = None
+
+    def falha(self):
+        with self._lock:
+            self.falhas += 1
+            if self.falhas >= self.falhas_max:
+                if self.aberto_em is None:
+                    self.aberturas += 1
+                self.aberto_em = time.monotonic()
+            self._sonda = None
+
+    def estado(self) -> str:
+        with self._lock:
+            if self.aberto_em is None:
+                return "fechado"
+            return "aberto" if time.monotonic() - self.aberto_em < self.cooldown else "meio-aberto"
+
+
+class LatencyTracker:
+    """Janela das últimas latências (s) com percentis."""
+
+    def __init__(self, janela: int = 200):
+        self._amostras = deque(maxlen=janela)
+        self._lock = threading.Lock()
+
+    def add(self, segundos: float):
+        with self._lock:
+            self._amostras.append(segundos)
+
+    def __len__(self) -> int:
+        return len(self._amostras)
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            amostras = sorted(self._amostras)
+        if not amostras:
+            return None
+        return amostras[min(len(amostras) - 1, max(0, math.ceil(p * len(amostras)) - 1))]
+
+
+class Provider:
+    """Modelo de chat + circuito + latências (primeiro token e resposta completa)."""
+
+    def __init__(self, nome: str, modelo: BaseChatModel, breaker: CircuitBreaker):
+        self.nome = nome
+        self.modelo = modelo
+        self.breaker = breaker
+        self.primeiro_token = LatencyTracker()
+        self.total = LatencyTracker()
+        self.chamadas = 0
+        self.erros = 0
+        self.vitorias = 0
+        self.canceladas = 0
+
+    def stats(self) -> dict:
+        def ms(valor):
+            return round(valor * 1000, 1) if valor is not None else None
+
+        return {
+            "circuito": self.breaker.estado(),
+            "aberturas_circuito": self.breaker.aberturas,
+            "chamadas": self.chamadas,
+            "erros": self.erros,
+            "vitorias": self.vitorias,
+            "canceladas": self.canceladas,
+            "primeiro_token_p50_ms": ms(self.primeiro_token.percentile(0.5)),
+            "primeiro_token_p95_ms": ms(self.primeiro_token.percentile(0.95)),
+            "total_p50_ms": ms(self.total.percentile(0.5)),
+        }
+
+
+class LLMRouter(Runnable):
+    """Roteador entre provedores de LLM (Groq, Gemini) com hedge e circuit breaker.
+
+    Recebe o prompt já formatado e devolve o texto da resposta (``stream``
+    entrega os pedaços). O primeiro provedor disponível é chamado; se ele
+    não entregar o primeiro token dentro do prazo (p95 do seu tempo até o
+    primeiro token, entre ``prazo_minimo`` e ``prazo_maximo``), o próximo é
+    disparado em paralelo e vale quem responder primeiro — o outro é
+    cancelado. Erro antes do primeiro token passa na hora para o próximo.
+    Provedores com o circuito aberto ficam de fora (se todos estiverem
+    abertos, tenta todos na ordem); no meio-aberto só um pedido por vez
+    testa o provedor, e os outros passam para o próximo.
+
+    Com ``hedge=False`` vira um fallback sequencial (só com o circuit breaker).
+    """
+
+    def __init__(self, provedores: List[Provider], hedge: bool = True, prazo_inicial: float = 2.0,
+                 prazo_minimo: float = 0.25, prazo_maximo: float = 5.0, amostras_minimas: int = 20):
+        self.provedores = provedores
+        self.hedge = hedge
+        self.prazo_inicial = prazo_inicial
+        self.prazo_minimo = prazo_minimo
+        self.prazo_maximo = prazo_maximo
+        self.amostras_minimas = amostras_minimas
+        self.hedges = 0
+        self.hedges_vencidos = 0
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------ API
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> str:
+        return "".join(self.stream(input, config, **kwargs))
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> str:
+        return "".join([parte async for parte in self.astream(input, config, **kwargs)])
+
+    def stream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Iterator[str]:
+        fila = queue.Queue()
+        cancelados = {}
+        pendentes = self._ordem()
+        tokens = self._tokens_prompt(input)
+
+        def iniciar():
+            provedor = pendentes.pop(0)
+            cancelados[provedor] = threading.Event()
+            threading.Thread(target=self._consumir, args=(provedor, input, tokens, fila, cancelados[provedor]),
+                             daemon=True, name=f"llm-{provedor.nome}").start()
+            return provedor
+
+        def proximo(timeout):
+            try:
+                return fila.get(timeout=timeout)
+            except queue.Empty:
+                return None
+
+        try:
+            yield from self._coordenar(iniciar, proximo, cancelados, pendentes)
+        finally:
+            for evento in cancelados.values():
+                evento.set()
+
+    async def astream(self, input: Any, config: Optional[RunnableConfig] = None,
+                      **kwargs: Any) -> AsyncIterator[str]:
+        fila = asyncio.Queue()
+        tarefas = {}
+        pendentes = self._ordem()
+        tokens = self._tokens_prompt(input)
+
+        def iniciar():
+            provedor = pendentes.pop(0)
+            tarefas[provedor] = asyncio.create_task(self._aconsumir(provedor, input, tokens, fila))
+            return provedor
+
+        eventos = self._acoordenar(iniciar, fila, tarefas, pendentes)
+        try:
+            async for parte in eventos:
+                yield parte
+        finally:
+            await eventos.aclose()
+            for tarefa in tarefas.values():
+                tarefa.cancel()
+
+    def stats(self) -> dict:
+        with self._lock:
+            dados = {"hedge": self.hedge, "hedges": self.hedges, "hedges_vencidos": self.hedges_vencidos}
+        dados["provedores"] = {p.nome: p.stats() for p in self.provedores}
+        return dados
+
+    # ------------------------------------------------------------------ internos
+
+    def _ordem(self) -> List[Provider]:
+        disponiveis = [p for p in self.provedores if p.breaker.permite()]
+        return disponiveis or list(self.provedores)
+
+    def _prazo(self, provedor: Provider) -> float:
+        """Quanto esperar o primeiro token antes de disparar o próximo provedor."""
+        if not self.hedge:
+            return math.inf
+        if len(provedor.primeiro_token) < self.amostras_minimas:
+            return self.prazo_inicial
+        p95 = provedor.primeiro_token.percentile(0.95)
+        return min(self.prazo_maximo, max(self.prazo_minimo, p95))
+
+    def _registrar_hedge(self):
+        with self._lock:
+            self.hedges += 1
+
+    def _registrar_vencedor(self, vencedor: Provider, primeiro: Provider, hedge: bool):
+        vencedor.vitorias += 1
+        metrics.LLM_RESPOSTAS.inc(provedor=vencedor.nome)
+        if hedge and vencedor is not primeiro:
+            with self._lock:
+                self.hedges_vencidos += 1
+
+    def _coordenar(self, iniciar, proximo, cancelados, pendentes) -> Iterator[str]:
+        """Corrida até o primeiro token; depois repassa só o vencedor."""
+        ativos = {}
+        primeiro = atual = iniciar()
+        ativos[atual] = time.monotonic()
+        prazo = time.monotonic() + self._prazo(atual)
+        erro = None
+        hedge = False
+
+        while True:
+            if not ativos:
+                if not pendentes:
+                    raise erro or RuntimeError("nenhum provedor de LLM disponível")
+                atual = iniciar()
+                ativos[atual] = time.monotonic()
+                prazo = time.monotonic() + self._prazo(atual)
+
+            espera = prazo - time.monotonic() if pendentes and prazo != math.inf else None
+            evento = proximo(max(0.0, espera) if espera is not None else None)
+            if evento is None:  # estourou o prazo: hedge com o próximo provedor
+                self._registrar_hedge()
+                hedge = True
+                atual = iniciar()
+                ativos[atual] = time.monotonic()
+                prazo = time.monotonic() + self._prazo(atual)
+                continue
+
+            provedor, tipo, dado = evento
+            if provedor not in ativos:
+                continue
+            if tipo == "erro":  # passa para o próximo na hora, sem esperar o prazo
+                del ativos[provedor]
+                erro = dado
+                if pendentes and ativos:
+                    atual = iniciar()
+                    ativos[atual] = time.monotonic()
+                    prazo = time.monotonic() + self._prazo(atual)
+                continue
+
+            vencedor = provedor
+            break
+
+        for outro, inicio in ativos.items():
+            if outro is not vencedor:
+                cancelados[outro].set()
+                self._cancelado(outro, time.monotonic() - inicio)
+        self._registrar_vencedor(vencedor, primeiro, hedge)
+
+        while tipo != "fim":
+            if tipo == "erro":
+                raise dado
+            yield dado
+            provedor, tipo, dado = proximo(None)
+            while provedor is not vencedor:
+                provedor, tipo, dado = proximo(None)
+
+    async def _acoordenar(self, iniciar, fila: asyncio.Queue, tarefas, pendentes) -> AsyncIterator[str]:
+        """Mesma lógica de _coordenar, com tarefas asyncio (o perdedor é cancelado de verdade)."""
+        ativos = {}
+        primeiro = atual = iniciar()
+        ativos[atual] = time.monotonic()
+        prazo = time.monotonic() + self._prazo(atual)
+        erro = None
+        hedge = False
+
+        while True:
+            if not ativos:
+                if not pendentes:
+                    raise erro or RuntimeError("nenhum provedor de LLM disponível")
+                atual = iniciar()
+                ativos[atual] = time.monotonic()
+                prazo = time.monotonic() + self._prazo(atual)
+
+            espera = prazo - time.monotonic() if pendentes and prazo != math.inf else None
+            try:
+                evento = await asyncio.wait_for(fila.get(), max(0.0, espera) if espera is not None else None)
+            except asyncio.TimeoutError:
+                self._registrar_hedge()
+                hedge = True
+                atual = iniciar()
+                ativos[atual] = time.monotonic()
+                prazo = time.monotonic() + self._prazo(atual)
+                continue
+
+            provedor, tipo, dado = evento
+            if provedor not in ativos:
+                continue
+            if tipo == "erro":
+                del ativos[provedor]
+                erro = dado
+                if pendentes and ativos:
+                    atual = iniciar()
+                    ativos[atual] = time.monotonic()
+                    prazo = time.monotonic() + self._prazo(atual)
+                continue
+
+            vencedor = provedor
+            break
+
+        for outro, inicio in ativos.items():
+            if outro is not vencedor:
+                tarefas[outro].cancel()
+                self._cancelado(outro, time.monotonic() - inicio)
+        self._registrar_vencedor(vencedor, primeiro, hedge)
+
+        while tipo != "fim":
+            if tipo == "erro":
+                raise dado
+            yield dado
+            provedor, tipo, dado = await fila.get()
+            while provedor is not vencedor:
+                provedor, tipo, dado = await fila.get()
+
+    def _cancelado(self, provedor: Provider, decorrido: float):
+        # Perdeu a corrida sem o primeiro token: o tempo até aqui é um limite
+        # inferior da latência dele e entra na janela (senão o p95 só veria os rápidos)
+        provedor.canceladas += 1
+        provedor.primeiro_token.add(decorrido)
+
+    @staticmethod
+    def _tokens_prompt(entrada) -> int:
+        """Tokens estimados do prompt (0 com as métricas desligadas, para não formatar o texto à toa)."""
+        if not metrics.enabled():
+            return 0
+        tokens = estimate_tokens(entrada.to_string() if hasattr(entrada, "to_string") else str(entrada))
+        metrics.PROMPT_TOKENS.observe(tokens)
+        return tokens
+
+    @staticmethod
+    def _registrar_primeiro_token(provedor: Provider, decorrido: float):
+        provedor.primeiro_token.add(decorrido)
+        metrics.LLM_PRIMEIRO_TOKEN.observe(decorrido, provedor=provedor.nome)
+
+    @staticmethod
+    def _registrar_fim(provedor: Provider, duracao: float, caracteres: int):
+        provedor.total.add(duracao)
+        metrics.LLM_DURACAO.observe(duracao, provedor=provedor.nome)
+        metrics.LLM_TOKENS.inc(math.ceil(caracteres / 4), provedor=provedor.nome, tipo="saida")  # como estimate_tokens
+
+    @staticmethod
+    def _texto(chunk) -> str:
+        conteudo = getattr(chunk, "content", chunk)
+        return conteudo if isinstance(conteudo, str) else ""
+
+    def _consumir(self, provedor: Provider, entrada, tokens: int, fila: queue.Queue, cancelado: threading.Event):
+        try:
+            sonda = provedor.breaker.chamar()
+        except CircuitoAberto as e:  # outro pedido está testando o provedor: passa para o próximo
+            fila.put((provedor, "erro", e))
+            return
+        try:
+            self._consumir_stream(provedor, entrada, tokens, fila, cancelado)
+        finally:
+            provedor.breaker.liberar(sonda)  # sem efeito se a chamada já fechou ou reabriu o circuito
+
+    def _consumir_stream(self, provedor: Provider, entrada, tokens: int, fila: queue.Queue,
+                         cancelado: threading.Event):
+        provedor.chamadas += 1
+        metrics.LLM_TOKENS.inc(tokens, provedor=provedor.nome, tipo="entrada")
+        inicio = time.monotonic()
+        recebeu = False
+        caracteres = 0
+        try:
+            for chunk in provedor.modelo.stream(entrada):
+                if cancelado.is_set():
+                    return
+                texto = self._texto(chunk)
+                if not texto:
+                    continue
+                caracteres += len(texto)
+                if not recebeu:
+                    recebeu = True
+                    self._registrar_primeiro_token(provedor, time.monotonic() - inicio)
+                fila.put((provedor, "token", texto))
+        except Exception as e:
+            # Mesmo cancelado (perdeu o hedge), o erro conta para o circuito do provedor
+            provedor.erros += 1
+            provedor.breaker.falha()
+            metrics.LLM_ERROS.inc(provedor=provedor.nome)
+            if not cancelado.is_set():
+                fila.put((provedor, "erro", e))
+            return
+        if not cancelado.is_set():
+            self._registrar_fim(provedor, time.monotonic() - inicio, caracteres)
+            provedor.breaker.sucesso()
+            fila.put((provedor, "fim", None))
+
+    async def _aconsumir(self, provedor: Provider, entrada, tokens: int, fila: asyncio.Queue):
+        try:
+            sonda = provedor.breaker.chamar()
+        except CircuitoAberto as e:
+            fila.put_nowait((provedor, "erro", e))
+            return
+        try:
+            await self._aconsumir_stream(provedor, entrada, tokens, fila)
+        finally:
+            provedor.breaker.liberar(sonda)  # cancelada (perdeu o hedge): a próxima chamada testa
+
+    async def _aconsumir_stream(self, provedor: Provider, entrada, tokens: int, fila: asyncio.Queue):
+        provedor.chamadas += 1
+        metrics.LLM_TOKENS.inc(tokens, provedor=provedor.nome, tipo="entrada")
+        inicio = time.monotonic()
+        recebeu = False
+        caracteres = 0
+        try:
+            async for chunk in provedor.modelo.astream(entrada):
+                texto = self._texto(chunk)
+                if not texto:
+                    continue
+                caracteres += len(texto)
+                if not recebeu:
+                    recebeu = True
+                    self._registrar_primeiro_token(provedor, time.monotonic() - inicio)
+                fila.put_nowait((provedor, "token", texto))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            provedor.erros += 1
+            provedor.breaker.falha()
+            metrics.LLM_ERROS.inc(provedor=provedor.nome)
+            fila.put_nowait((provedor, "erro", e))
+            return
+        self._registrar_fim(provedor, time.monotonic() - inicio, caracteres)
+        provedor.breaker.sucesso()
+        fila.put_nowait((provedor, "fim", None))
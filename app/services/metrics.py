@@ -0,0 +1,212 @@
+import bisect
+import math
+import os
+import threading
+import time
+from typing import Iterable, Sequence, Tuple
+
+# Métricas no formato de texto do Prometheus, sem dependência externa.
+# METRICS_ENABLED=0 desliga: observe/inc retornam na primeira linha e
+# time() devolve um cronômetro que não faz nada.
+_ativo = os.getenv("METRICS_ENABLED", "1") == "1"
+
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+BUCKETS_TOKENS = (50, 100, 200, 400, 800, 1600, 3200)
+
+
+def enabled() -> bool:
+    return _ativo
+
+
+def set_enabled(ativo: bool):
+    global _ativo
+    _ativo = ativo
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _rotulos(nomes: Sequence[str], valores: Sequence, extra: str = "") -> str:
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor: float) -> str:
+    if valor == math.inf:
+        return "+Inf"
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+class _Cronometro:
+    __slots__ = ("histograma", "chave", "inicio")
+
+    def __init__(self, histograma: "Histogram", chave: tuple):
+        self.histograma = histograma
+        self.chave = chave
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *erro):
+        self.histograma._observar(self.chave, time.perf_counter() - self.inicio)
+        return False
+
+
+class _CronometroNulo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erro):
+        return False
+
+
+_NULO = _CronometroNulo()
+
+
+class Counter:
+    """Contador monotônico com rótulos."""
+
+    tipo = "counter"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, valor: float = 1.0, **rotulos):
+        if not _ativo:
+            return
+        chave = tuple(rotulos[n] for n in self.rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0.0) + valor
+
+    def value(self, **rotulos) -> float:
+        with self._lock:
+            return self._valores.get(tuple(rotulos[n] for n in self.rotulos), 0.0)
+
+    def amostras(self) -> Iterable[str]:
+        with self._lock:
+            valores = sorted(self._valores.items())
+        for chave, valor in valores:
+            yield f"{self.nome}{_rotulos(self.rotulos, chave)} {_numero(valor)}"
+
+
+class Histogram:
+    """Histograma com buckets fixos (cumulativos só na exposição)."""
+
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = (),
+                 buckets: Sequence[float] = BUCKETS_SEGUNDOS):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # chave -> [contagens por bucket (+Inf no fim), soma]
+        self._lock = threading.Lock()
+
+    def observe(self, valor: float, **rotulos):
+        if not _ativo:
+            return
+        self._observar(tuple(rotulos[n] for n in self.rotulos), valor)
+
+    def time(self, **rotulos):
+        """Context manager que observa a duração do bloco em segundos."""
+        if not _ativo:
+            return _NULO
+        return _Cronometro(self, tuple(rotulos[n] for n in self.rotulos))
+
+    def _observar(self, chave: tuple, valor: float):
+        posicao = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][posicao] += 1
+            serie[1] += valor
+
+    def totals(self) -> dict:
+        """{valores dos rótulos: (observações, soma)} de cada série."""
+        with self._lock:
+            return {chave: (sum(contagens), soma) for chave, (contagens, soma) in self._series.items()}
+
+    def amostras(self) -> Iterable[str]:
+        with self._lock:
+            series = sorted((chave, list(contagens), soma) for chave, (contagens, soma) in self._series.items())
+        for chave, contagens, soma in series:
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + (math.inf,), contagens):
+                acumulado += contagem
+                le = f'le="{_numero(limite)}"'
+                yield f"{self.nome}_bucket{_rotulos(self.rotulos, chave, le)} {acumulado}"
+            yield f"{self.nome}_sum{_rotulos(self.rotulos, chave)} {_numero(soma)}"
+            yield f"{self.nome}_count{_rotulos(self.rotulos, chave)} {acumulado}"
+
+
+class Registry:
+    """Métricas do processo, expostas em ``render()``."""
+
+    def __init__(self):
+        self._metricas = []
+
+    def register(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def render(self, extras: Iterable[Tuple[str, str, str, list]] = ()) -> str:
+        """Texto para o Prometheus (formato 0.0.4).
+
+        ``extras``: séries calculadas na hora da coleta, como
+        (nome, tipo, ajuda, [(rótulos: dict, valor)]).
+        """
+        linhas = []
+        for metrica in self._metricas:
+            amostras = list(metrica.amostras())
+            if amostras:
+                linhas += [f"# HELP {metrica.nome} {metrica.ajuda}", f"# TYPE {metrica.nome} {metrica.tipo}", *amostras]
+        for nome, tipo, ajuda, valores in extras:
+            linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} {tipo}"]
+            for rotulos, valor in valores:
+                linhas.append(f"{nome}{_rotulos(list(rotulos), list(rotulos.values()))} {_numero(valor)}")
+        return "\n".join(linhas) + "\n"
+
+
+REGISTRY = Registry()
+
+# ---------------------------------------------------------------------- catálogo
+
+ETAPA = REGISTRY.register(Histogram(
+    "chatbot_etapa_segundos", "Duração de cada etapa da busca (embedding, faiss, mmr, bm25, contexto).", ["etapa"]))
+PERGUNTA = REGISTRY.register(Histogram(
+    "chatbot_pergunta_segundos", "Tempo do chatbot para responder uma pergunta, até o último pedaço.",
+    ["metodo", "origem"]))
+LLM_PRIMEIRO_TOKEN = REGISTRY.register(Histogram(
+    "chatbot_llm_primeiro_token_segundos", "Tempo até o primeiro token de cada provedor de LLM.", ["provedor"]))
+LLM_DURACAO = REGISTRY.register(Histogram(
+    "chatbot_llm_segundos", "Duração das respostas completas de cada provedor de LLM.", ["provedor"]))
+LLM_RESPOSTAS = REGISTRY.register(Counter(
+    "chatbot_llm_respostas_total", "Respostas entregues ao usuário, pelo provedor que respondeu.", ["provedor"]))
+LLM_ERROS = REGISTRY.register(Counter(
+    "chatbot_llm_erros_total", "Erros de chamada a cada provedor de LLM.", ["provedor"]))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "chatbot_llm_tokens_total", "Tokens estimados (4 caracteres por token) enviados e recebidos por provedor.",
+    ["provedor", "tipo"]))
+PROMPT_TOKENS = REGISTRY.register(Histogram(
+    "chatbot_prompt_tokens", "Tamanho estimado do prompt enviado ao LLM, em tokens.", buckets=BUCKETS_TOKENS))
+INDEXACAO = REGISTRY.register(Histogram(
+    "chatbot_indexacao_etapa_segundos", "Duração das etapas de raspagem e construção do índice.", ["etapa"]))
+HTTP = REGISTRY.register(Histogram(
+    "http_requisicao_segundos", "Duração das requisições HTTP, até o último byte da resposta.", ["rota", "status"]))
+ADMISSAO_ESPERA = REGISTRY.register(Histogram(
+    "chatbot_admissao_espera_segundos", "Tempo na fila de admissão até a pergunta começar.", ["rota"]))
+ADMISSAO_REJEITADAS = REGISTRY.register(Counter(
+    "chatbot_admissao_rejeitadas_total", "Perguntas recusadas pela admissão (taxa, fila_cheia, espera).",
+    ["rota", "motivo"]))
@@ -0,0 +1,74 @@
+import os
+from pathlib import Path
+from typing import List, Optional, Union
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+ONNX_DIR_PADRAO = Path("data/onnx/e5-small")
+MODELO_FP32 = "model.onnx"
+MODELO_INT8 = "model_int8.onnx"
+TOKENIZER = "tokenizer.json"
+
+
+class OnnxEmbeddings(Embeddings):
+    """e5-small rodando no ONNX Runtime, sem PyTorch.
+
+    Reproduz o pipeline do sentence-transformers usado no índice (média dos
+    tokens pela attention mask + normalização L2), então os vetores são
+    compatíveis com os do HuggingFaceEmbeddings. Os arquivos vêm de
+    ``python -m scripts.exportar_onnx``.
+    """
+
+    def __init__(self, model_dir: Union[str, Path] = ONNX_DIR_PADRAO, quantizado: bool = False,
+                 batch_size: int = 32, threads: Optional[int] = None, max_length: int = 512):
+        import onnxruntime as ort  # só quem usa este backend precisa do onnxruntime
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+        arquivo = model_dir / (MODELO_INT8 if quantizado else MODELO_FP32)
+        if not arquivo.exists():
+            raise FileNotFoundError(f"{arquivo} não encontrado; gere com 'python -m scripts.exportar_onnx'")
+
+        opcoes = ort.SessionOptions()
+        opcoes.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            opcoes.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(arquivo), opcoes, providers=["CPUExecutionProvider"])
+        self._entradas = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / TOKENIZER))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id("[PAD]") or 0, pad_token="[PAD]")
+        self.batch_size = batch_size
+
+    def _embed(self, textos: List[str]) -> np.ndarray:
+        codificados = self.tokenizer.encode_batch(textos)
+        mascara = np.array([c.attention_mask for c in codificados], dtype=np.int64)
+        entradas = {
+            "input_ids": np.array([c.ids for c in codificados], dtype=np.int64),
+            "attention_mask": mascara,
+            "token_type_ids": np.array([c.type_ids for c in codificados], dtype=np.int64),
+        }
+        tokens = self.session.run(None, {k: v for k, v in entradas.items() if k in self._entradas})[0]
+
+        # Mean pooling (ignora o padding) + normalização L2, como no sentence-transformers
+        peso = mascara[..., None].astype(np.float32)
+        vetores = (tokens * peso).sum(axis=1) / np.clip(peso.sum(axis=1), 1e-9, None)
+        return vetores / np.clip(np.linalg.norm(vetores, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vetores = []
+        # Lotes com textos de tamanho parecido desperdiçam menos padding
+        ordem = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for inicio in range(0, len(texts), self.batch_size):
+            lote = ordem[inicio:inicio + self.batch_size]
+            vetores.extend(zip(lote, self._embed([texts[i] for i in lote])))
+        return [v.tolist() for _, v in sorted(vetores, key=lambda par: par[0])]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0].tolist()
+
+
+def onnx_dir() -> Path:
+    return Path(os.getenv("EMBEDDING_ONNX_DIR", str(ONNX_DIR_PADRAO)))
@@ -0,0 +1,187 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import AsyncIterator, Awaitable, Callable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+class _Transmissao:
+    """Pedaços de uma resposta em andamento, repassados a todos os inscritos (threads)."""
+
+    def __init__(self):
+        self.partes = []
+        self.fim = False
+        self.erro = None
+        self.cond = threading.Condition()
+
+    def ler(self) -> Iterator[str]:
+        lidos = 0
+        while True:
+            with self.cond:
+                while lidos >= len(self.partes) and not self.fim:
+                    self.cond.wait()
+                novos = self.partes[lidos:]
+                fim, erro = self.fim, self.erro
+            lidos += len(novos)
+            yield from novos
+            if fim and lidos >= len(self.partes):
+                if erro is not None:
+                    raise erro
+                return
+
+
+class _TransmissaoAsync:
+    """Mesma ideia de _Transmissao dentro de um event loop."""
+
+    def __init__(self):
+        self.partes = []
+        self.fim = False
+        self.erro = None
+        self.evento = asyncio.Event()
+        self.tarefa = None  # referência da tarefa que gera, para não ser coletada
+
+    def avisar(self):
+        evento, self.evento = self.evento, asyncio.Event()
+        evento.set()
+
+    async def ler(self) -> AsyncIterator[str]:
+        lidos = 0
+        while True:
+            evento = self.evento
+            while lidos < len(self.partes):
+                yield self.partes[lidos]
+                lidos += 1
+            if self.fim:
+                if self.erro is not None:
+                    raise self.erro
+                return
+            await evento.wait()
+
+
+class SingleFlight:
+    """Coalescência de requisições iguais em andamento (single-flight).
+
+    Enquanto a primeira requisição de uma chave (a pergunta normalizada) está
+    sendo calculada, as seguintes não disparam outra busca + LLM: esperam o
+    mesmo resultado. No streaming, quem chega depois recebe os pedaços já
+    gerados e acompanha o resto. A geração roda numa thread/tarefa própria,
+    então um cliente que desconecta não interrompe os outros.
+
+    Os caminhos síncrono (threads) e assíncrono (event loop) têm mapas
+    separados; ``stats()`` soma os dois.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chamadas = {}
+        self._streams = {}
+        self._achamadas = {}
+        self._astreams = {}
+        self.lideres = 0
+        self.coalescidas = 0
+
+    def _contar(self, lider: bool):
+        with self._lock:
+            if lider:
+                self.lideres += 1
+            else:
+                self.coalescidas += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calculadas": self.lideres,
+                "coalescidas": self.coalescidas,  # chamadas de busca + LLM evitadas
+                "em_andamento": len(self._chamadas) + len(self._streams) + len(self._achamadas) + len(self._astreams),
+            }
+
+    # ------------------------------------------------------------------ síncrono
+
+    def do(self, chave: str, calcular: Callable[[], T]) -> T:
+        with self._lock:
+            future = self._chamadas.get(chave)
+            lider = future is None
+            if lider:
+                future = self._chamadas[chave] = Future()
+        self._contar(lider)
+        if not lider:
+            return future.result()
+
+        try:
+            future.set_result(calcular())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._chamadas[chave]
+        return future.result()
+
+    def stream(self, chave: str, gerar: Callable[[], Iterator[str]]) -> Iterator[str]:
+        with self._lock:
+            transmissao = self._streams.get(chave)
+            lider = transmissao is None
+            if lider:
+                transmissao = self._streams[chave] = _Transmissao()
+        self._contar(lider)
+        if lider:
+            threading.Thread(target=self._transmitir, args=(chave, transmissao, gerar), daemon=True,
+                             name="single-flight").start()
+        return transmissao.ler()
+
+    def _transmitir(self, chave: str, transmissao: _Transmissao, gerar: Callable[[], Iterator[str]]):
+        try:
+            for parte in gerar():
+                with transmissao.cond:
+                    transmissao.partes.append(parte)
+                    transmissao.cond.notify_all()
+        except Exception as e:
+            transmissao.erro = e
+        finally:
+            with self._lock:
+                del self._streams[chave]
+            with transmissao.cond:
+                transmissao.fim = True
+                transmissao.cond.notify_all()
+
+    # ------------------------------------------------------------------ assíncrono
+
+    async def ado(self, chave: str, calcular: Callable[[], Awaitable[T]]) -> T:
+        with self._lock:
+            tarefa = self._achamadas.get(chave)
+            lider = tarefa is None
+            if lider:
+                tarefa = self._achamadas[chave] = asyncio.ensure_future(calcular())
+                tarefa.add_done_callback(lambda _: self._remover(self._achamadas, chave))
+        self._contar(lider)
+        # shield: quem desiste (cliente desconectou) não cancela a resposta dos outros
+        return await asyncio.shield(tarefa)
+
+    async def astream(self, chave: str, gerar: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        with self._lock:
+            transmissao = self._astreams.get(chave)
+            lider = transmissao is None
+            if lider:
+                transmissao = self._astreams[chave] = _TransmissaoAsync()
+        self._contar(lider)
+        if lider:
+            transmissao.tarefa = asyncio.ensure_future(self._atransmitir(chave, transmissao, gerar))
+        async for parte in transmissao.ler():
+            yield parte
+
+    async def _atransmitir(self, chave: str, transmissao: _TransmissaoAsync,
+                           gerar: Callable[[], AsyncIterator[str]]):
+        try:
+            async for parte in gerar():
+                transmissao.partes.append(parte)
+                transmissao.avisar()
+        except Exception as e:
+            transmissao.erro = e
+        finally:
+            self._remover(self._astreams, chave)
+            transmissao.fim = True
+            transmissao.avisar()
+
+    def _remover(self, mapa: dict, chave: str):
+        with self._lock:
+            mapa.pop(chave, None)
@@ -0,0 +1,263 @@
+import json
+import mmap
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import faiss
+import numpy as np
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from app.services.bm25 import BM25_FILE, BM25Index
+
+DOCSTORE_TEXT = "docstore.txt"
+DOCSTORE_OFFSETS = "docstore.offsets.npy"
+DOCSTORE_META = "docstore.json"
+
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+
+
+class MmapDocstore(Docstore, AddableMixin):
+    """Docstore compacto: textos num único blob mapeado em memória.
+
+    Substitui o ``index.pkl`` do LangChain. O texto de cada documento é lido
+    do blob sob demanda (via offsets), então as páginas ficam no page cache do
+    sistema e são compartilhadas entre todos os workers do gunicorn. Documentos
+    adicionados depois do carregamento ficam num dicionário em memória.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        path = Path(path)
+        with open(path / DOCSTORE_META, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        self._ids: List[str] = meta["ids"]
+        self._metadados: List[dict] = meta["metadados"]
+        self._posicoes: Dict[str, int] = {doc_id: i for i, doc_id in enumerate(self._ids)}
+        self._offsets = np.load(path / DOCSTORE_OFFSETS, mmap_mode="r")
+        self._extra: Dict[str, Document] = {}
+
+        self._arquivo = open(path / DOCSTORE_TEXT, "rb")
+        tamanho = os.fstat(self._arquivo.fileno()).st_size
+        self._blob = mmap.mmap(self._arquivo.fileno(), 0, access=mmap.ACCESS_READ) if tamanho else b""
+
+    def search(self, search: str) -> Union[str, Document]:
+        if search in self._extra:
+            return self._extra[search]
+        posicao = self._posicoes.get(search)
+        if posicao is None:
+            return f"ID {search} not found."
+        inicio, fim = self._offsets[posicao]
+        return Document(
+            id=search,
+            page_content=self._blob[int(inicio):int(fim)].decode("utf-8"),
+            metadata=dict(self._metadados[posicao]),
+        )
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        repetidos = set(texts) & (set(self._posicoes) | set(self._extra))
+        if repetidos:
+            raise ValueError(f"Tried to add ids that already exist: {repetidos}")
+        self._extra.update(texts)
+
+    def delete(self, ids: List) -> None:
+        for doc_id in ids:
+            if self._extra.pop(doc_id, None) is None:
+                self._posicoes.pop(doc_id, None)
+
+    def ids(self) -> List[str]:
+        return [doc_id for doc_id in self._ids if doc_id in self._posicoes] + list(self._extra)
+
+    def __len__(self) -> int:
+        return len(self._posicoes) + len(self._extra)
+
+
+def _tmp(arquivo: Path) -> Path:
+    return arquivo.with_name(f"{arquivo.name}.{os.getpid()}.tmp")
+
+
+def write_docstore(path: Union[str, Path], documentos: Dict[str, Document]):
+    """Grava o docstore no formato compacto (blob de texto + offsets + metadados).
+
+    Cada arquivo é escrito num temporário e trocado com os.replace: processos
+    que ainda mapeiam a versão anterior continuam lendo o inode antigo.
+    """
+    path = Path(path)
+    ids, metadados, offsets = [], [], []
+    posicao = 0
+    with open(_tmp(path / DOCSTORE_TEXT), "wb") as f:
+        for doc_id, doc in documentos.items():
+            dados = doc.page_content.encode("utf-8")
+            f.write(dados)
+            offsets.append((posicao, posicao + len(dados)))
+            posicao += len(dados)
+            ids.append(doc_id)
+            metadados.append(doc.metadata)
+
+    with open(_tmp(path / DOCSTORE_OFFSETS), "wb") as f:
+        np.save(f, np.asarray(offsets, dtype=np.int64).reshape(-1, 2))
+    with open(_tmp(path / DOCSTORE_META), "w", encoding="utf-8") as f:
+        json.dump({"ids": ids, "metadados": metadados}, f, ensure_ascii=False)
+
+    for nome in (DOCSTORE_TEXT, DOCSTORE_OFFSETS, DOCSTORE_META):
+        os.replace(_tmp(path / nome), path / nome)
+
+
+def save_vectorstore(vectorstore: FAISS, path: Union[str, Path]):
+    """Salva índice FAISS + docstore compacto (no lugar do index.pkl) + índice BM25 dos mesmos chunks."""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    documentos = {}
+    for doc_id in vectorstore.index_to_docstore_id.values():
+        doc = vectorstore.docstore.search(doc_id)
+        if isinstance(doc, Document):
+            documentos[doc_id] = doc
+
+    faiss.write_index(vectorstore.index, str(_tmp(path / "index.faiss")))
+    with open(_tmp(path / "index_ids.json"), "w", encoding="utf-8") as f:
+        json.dump([vectorstore.index_to_docstore_id[i] for i in range(vectorstore.index.ntotal)], f)
+    write_docstore(path, documentos)
+    BM25Index.from_documents(documentos).save(path / BM25_FILE)
+    os.replace(_tmp(path / "index_ids.json"), path / "index_ids.json")
+    os.replace(_tmp(path / "index.faiss"), path / "index.faiss")
+
+
+def index_config(tipo: Optional[str] = None) -> dict:
+    """Tipo e parâmetros do índice conforme as variáveis FAISS_* (gravados no manifesto)."""
+    tipo = tipo or os.getenv("FAISS_INDEX_TYPE", "flat")
+    if tipo not in INDEX_TYPES:
+        raise ValueError(f"FAISS_INDEX_TYPE inválido: {tipo} (use {', '.join(INDEX_TYPES)})")
+    if tipo == "hnsw":
+        return {"tipo": tipo, "m": int(os.getenv("FAISS_HNSW_M", "32")),
+                "ef_construction": int(os.getenv("FAISS_HNSW_EF_CONSTRUCTION", "200")),
+                "ef_search": int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))}
+    if tipo == "ivfpq":
+        return {"tipo": tipo, "pq_m": int(os.getenv("FAISS_PQ_M", "48")),
+                "nprobe": int(os.getenv("FAISS_IVF_NPROBE", "8"))}
+    return {"tipo": tipo}
+
+
+def build_faiss_index(vetores: np.ndarray, config: dict):
+    """Cria (e treina, se preciso) um índice FAISS vazio do tipo ``config["tipo"]``.
+
+    Todos usam distância L2, como o IndexFlatL2 padrão do LangChain; com
+    vetores normalizados a ordem é a mesma do cosseno. Retorna (índice,
+    config efetivo): com poucos vetores para treinar, o IVF-PQ vira flat.
+    """
+    vetores = np.ascontiguousarray(vetores, dtype=np.float32)
+    n, dim = vetores.shape
+    tipo = config["tipo"]
+
+    if tipo == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, config["m"])
+        index.hnsw.efConstruction = config["ef_construction"]
+        index.hnsw.efSearch = config["ef_search"]
+        return index, config
+
+    if tipo == "ivfpq":
+        # k-means pede ~39 pontos por centróide, tanto nas listas quanto no PQ
+        if n < 1000 or dim % config["pq_m"]:
+            print(f"⚠️ IVF-PQ precisa de >= 1000 vetores e dimensão divisível por {config['pq_m']} "
+                  f"(tem {n} x {dim}); usando índice flat.")
+            return faiss.IndexFlatL2(dim), {"tipo": "flat", "pedido": tipo}
+        nlist = max(1, min(int(4 * np.sqrt(n)), n // 39))
+        nbits = min(8, int(np.log2(n / 39)))
+        index = faiss.IndexIVFPQ(faiss.IndexFlatL2(dim), dim, nlist, config["pq_m"], nbits)
+        index.train(vetores)
+        index.nprobe = min(config["nprobe"], nlist)
+        # MMR reconstrói os vetores candidatos
+        index.set_direct_map_type(faiss.DirectMap.Hashtable)
+        return index, {**config, "nlist": nlist, "nbits": nbits}
+
+    return faiss.IndexFlatL2(dim), config
+
+
+def configure_search(index, config: dict):
+    """Aplica os parâmetros de busca do manifesto ao índice carregado.
+
+    Sem faiss.downcast_index: o objeto devolvido não é dono da memória e o
+    índice seria liberado junto com o original.
+    """
+    if config.get("tipo") == "hnsw" and "ef_search" in config:
+        index.hnsw.efSearch = config["ef_search"]
+    elif config.get("tipo") == "ivfpq" and "nprobe" in config:
+        faiss.extract_index_ivf(index).nprobe = config["nprobe"]
+    return index
+
+
+def supports_remove(index) -> bool:
+    """Se o ``FAISS.delete`` do LangChain funciona no índice; sem isso, atualizar exige reconstruí-lo.
+
+    HNSW não remove vetores. IVF remove, mas mantém os rótulos dos que ficam,
+    enquanto o LangChain renumera ``index_to_docstore_id`` de 0 a n-1: depois
+    do delete os rótulos apontariam para outros chunks.
+    """
+    return not isinstance(index, (faiss.IndexHNSW, faiss.IndexIVF))
+
+
+def create_vectorstore(textos: List[str], vetores, embeddings, metadados: List[dict], ids: List[str],
+                       config: Optional[dict] = None):
+    """Vectorstore novo com o índice do tipo configurado. Retorna (vectorstore, config efetivo)."""
+    vetores = np.asarray(vetores, dtype=np.float32)
+    index, config = build_faiss_index(vetores, config or index_config())
+    vectorstore = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+    )
+    vectorstore.add_embeddings(list(zip(textos, vetores)), metadatas=metadados, ids=ids)
+    return vectorstore, config
+
+
+def read_faiss_index(arquivo: Union[str, Path], use_mmap: bool = True):
+    """Lê o índice FAISS; com use_mmap o arquivo é mapeado em memória (somente leitura).
+
+    IO_FLAG_MMAP_IFC (faiss >= 1.10) mapeia os vetores de índices flat e HNSW;
+    IO_FLAG_MMAP cobre as listas invertidas dos índices IVF, que não aceitam
+    as duas juntas.
+    """
+    if use_mmap:
+        erro = None
+        for extra in (getattr(faiss, "IO_FLAG_MMAP_IFC", 0), 0):
+            try:
+                return faiss.read_index(str(arquivo), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | extra)
+            except Exception as e:
+                erro = e
+        print(f"⚠️ Não foi possível mapear o índice em memória ({str(erro)}); lendo normalmente.")
+    return faiss.read_index(str(arquivo))
+
+
+def load_vectorstore(path: Union[str, Path], embeddings, use_mmap: Optional[bool] = None,
+                     config: Optional[dict] = None) -> FAISS:
+    """Carrega o vectorstore salvo em ``path``.
+
+    Usa o formato compacto se existir; senão lê o ``index.pkl`` antigo e já
+    grava o formato compacto para os próximos boots. O tipo do índice vem do
+    próprio arquivo; ``config`` (do manifesto) ajusta os parâmetros de busca.
+    """
+    path = Path(path)
+    if use_mmap is None:
+        use_mmap = os.getenv("FAISS_MMAP", "1") == "1"
+
+    if not (path / DOCSTORE_META).exists():
+        print("🔁 Convertendo index.pkl para o docstore compacto...")
+        vectorstore = FAISS.load_local(str(path), embeddings, allow_dangerous_deserialization=True)
+        save_vectorstore(vectorstore, path)
+        if not use_mmap:
+            vectorstore.index = configure_search(vectorstore.index, config or {})
+            return vectorstore
+
+    with open(path / "index_ids.json", "r", encoding="utf-8") as f:
+        index_ids = json.load(f)
+
+    return FAISS(
+        embedding_function=embeddings,
+        index=configure_search(read_faiss_index(path / "index.faiss", use_mmap), config or {}),
+        docstore=MmapDocstore(path),
+        index_to_docstore_id=dict(enumerate(index_ids)),
+    )
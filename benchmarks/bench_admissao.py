@@ -0,0 +1,295 @@
+"""Controle de admissão: limite por cliente (429) e fila de perguntas em andamento (503).
+
+Cenários, pelo ASGI (o modo padrão) com o StubChatbot e o IP de cada
+cliente no X-Forwarded-For (RATE_LIMIT_TRUST_PROXY=1):
+
+- rajada: um cliente manda ``--rajada`` perguntas de uma vez enquanto
+  ``--clientes`` outros mandam uma cada. O Groq falso aceita ``--cota``
+  chamadas simultâneas (429 acima disso, e o roteador cai no Gemini, 4x mais
+  lento). Sem admissão, os outros clientes disputam a cota com a rajada; com
+  admissão, a rajada passa só até RATE_LIMIT_BURST e o resto recebe 429 na
+  hora, e no máximo ``--cota`` perguntas chamam o LLM ao mesmo tempo;
+- sobrecarga: ``--sobrecarga`` clientes diferentes ao mesmo tempo contra uma
+  fila de ``--cota`` em andamento + ``--fila`` esperando: o excedente recebe
+  503 rápido e a espera dos admitidos aparece em X-Queue-Wait-Ms;
+- lote: um cliente manda um /pergunta/batch de ``--lote`` perguntas com
+  concorrência ``--cota`` // 2 enquanto ``--clientes`` outros mandam uma
+  pergunta cada. O lote gasta uma ficha por pergunta (a pergunta seguinte do
+  mesmo cliente recebe 429, com Retry-After de no máximo 2 x burst / taxa,
+  qualquer que seja o tamanho do lote) e ocupa uma vaga por chamada
+  simultânea, então o lote mais os outros clientes não passam da cota do Groq;
+- compartilhado: dois limitadores (dois workers) sobre o mesmo Redis falso
+  (StubRedis) somam um único balde; com o Redis fora do ar as perguntas passam;
+- flask: o mesmo pelas rotas do Flask (workers síncronos), conferindo que a
+  vaga volta quando a resposta (inclusive o stream) é fechada.
+
+Uso:
+    python -m benchmarks.bench_admissao --rajada 200 --clientes 20 --cota 4 --lote 100
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+
+from app.controllers import pergunta_controller
+from app.services.admission import AdmissionQueue, RateLimiter, RedisBucketBackend, Rejected
+from benchmarks.stubs import StubChatbot, StubChatModel, StubRedis
+from benchmarks.suite import percentil
+
+GEMINI = "Resposta do Gemini."
+
+
+def criar_bot(args) -> StubChatbot:
+    return StubChatbot(
+        groq=StubChatModel(latencia=args.latencia, limite_simultaneas=args.cota),
+        gemini=StubChatModel(latencia=args.latencia * 4, resposta=GEMINI),
+    )
+
+
+def configurar(bot, limitador=None, fila=None):
+    pergunta_controller.chatbot = bot  # já pronto: create_app não dispara a inicialização real
+    pergunta_controller.limitador = limitador
+    pergunta_controller.fila_admissao = fila
+
+
+def resumo(respostas: list) -> dict:
+    """respostas: (status, segundos, corpo, cabeçalhos)."""
+    ok = [r for r in respostas if r[0] == 200]
+    dados = {
+        "pedidos": len(respostas),
+        "status": {str(s): sum(r[0] == s for r in respostas) for s in sorted({r[0] for r in respostas})},
+    }
+    if ok:
+        latencias = [r[1] for r in ok]
+        dados.update({
+            "p50_ms": round(percentil(latencias, 0.5) * 1000, 1),
+            "p95_ms": round(percentil(latencias, 0.95) * 1000, 1),
+            "gemini": sum(r[2].get("resposta") == GEMINI for r in ok),
+            "espera_fila_max_ms": max(int(r[3].get("x-queue-wait-ms", 0)) for r in ok),
+        })
+    recusadas = [r[1] for r in respostas if r[0] in (429, 503)]
+    if recusadas:
+        dados["recusa_p95_ms"] = round(percentil(recusadas, 0.95) * 1000, 1)
+    return dados
+
+
+async def disparar(app, pedidos: list) -> list:
+    """pedidos: (ip, pergunta, atraso); devolve (status, segundos, corpo, cabeçalhos) na mesma ordem."""
+    import httpx
+
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=120) as cliente:
+        async def um(ip, pergunta, atraso):
+            await asyncio.sleep(atraso)
+            inicio = time.perf_counter()
+            resposta = await cliente.post("/pergunta/", json={"pergunta": pergunta},
+                                          headers={"X-Forwarded-For": ip})
+            return resposta.status_code, time.perf_counter() - inicio, resposta.json(), dict(resposta.headers)
+
+        return await asyncio.gather(*(um(*pedido) for pedido in pedidos))
+
+
+def cenario_rajada(app, args, falhas: list) -> dict:
+    rajada = [("10.0.0.1", f"Quem pode participar? [rajada {i}]", 0.0) for i in range(args.rajada)]
+    outros = [(f"10.0.1.{i}", f"Como funciona o hackathon? [cliente {i}]", 0.01) for i in range(args.clientes)]
+    resultados = {}
+    for nome, limitador, fila in (
+        ("sem_admissao", None, None),
+        ("com_admissao", RateLimiter(args.por_minuto, args.burst), AdmissionQueue(args.cota, args.fila, args.espera)),
+    ):
+        bot = criar_bot(args)
+        configurar(bot, limitador, fila)
+        respostas = asyncio.run(disparar(app, rajada + outros))
+        resultados[nome] = {
+            "rajada": resumo(respostas[:len(rajada)]),
+            "outros_clientes": resumo(respostas[len(rajada):]),
+            "groq_429": bot.groq_model.limitadas,
+        }
+
+    com = resultados["com_admissao"]
+    if com["outros_clientes"]["status"] != {"200": args.clientes}:
+        falhas.append(f"rajada: outros clientes recusados com admissão: {com['outros_clientes']['status']}")
+    if com["rajada"]["status"].get("200", 0) > args.burst + 1:
+        falhas.append(f"rajada: {com['rajada']['status'].get('200')} respostas para um cliente com burst {args.burst}")
+    if com["groq_429"]:
+        falhas.append(f"rajada: {com['groq_429']} chamadas estouraram a cota do Groq com a fila limitada a ela")
+    return resultados
+
+
+def cenario_sobrecarga(app, args, falhas: list) -> dict:
+    configurar(criar_bot(args), None, AdmissionQueue(args.cota, args.fila, args.espera))
+    pedidos = [(f"10.1.{i // 250}.{i % 250}", f"Quando abrem as inscrições? [{i}]", 0.0) for i in range(args.sobrecarga)]
+    respostas = asyncio.run(disparar(app, pedidos))
+    dados = resumo(respostas)
+
+    if set(dados["status"]) - {"200", "503"}:
+        falhas.append(f"sobrecarga: status inesperados {dados['status']}")
+    if dados["status"].get("200", 0) < args.cota + args.fila:
+        falhas.append(f"sobrecarga: só {dados['status'].get('200', 0)} admitidas com {args.cota + args.fila} vagas")
+    if any("retry-after" not in r[3] for r in respostas if r[0] == 503):
+        falhas.append("sobrecarga: 503 sem Retry-After")
+    if pergunta_controller.fila_admissao.stats() != {"andamento": 0, "fila": 0}:
+        falhas.append(f"sobrecarga: vagas presas {pergunta_controller.fila_admissao.stats()}")
+    return dados
+
+
+def cenario_lote(app, args, falhas: list) -> dict:
+    import httpx
+
+    fila = AdmissionQueue(args.cota, args.fila, args.espera)
+    bot = criar_bot(args)
+    configurar(bot, RateLimiter(args.por_minuto, args.burst), fila)
+    concorrencia = max(1, args.cota // 2)
+    corpo = {"perguntas": [f"Quais cursos são oferecidos? [lote {i}]" for i in range(args.lote)],
+             "concorrencia": concorrencia}
+    outros = [(f"10.4.0.{i}", f"Como funciona o hackathon? [cliente {i}]", 0.05) for i in range(args.clientes)]
+
+    async def rodar():
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=120) as cliente:
+            inicio = time.perf_counter()
+            lote = asyncio.ensure_future(cliente.post("/pergunta/batch", json=corpo, headers={"X-Forwarded-For": "10.4.1.1"}))
+            amostras = []
+
+            async def amostrar():
+                while not lote.done():
+                    amostras.append(fila.stats()["andamento"])
+                    await asyncio.sleep(0.01)
+
+            _, respostas_outros = await asyncio.gather(amostrar(), disparar(app, outros))
+            resposta_lote = await lote
+            seguinte = await cliente.post("/pergunta/", json={"pergunta": "Quem pode participar?"},
+                                          headers={"X-Forwarded-For": "10.4.1.1"})
+        return resposta_lote, amostras, respostas_outros, seguinte, time.perf_counter() - inicio
+
+    resposta_lote, amostras, respostas_outros, seguinte, duracao = asyncio.run(rodar())
+    # Fichas depois do lote (a dívida para em -burst) e quanto tempo levam para voltar a 1
+    taxa = args.por_minuto / 60.0
+    quitacao = (1 - max(args.burst - args.lote, -args.burst)) / taxa
+    dados = {
+        "lote": {"perguntas": args.lote, "concorrencia": concorrencia, "status": resposta_lote.status_code,
+                 "duracao_s": round(duracao, 2), "divida_quitada_em_s": round(quitacao, 2)},
+        "andamento_max": max(amostras, default=0),
+        "outros_clientes": resumo(respostas_outros),
+        "groq_429": bot.groq_model.limitadas,
+        "pergunta_seguinte": {"status": seguinte.status_code, "retry_after_s": int(seguinte.headers.get("retry-after", 0))},
+        "depois": fila.stats(),
+    }
+
+    if resposta_lote.status_code != 200 or len(resposta_lote.json()["respostas"]) != args.lote:
+        falhas.append(f"lote: resposta {resposta_lote.status_code}")
+    if duracao < quitacao - 1 and seguinte.status_code != 429:
+        falhas.append(f"lote: {args.lote} perguntas não esgotaram o balde (burst {args.burst})")
+    limite_espera = math.ceil(2 * args.burst / taxa)
+    if dados["pergunta_seguinte"]["retry_after_s"] > limite_espera:
+        falhas.append(f"lote: Retry-After de {dados['pergunta_seguinte']['retry_after_s']} s depois do lote "
+                      f"(a dívida deveria parar em um burst: até {limite_espera} s)")
+    if not concorrencia <= dados["andamento_max"] <= args.cota:
+        falhas.append(f"lote: {dados['andamento_max']} vagas em andamento (lote com {concorrencia}, cota {args.cota})")
+    if dados["groq_429"]:
+        falhas.append(f"lote: {dados['groq_429']} chamadas estouraram a cota do Groq com lote e outros clientes")
+    if dados["depois"] != {"andamento": 0, "fila": 0}:
+        falhas.append(f"lote: vagas presas {dados['depois']}")
+    return dados
+
+
+def cenario_compartilhado(args, falhas: list) -> dict:
+    redis = StubRedis()
+    workers = [RateLimiter(args.por_minuto, args.burst, RedisBucketBackend(redis)) for _ in range(2)]
+    separados = [RateLimiter(args.por_minuto, args.burst) for _ in range(2)]
+
+    def aceitas(limitadores: list) -> int:
+        total = 0
+        for i in range(args.burst * 3):
+            try:
+                limitadores[i % 2].check("10.2.0.1")
+                total += 1
+            except Rejected:
+                pass
+        return total
+
+    dados = {"burst": args.burst, "redis_compartilhado": aceitas(workers), "memoria_por_worker": aceitas(separados)}
+    redis.fora_do_ar = True
+    dados["redis_fora_do_ar"] = aceitas(workers)
+
+    if dados["redis_compartilhado"] > args.burst + 1:
+        falhas.append(f"compartilhado: {dados['redis_compartilhado']} aceitas com burst {args.burst} em dois workers")
+    if dados["redis_fora_do_ar"] != args.burst * 3:
+        falhas.append("compartilhado: Redis fora do ar recusou perguntas")
+    return dados
+
+
+def cenario_flask(flask_app, args, falhas: list) -> dict:
+    fila = AdmissionQueue(args.cota, args.fila, args.espera)
+    configurar(criar_bot(args), RateLimiter(args.por_minuto, args.burst), fila)
+    cliente = flask_app.test_client()
+    status = []
+    for i in range(args.burst + 3):
+        resposta = cliente.post("/pergunta/", json={"pergunta": f"Quem pode participar? [flask {i}]"})
+        status.append(resposta.status_code)
+        if resposta.status_code == 200 and "X-Queue-Wait-Ms" not in resposta.headers:
+            falhas.append("flask: resposta sem X-Queue-Wait-Ms")
+        if resposta.status_code == 429 and "Retry-After" not in resposta.headers:
+            falhas.append("flask: 429 sem Retry-After")
+        resposta.close()  # o servidor WSGI fecha a resposta; é aí que a vaga volta
+
+    stream = cliente.post("/pergunta/stream", json={"pergunta": "Como funciona o hackathon?"},
+                          headers={"X-Forwarded-For": "10.3.0.1"})
+    durante = fila.stats()["andamento"]
+    stream.get_data()
+    stream.close()
+    dados = {"status": {str(s): status.count(s) for s in sorted(set(status))},
+             "andamento_durante_stream": durante, "depois": fila.stats()}
+
+    if status.count(429) < 2:
+        falhas.append(f"flask: rajada acima do burst sem 429 ({dados['status']})")
+    if durante != 1 or dados["depois"] != {"andamento": 0, "fila": 0}:
+        falhas.append(f"flask: vaga do stream não foi devolvida no fim ({durante} -> {dados['depois']})")
+    return dados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rajada", type=int, default=200, help="perguntas simultâneas de um só cliente")
+    parser.add_argument("--clientes", type=int, default=20, help="outros clientes durante a rajada")
+    parser.add_argument("--lote", type=int, default=100, help="perguntas no /pergunta/batch do cenário lote")
+    parser.add_argument("--sobrecarga", type=int, default=300, help="clientes diferentes ao mesmo tempo")
+    parser.add_argument("--cota", type=int, default=4, help="chamadas simultâneas aceitas pelo Groq falso")
+    parser.add_argument("--fila", type=int, default=32, help="ADMISSION_MAX_QUEUE")
+    parser.add_argument("--espera", type=float, default=5.0, help="ADMISSION_QUEUE_TIMEOUT_S")
+    parser.add_argument("--por-minuto", type=float, default=30, help="RATE_LIMIT_PER_MIN")
+    parser.add_argument("--burst", type=int, default=10, help="RATE_LIMIT_BURST")
+    parser.add_argument("--latencia", type=float, default=0.05, help="latência do Groq falso (s); Gemini = 4x")
+    args = parser.parse_args()
+
+    os.environ["RATE_LIMIT_TRUST_PROXY"] = "1"
+    from app import create_app
+    from app.asgi import create_asgi_app
+
+    configurar(criar_bot(args))
+    flask_app = create_app()
+    app = create_asgi_app(flask_app)
+    falhas = []
+    resultados = {
+        "rajada": cenario_rajada(app, args, falhas),
+        "sobrecarga": cenario_sobrecarga(app, args, falhas),
+        "lote": cenario_lote(app, args, falhas),
+        "compartilhado": cenario_compartilhado(args, falhas),
+        "flask": cenario_flask(flask_app, args, falhas),
+    }
+    texto = flask_app.test_client().get("/metrics").get_data(as_text=True)
+    for serie in ("chatbot_admissao_espera_segundos_count", "chatbot_admissao_rejeitadas_total"):
+        if serie not in texto:
+            falhas.append(f"/metrics sem {serie}")
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if falhas:
+        raise SystemExit("❌ " + "; ".join(falhas))
+    print("✅ Rajada de um cliente barrada com 429, lote cobrado por pergunta, excedente com 503 rápido "
+          "e vagas devolvidas no fim.")
+
+
+if __name__ == "__main__":
+    main()
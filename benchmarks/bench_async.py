@@ -0,0 +1,76 @@
+"""Teste de carga: workers síncronos x caminho assíncrono com LLM falso.
+
+Simula N perguntas simultâneas contra um LLM com latência fixa:
+
+- sync: um pool de threads do tamanho de WEB_CONCURRENCY, como os workers
+  síncronos do gunicorn (cada um preso ao LLM até a resposta chegar);
+- async: todas as perguntas em andamento no mesmo event loop via ``achat``.
+
+Uso:
+    python -m benchmarks.bench_async --perguntas 200 --workers 4 --latencia 0.5
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stubs import StubChatbot, StubChatModel
+
+
+def _resumo(nome: str, duracao: float, latencias: list) -> dict:
+    latencias = sorted(latencias)
+    return {
+        "modo": nome,
+        "perguntas": len(latencias),
+        "duracao_s": round(duracao, 3),
+        "vazao_rps": round(len(latencias) / duracao, 1),
+        "p50_s": round(statistics.median(latencias), 3),
+        "p95_s": round(latencias[int(len(latencias) * 0.95) - 1], 3),
+    }
+
+
+def rodar_sync(bot, perguntas, workers):
+    def uma(pergunta):
+        inicio = time.perf_counter()
+        bot.chat(pergunta)
+        return time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        latencias = list(executor.map(uma, perguntas))
+    return _resumo(f"sync ({workers} workers)", time.perf_counter() - inicio, latencias)
+
+
+async def rodar_async(bot, perguntas):
+    async def uma(pergunta):
+        inicio = time.perf_counter()
+        await bot.achat(pergunta)
+        return time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    latencias = await asyncio.gather(*(uma(p) for p in perguntas))
+    return _resumo("async (1 processo)", time.perf_counter() - inicio, list(latencias))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--perguntas", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latencia", type=float, default=0.5, help="latência do LLM falso, em segundos")
+    args = parser.parse_args()
+
+    bot = StubChatbot(groq=StubChatModel(latencia=args.latencia))
+    perguntas = [f"Pergunta de carga número {i} sobre o programa" for i in range(args.perguntas)]
+
+    resultados = [
+        rodar_sync(bot, perguntas, args.workers),
+        asyncio.run(rodar_async(bot, [p + " (async)" for p in perguntas])),
+    ]
+    resultados.append({"ganho_vazao": round(resultados[1]["vazao_rps"] / resultados[0]["vazao_rps"], 1)})
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Backends de embeddings: PyTorch x ONNX Runtime (fp32 e int8).
+
+Para cada backend roda um processo novo e mede:
+
+- carregar_s: import do backend + criação do modelo (import frio);
+- p50_ms / p95_ms: latência de uma pergunta (embed_query, sem lote);
+- rss_mb: memória residente do processo depois das consultas.
+
+Depois compara com o PyTorch, que gerou o índice atual:
+
+- cosseno_min: menor cosseno entre os vetores das perguntas;
+- recall@k: fração dos k vizinhos do PyTorch no índice publicado que o
+  backend também recupera.
+
+As perguntas vêm de benchmarks/perguntas.json. O ONNX precisa ter sido
+exportado antes (python -m scripts.exportar_onnx).
+
+Uso:
+    python -m benchmarks.bench_backends --k 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from app.services.index_versions import IndexVersions
+
+PERGUNTAS = Path(__file__).parent / "perguntas.json"
+
+SCRIPT = r"""
+import json, statistics, sys, time
+import app  # Flask e afins ficam fora da medição
+backend, perguntas = sys.argv[1], json.load(open(sys.argv[2], encoding="utf-8"))
+t0 = time.perf_counter()
+if backend == "torch":
+    from langchain_huggingface import HuggingFaceEmbeddings
+    modelo = HuggingFaceEmbeddings(model_name="intfloat/e5-small", model_kwargs={"device": "cpu"},
+                                   encode_kwargs={"normalize_embeddings": True})
+else:
+    from app.services.onnx_embeddings import OnnxEmbeddings, onnx_dir
+    modelo = OnnxEmbeddings(onnx_dir(), quantizado=backend == "onnx-int8")
+t_carregar = time.perf_counter() - t0
+modelo.embed_query("aquecimento")
+latencias, vetores = [], []
+for _ in range(3):
+    for pergunta in perguntas:
+        inicio = time.perf_counter()
+        vetor = modelo.embed_query(pergunta)
+        latencias.append(time.perf_counter() - inicio)
+        if len(vetores) < len(perguntas):
+            vetores.append(vetor)
+latencias.sort()
+rss = next(int(l.split()[1]) for l in open("/proc/self/status") if l.startswith("VmRSS"))
+print(json.dumps({"carregar_s": round(t_carregar, 3), "p50_ms": round(statistics.median(latencias) * 1000, 2),
+                  "p95_ms": round(latencias[int(len(latencias) * 0.95) - 1] * 1000, 2),
+                  "rss_mb": round(rss / 1024, 1), "vetores": vetores}))
+"""
+
+
+def medir(backend: str) -> dict:
+    saida = subprocess.run([sys.executable, "-c", SCRIPT, backend, str(PERGUNTAS)], env=dict(os.environ),
+                           capture_output=True, text=True, check=True)
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--indice", type=Path, default=None, help="index.faiss (padrão: o da versão publicada)")
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+    args.indice = args.indice or IndexVersions().current() / "index.faiss"
+
+    import faiss
+
+    indice = faiss.read_index(str(args.indice))
+    resultados = {backend: medir(backend) for backend in ["torch"] + [b for b in args.backends if b != "torch"]}
+
+    referencia = np.array(resultados["torch"]["vetores"], dtype=np.float32)
+    _, vizinhos_ref = indice.search(referencia, args.k)
+    for backend, resultado in resultados.items():
+        vetores = np.array(resultado.pop("vetores"), dtype=np.float32)
+        _, vizinhos = indice.search(vetores, args.k)
+        acertos = [len(set(a) & set(b)) / args.k for a, b in zip(vizinhos, vizinhos_ref)]
+        resultado["cosseno_min"] = round(float((vetores * referencia).sum(axis=1).min()), 5)
+        resultado[f"recall@{args.k}"] = round(float(np.mean(acertos)), 4)
+
+    print(json.dumps({"perguntas": len(referencia), "indice": str(args.indice), "backends": resultados}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
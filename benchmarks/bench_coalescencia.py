@@ -0,0 +1,108 @@
+"""Coalescência (single-flight) de perguntas iguais que chegam ao mesmo tempo.
+
+Simula uma turma inteira mandando a mesma pergunta (com variações de
+maiúsculas, acentos e pontuação) ao mesmo tempo, em cada caminho do
+chatbot: chat e chat_stream (threads), achat e achat_stream (asyncio).
+Usa o StubChatbot (LLM falso com latência) e confere que:
+
+- o LLM foi chamado uma vez só por rodada;
+- todos receberam a mesma resposta completa (no stream, juntando os pedaços).
+
+Sai com erro se alguma conferência falhar.
+
+Uso:
+    python -m benchmarks.bench_coalescencia --clientes 50
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stubs import StubChatbot, StubChatModel
+
+VARIACOES = ["{p}", "{p}?", "{P}", "  {p}  ", "{p}!!"]
+
+
+def variantes(pergunta: str, n: int) -> list:
+    return [VARIACOES[i % len(VARIACOES)].format(p=pergunta, P=pergunta.upper()) for i in range(n)]
+
+
+def rodada_threads(chamar, perguntas: list) -> tuple:
+    barreira = threading.Barrier(len(perguntas))
+
+    def cliente(pergunta):
+        barreira.wait()
+        inicio = time.perf_counter()
+        resposta = chamar(pergunta)
+        return resposta, time.perf_counter() - inicio
+
+    with ThreadPoolExecutor(max_workers=len(perguntas)) as executor:
+        resultados = list(executor.map(cliente, perguntas))
+    return [r for r, _ in resultados], [t for _, t in resultados]
+
+
+async def rodada_async(chamar, perguntas: list) -> tuple:
+    async def cliente(pergunta):
+        inicio = time.perf_counter()
+        resposta = await chamar(pergunta)
+        return resposta, time.perf_counter() - inicio
+
+    resultados = await asyncio.gather(*(cliente(p) for p in perguntas))
+    return [r for r, _ in resultados], [t for _, t in resultados]
+
+
+async def juntar_stream(gerador) -> str:
+    return "".join([parte async for parte in gerador])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clientes", type=int, default=50)
+    parser.add_argument("--latencia", type=float, default=0.3, help="latência do LLM falso (s)")
+    args = parser.parse_args()
+
+    groq = StubChatModel(latencia=args.latencia, intervalo_token=0.01)
+    bot = StubChatbot(groq=groq)
+
+    rodadas = {
+        "chat": lambda ps: rodada_threads(bot.chat, ps),
+        "chat_stream": lambda ps: rodada_threads(lambda p: "".join(bot.chat_stream(p)), ps),
+        "achat": lambda ps: asyncio.run(rodada_async(bot.achat, ps)),
+        "achat_stream": lambda ps: asyncio.run(rodada_async(lambda p: juntar_stream(bot.achat_stream(p)), ps)),
+    }
+    perguntas = {
+        "chat": "Quem pode participar do programa",
+        "chat_stream": "Como funciona o hackathon",
+        "achat": "Quais empresas patrocinam o programa",
+        "achat_stream": "O que diz a LGPD sobre meus dados",
+    }
+
+    relatorio, falhas = {}, []
+    for nome, rodar in rodadas.items():
+        antes = groq.chamadas
+        respostas, latencias = rodar(variantes(perguntas[nome], args.clientes))
+        chamadas = groq.chamadas - antes
+        relatorio[nome] = {
+            "clientes": args.clientes,
+            "chamadas_llm": chamadas,
+            "respostas_distintas": len(set(respostas)),
+            "latencia_p50_s": round(statistics.median(latencias), 3),
+            "latencia_max_s": round(max(latencias), 3),
+        }
+        if chamadas != 1:
+            falhas.append(f"{nome}: {chamadas} chamadas ao LLM (esperado 1)")
+        if respostas != [groq.resposta] * len(respostas):
+            falhas.append(f"{nome}: respostas diferentes da do LLM")
+
+    relatorio["stats"] = bot.single_flight.stats()
+    print(json.dumps(relatorio, indent=2, ensure_ascii=False))
+    if falhas:
+        raise SystemExit("❌ " + "; ".join(falhas))
+    print("✅ Uma chamada ao LLM por rodada; todos os clientes receberam a mesma resposta.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Contexto do prompt: lista crua de Documents (antes) x build_context (depois).
+
+Para cada pergunta de benchmarks/perguntas.json:
+
+- tokens_prompt / tokens_contexto: tokens estimados (estimate_tokens) do
+  prompt formatado e só do {context}, com o mesmo template e os mesmos
+  chunks recuperados nas duas versões;
+- latência ponta a ponta da chain (busca + prompt + LLM), sem cache de respostas.
+
+Por padrão o LLM é o StubChatModel com custo por token de entrada
+(--ms-por-token, o prefill) sobre o índice publicado em data/ e
+embeddings falsos. Com --real usa o chatbot de verdade (e5-small, Groq e
+Gemini; precisa das chaves de API).
+
+Uso:
+    python -m benchmarks.bench_contexto --ms-por-token 0.3
+    python -m benchmarks.bench_contexto --real
+"""
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+from langchain.schema.runnable import RunnablePassthrough
+
+from app.services.context_builder import estimate_tokens
+from app.services.index_versions import IndexVersions
+from app.services.vector_index import load_vectorstore
+from benchmarks.stubs import StubChatbot, StubChatModel
+
+PERGUNTAS = Path(__file__).parent / "perguntas.json"
+
+
+def criar_chatbot(args):
+    if args.real:
+        from app.chatbot_class import JovemProgramadorChatbot
+        return JovemProgramadorChatbot()
+
+    class ChatbotIndiceAtual(StubChatbot):
+        def _load_or_create_vectorstore(self):
+            return load_vectorstore(args.indice, self.embeddings)
+
+    modelo = StubChatModel(latencia=args.latencia, latencia_token_entrada=args.ms_por_token / 1000)
+    return ChatbotIndiceAtual(groq=modelo)
+
+
+def medir(bot, chain, formatar, perguntas: list, repeticoes: int) -> dict:
+    tokens, tokens_contexto = [], []
+    for pergunta in perguntas:
+        documentos = bot.retriever.invoke(pergunta)
+        if documentos:
+            contexto = formatar(documentos)
+            tokens.append(estimate_tokens(bot.prompt.format(context=contexto, question=pergunta)))
+            tokens_contexto.append(estimate_tokens(str(contexto)))
+
+    latencias = []
+    for _ in range(repeticoes):
+        for pergunta in perguntas:
+            inicio = time.perf_counter()
+            chain.invoke(pergunta)
+            latencias.append(time.perf_counter() - inicio)
+    return {
+        "perguntas_com_contexto": len(tokens),
+        "tokens_prompt_media": round(statistics.mean(tokens), 1) if tokens else 0,
+        "tokens_prompt_max": max(tokens, default=0),
+        "tokens_contexto_media": round(statistics.mean(tokens_contexto), 1) if tokens else 0,
+        "latencia_media_s": round(statistics.mean(latencias), 4),
+        "latencia_p50_s": round(statistics.median(latencias), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--indice", type=Path, default=None, help="pasta do índice (padrão: a versão publicada)")
+    parser.add_argument("--latencia", type=float, default=0.2, help="latência fixa do LLM falso (s)")
+    parser.add_argument("--ms-por-token", type=float, default=0.3, help="custo do LLM falso por token de entrada")
+    parser.add_argument("--repeticoes", type=int, default=1)
+    parser.add_argument("--real", action="store_true")
+    args = parser.parse_args()
+    args.indice = args.indice or IndexVersions().current()
+
+    bot = criar_chatbot(args)
+    perguntas = json.loads(PERGUNTAS.read_text(encoding="utf-8"))
+
+    # Antes: a lista de Documents ia direto para {context} (repr com metadados)
+    antes = {"context": bot.retriever, "question": RunnablePassthrough()} | bot.llm_chain
+    resultados = {
+        "antes": medir(bot, antes, lambda docs: docs, perguntas, args.repeticoes),
+        "depois": medir(bot, bot.chain, bot._format_context, perguntas, args.repeticoes),
+    }
+    resultados["reducao_tokens"] = round(
+        1 - resultados["depois"]["tokens_prompt_media"] / max(resultados["antes"]["tokens_prompt_media"], 1), 4
+    )
+
+    print(json.dumps({
+        "modo": "real" if args.real else "stub",
+        "perguntas": len(perguntas),
+        "context_max_tokens": bot.context_max_tokens,
+        **resultados,
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
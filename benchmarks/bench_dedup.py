@@ -0,0 +1,153 @@
+"""Deduplicação semântica: matriz completa + laço duplo x busca por raio em blocos.
+
+Gera vetores normalizados sintéticos (dim 384, como o e5-small) com uma
+fração de quase-duplicatas e mede, para cada tamanho:
+
+- antigo: matriz de similaridade n x n + laço duplo em Python (só até --max-antigo);
+- blocos: app.services.dedup.near_duplicates (ladrilhos do triângulo superior).
+
+Também confere que os dois mantêm exatamente os mesmos vetores e registra o
+pico de memória alocada (tracemalloc).
+
+Com ``--indice`` roda também a deduplicação de documentos nos vetores reais
+(e5-small) do índice salvo: cada fonte vira um documento e entram cópias de
+algumas páginas (sem o primeiro chunk, ou com um chunk de outra página a
+mais). Com DEDUP_DOC_THRESHOLD as páginas originais ficam todas e as cópias
+saem; mostra também quantas ficariam com a média crua dos chunks.
+
+Uso:
+    python -m benchmarks.bench_dedup --tamanhos 1000 10000 50000
+    python -m benchmarks.bench_dedup --tamanhos 1000 --indice data/faiss_index
+"""
+import argparse
+import json
+import os
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from app.services.dedup import document_vectors, near_duplicates, normalize_rows
+
+
+def gerar_vetores(n: int, dim: int, fracao_duplicada: float, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    vetores = rng.normal(size=(n, dim)).astype(np.float32)
+    duplicadas = rng.choice(n, size=int(n * fracao_duplicada), replace=False)
+    originais = rng.integers(0, n, size=len(duplicadas))
+    vetores[duplicadas] = vetores[originais] + rng.normal(scale=0.02, size=(len(duplicadas), dim))
+    return normalize_rows(vetores)
+
+
+def dedup_antigo(vetores: np.ndarray, limiar: float) -> np.ndarray:
+    """Versão anterior (cosine_similarity + laço duplo), com a matriz em numpy."""
+    similaridade = vetores @ vetores.T
+    remover = set()
+    n = len(vetores)
+    for i in range(n):
+        if i not in remover:
+            for j in range(i + 1, n):
+                if similaridade[i, j] >= limiar:
+                    remover.add(j)
+    return np.array([i not in remover for i in range(n)])
+
+
+def medir(funcao, *args):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    tempo = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, round(tempo, 3), round(pico / 2 ** 20, 1)
+
+
+def chunks_do_indice(pasta: Path) -> tuple:
+    """Vetores dos chunks do índice salvo e a fonte de cada um."""
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.embeddings import FakeEmbeddings
+
+    from app.services.vector_index import DOCSTORE_META, load_vectorstore
+
+    if (pasta / DOCSTORE_META).exists():
+        vectorstore = load_vectorstore(pasta, FakeEmbeddings(size=384), use_mmap=False)
+    else:  # formato antigo: lê sem converter a pasta
+        vectorstore = FAISS.load_local(str(pasta), FakeEmbeddings(size=384), allow_dangerous_deserialization=True)
+    vetores = vectorstore.index.reconstruct_n(0, vectorstore.index.ntotal)
+    fontes = [vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]).metadata.get("source")
+              for i in range(len(vetores))]
+    return vetores, fontes
+
+
+def cenario_indice(pasta: Path, limiar: float, copias: int, falhas: list) -> dict:
+    vetores, fontes = chunks_do_indice(pasta)
+    nomes = list(dict.fromkeys(fontes))
+    por_fonte = [np.flatnonzero(np.array(fontes) == nome) for nome in nomes]
+
+    # Cópias: a página sem o primeiro chunk e a página com um chunk de outra a mais
+    grandes = [i for i, chunks in enumerate(por_fonte) if len(chunks) > 2][:copias]
+    documentos = list(por_fonte)
+    for posicao, i in enumerate(grandes):
+        outra = por_fonte[grandes[(posicao + 1) % len(grandes)]]
+        documentos += [por_fonte[i][1:], np.append(por_fonte[i], outra[0])]
+
+    linhas = np.concatenate(documentos)
+    origem = np.repeat(np.arange(len(documentos)), [len(d) for d in documentos])
+    manter = near_duplicates(document_vectors(vetores[linhas], origem, len(documentos)), limiar)
+
+    medias = np.zeros((len(documentos), vetores.shape[1]), dtype=np.float32)
+    np.add.at(medias, origem, vetores[linhas])
+    dados = {
+        "chunks": len(vetores),
+        "paginas": len(nomes),
+        "copias": len(documentos) - len(nomes),
+        "limiar": limiar,
+        "paginas_mantidas": int(manter[:len(nomes)].sum()),
+        "copias_mantidas": int(manter[len(nomes):].sum()),
+        "media_crua_mantidas_0.55": int(near_duplicates(medias, 0.55).sum()),
+    }
+    if dados["paginas_mantidas"] != len(nomes):
+        falhas.append(f"indice: {len(nomes) - dados['paginas_mantidas']} páginas distintas descartadas")
+    if dados["copias_mantidas"]:
+        falhas.append(f"indice: {dados['copias_mantidas']} cópias de páginas mantidas")
+    return dados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--duplicadas", type=float, default=0.2, help="fração de quase-duplicatas")
+    parser.add_argument("--limiar", type=float, default=0.97)
+    parser.add_argument("--max-antigo", type=int, default=5000, help="maior n rodado no caminho antigo")
+    parser.add_argument("--indice", type=Path, default=None, help="pasta de um índice salvo (vetores reais)")
+    parser.add_argument("--copias", type=int, default=5, help="páginas copiadas no cenário do índice")
+    args = parser.parse_args()
+
+    resultados = []
+    for n in args.tamanhos:
+        vetores = gerar_vetores(n, args.dim, args.duplicadas)
+        linha = {"chunks": n}
+
+        manter, linha["blocos_s"], linha["blocos_mb"] = medir(near_duplicates, vetores, args.limiar)
+        linha["mantidos"] = int(manter.sum())
+
+        if n <= args.max_antigo:
+            antigo, linha["antigo_s"], linha["antigo_mb"] = medir(dedup_antigo, vetores, args.limiar)
+            assert (antigo == manter).all(), f"n={n}: resultados diferentes do caminho antigo"
+        resultados.append(linha)
+        print(json.dumps(linha))
+
+    saida = {"dim": args.dim, "limiar": args.limiar, "resultados": resultados}
+    falhas = []
+    if args.indice:
+        saida["indice"] = cenario_indice(args.indice, float(os.getenv("DEDUP_DOC_THRESHOLD", "0.9")),
+                                         args.copias, falhas)
+    print(json.dumps(saida, indent=2))
+    if falhas:
+        raise SystemExit("❌ " + "; ".join(falhas))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Descoberta de notícias: listagens + sondagem de IDs x lista fixa.
+
+Roda contra o site falso local (benchmarks.site_stub). As listagens mostram
+só parte das notícias; o resto precisa ser achado pela sondagem de IDs.
+
+- primeira: fronteira vazia, descobre tudo;
+- sem_novidades: segunda passada (listagens em 304, uma janela de sondagem);
+- publicadas: o site publica notícias novas fora da listagem.
+
+Em cada passada confere que as notícias achadas pela sondagem foram baixadas
+uma vez só e ficaram em ``raspadas``, que a indexação usa sem baixá-las de novo.
+
+Uso:
+    python -m benchmarks.bench_descoberta --latencia 0.02 --noticias 60
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.site_stub import SiteStub
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latencia", type=float, default=0.02, help="latência do servidor por requisição (s)")
+    parser.add_argument("--noticias", type=int, default=60, help="quantidade de notícias publicadas")
+    parser.add_argument("--novas", type=int, default=5, help="notícias publicadas entre as passadas")
+    args = parser.parse_args()
+
+    noticias = list(range(1000, 1000 + args.noticias))
+    listadas = noticias[: args.noticias // 2]
+    with SiteStub(latencia=args.latencia, noticias=noticias, listagem=listadas) as site, \
+            tempfile.TemporaryDirectory() as tmp:
+        os.environ["URL_JOVEM_PROGRAMADOR"] = site.url
+
+        from app.controllers.func_scraping import func_scraping_descoberta
+        from app.controllers.func_scraping.func_scraping_async import executar_sincrono
+        from app.controllers.func_scraping.func_scraping_descoberta import DescobridorNoticias, FronteiraNoticias
+
+        func_scraping_descoberta.NOTICIAS = []
+        arquivo = Path(tmp) / "crawl_frontier.json"
+        resultados = {}
+        falhas = []
+
+        def passada(nome, esperados):
+            site.requisicoes = site.respostas_304 = 0
+            site.corpos.clear()
+            inicio = time.perf_counter()
+            descobridor = DescobridorNoticias(FronteiraNoticias(arquivo))
+            novos = executar_sincrono(descobridor.descobrir)
+            assert novos == sorted(esperados), f"{nome}: esperava {sorted(esperados)}, veio {novos}"
+            sondadas = [i for i in novos if i not in listadas]
+            resultados[nome] = {
+                "tempo_s": round(time.perf_counter() - inicio, 3),
+                "novas": len(novos),
+                "requisicoes": site.requisicoes,
+                "respostas_304": site.respostas_304,
+                "raspadas": len(descobridor.raspadas),
+                "downloads_max_por_noticia": max((site.corpos[f"n.php?ID={i}"] for i in novos), default=0),
+            }
+            faltando = [i for i in sondadas if f"n.php?ID={i}" not in descobridor.raspadas]
+            if faltando:
+                falhas.append(f"{nome}: notícias sondadas sem página raspada: {faltando}")
+            if resultados[nome]["downloads_max_por_noticia"] > 1:
+                falhas.append(f"{nome}: notícia nova baixada {resultados[nome]['downloads_max_por_noticia']} vezes")
+
+        passada("primeira", noticias)
+        passada("sem_novidades", [])
+
+        publicadas = list(range(noticias[-1] + 1, noticias[-1] + 1 + args.novas))
+        site.noticias.update(publicadas)
+        passada("publicadas", publicadas)
+
+        print(json.dumps({"noticias": args.noticias, "listadas": len(listadas), **resultados}, indent=2))
+        if falhas:
+            raise SystemExit("❌ " + "; ".join(falhas))
+        print("✅ Notícias novas descobertas, cada uma baixada uma vez só e entregue à indexação.")
+
+
+if __name__ == "__main__":
+    main()
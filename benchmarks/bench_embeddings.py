@@ -0,0 +1,106 @@
+"""Vazão de embed_query sob carga concorrente: modelo direto x BatchingEmbeddings.
+
+Dispara perguntas de várias threads ao mesmo tempo (como workers atendendo
+requisições) e mede consultas/s e latência:
+
+- direto: cada requisição chama o modelo sozinha;
+- lote: BatchingEmbeddings agrupa as consultas simultâneas e guarda os
+  vetores no LRU (uma fração das perguntas se repete, --repetidas).
+
+Por padrão usa um modelo falso que imita a CPU: uma execução por vez, custo
+fixo por chamada mais custo por texto. Com --real usa o e5-small de verdade.
+
+Uso:
+    python -m benchmarks.bench_embeddings --perguntas 500 --threads 16
+    python -m benchmarks.bench_embeddings --real
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.embedding_service import BatchingEmbeddings
+from benchmarks.stubs import StubEmbeddings
+
+
+class ModeloCPU(StubEmbeddings):
+    """StubEmbeddings com custo de CPU: chamadas serializadas, custo fixo + custo por texto."""
+
+    def __init__(self, custo_chamada: float = 0.008, custo_texto: float = 0.001):
+        super().__init__()
+        self.custo_chamada = custo_chamada
+        self.custo_texto = custo_texto
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            time.sleep(self.custo_chamada + self.custo_texto * len(texts))
+            return [self._vetor(t) for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def medir(nome, embeddings, perguntas, threads) -> dict:
+    def uma(pergunta):
+        inicio = time.perf_counter()
+        embeddings.embed_query(pergunta)
+        return time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        latencias = sorted(executor.map(uma, perguntas))
+    duracao = time.perf_counter() - inicio
+    return {
+        "modo": nome,
+        "consultas_s": round(len(perguntas) / duracao, 1),
+        "p50_ms": round(statistics.median(latencias) * 1000, 2),
+        "p95_ms": round(latencias[int(len(latencias) * 0.95) - 1] * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--perguntas", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=16, help="requisições simultâneas")
+    parser.add_argument("--repetidas", type=float, default=0.3, help="fração de perguntas repetidas")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--wait-ms", type=float, default=2.0)
+    parser.add_argument("--real", action="store_true", help="usa o e5-small (HuggingFaceEmbeddings)")
+    args = parser.parse_args()
+
+    if args.real:
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        modelo = HuggingFaceEmbeddings(
+            model_name="intfloat/e5-small", model_kwargs={"device": "cpu"},
+            encode_kwargs={"normalize_embeddings": True},
+        )
+    else:
+        modelo = ModeloCPU()
+
+    random.seed(0)
+    unicas = [f"Como funciona a etapa {i} do Jovem Programador?" for i in range(args.perguntas)]
+    perguntas = [
+        random.choice(unicas[:max(1, i)]) if random.random() < args.repetidas else unicas[i]
+        for i in range(args.perguntas)
+    ]
+
+    modelo.embed_query("aquecimento")
+    lote = BatchingEmbeddings(modelo, max_batch=args.max_batch, wait_ms=args.wait_ms)
+    resultados = [
+        medir("direto", modelo, perguntas, args.threads),
+        medir("lote + cache", lote, perguntas, args.threads),
+    ]
+    resultados.append({
+        "ganho_vazao": round(resultados[1]["consultas_s"] / resultados[0]["consultas_s"], 1),
+        **lote.stats(),
+    })
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
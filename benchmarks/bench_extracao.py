@@ -0,0 +1,165 @@
+"""Extração de texto das páginas: BeautifulSoup (html.parser) x lxml numa passada.
+
+Para cada página do site falso (benchmarks/fixtures/site, as mesmas que o
+índice raspa) mede o tempo de ``extrair_conteudo`` com:
+
+- antigo: os extratores anteriores em BeautifulSoup, copiados abaixo
+  (get_text() de toda div/span/p/li, duas vezes por parágrafo nas notícias);
+- lxml: os extratores atuais (func_scraping_html).
+
+Também mede uma página sintética com ``--profundidade`` divs aninhadas e
+``--paragrafos`` parágrafos, onde o custo quadrático do get_text() aparece.
+
+Confere que o texto novo tem todos os trechos do antigo (o antigo repetia o
+texto das divs de dentro em cada div de fora; o novo não) e que notícias e
+empresas saem iguais.
+
+Uso:
+    python -m benchmarks.bench_extracao --repeticoes 20 --profundidade 40 --paragrafos 200
+"""
+import argparse
+import hashlib
+import json
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from bs4 import BeautifulSoup
+
+from app.controllers.func_scraping import func_scraping_fontes
+from app.controllers.func_scraping.func_scraping_main import PAGINAS_IMAGENS, extrair_conteudo
+from benchmarks.site_stub import SiteStub
+
+
+def limpar_texto(texto):
+    return ' '.join(texto.strip().split())
+
+
+def extrair_texto_generic_antigo(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag in soup.find_all(['script', 'style', 'nav', 'footer', 'header', 'form']):
+        tag.decompose()
+
+    textos_unicos = set()
+    resultados = []
+    for tag in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'li', 'span', 'div']):
+        texto = limpar_texto(tag.get_text())
+        if len(texto) > 10 and not tag.name == 'a':
+            hash_texto = hashlib.md5(texto.encode('utf-8')).hexdigest()
+            if hash_texto not in textos_unicos:
+                textos_unicos.add(hash_texto)
+                resultados.append(texto)
+    return "\n\n".join(resultados)
+
+
+def extrair_noticia_antigo(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag in soup.select('script, style, nav, footer, header, form'):
+        tag.decompose()
+
+    titulo = soup.select_one("h1.title")
+    titulo_texto = titulo.get_text(strip=True) if titulo else "Título não encontrado"
+    data = soup.select_one("h5.date")
+    data_texto = data.get_text(strip=True) if data else "Data não encontrada"
+    conteudo_div = soup.select_one("div.v-align-middle")
+    paragrafos = conteudo_div.find_all("p") if conteudo_div else []
+    corpo = "\n\n".join([p.get_text(strip=True) for p in paragrafos if len(p.get_text(strip=True)) > 30])
+    if not corpo:
+        return ""
+    return f"Conteúdo tipo: Notícia\n Título: {titulo_texto} Data: \n{data_texto}\n\nConteúdo: {corpo}"
+
+
+def extrair_imagens_antigo(html, tipo):
+    soup = BeautifulSoup(html, 'html.parser')
+    alts = []
+    for secao in soup.find_all('div', id='fh5co-blog-section'):
+        titulo = secao.find('h2')
+        if titulo and tipo.lower() in titulo.text.lower():
+            alts += [img.get('alt') for img in secao.find_all('img', class_='img-responsive') if img.get('alt')]
+    if not alts:
+        return ""
+    return f"Estas são as empresas {tipo.capitalize()} do Projeto Jovem Programador ou 'PJP': " + ", ".join(alts) + ".\n\n"
+
+
+def extrair_conteudo_antigo(path, html):
+    if path in PAGINAS_IMAGENS:
+        return extrair_imagens_antigo(html, path.replace(".php", ""))
+    elif path.startswith("n.php?ID="):
+        return extrair_noticia_antigo(html)
+    return extrair_texto_generic_antigo(html)
+
+
+def pagina_aninhada(profundidade: int, paragrafos: int) -> bytes:
+    """Layout com divs aninhadas (como os templates com container/row/col) e muito texto no fundo."""
+    corpo = "".join(
+        f"<p>Parágrafo {i} do conteúdo com <strong>destaque</strong> e <a href='#'>link</a> no meio.</p>"
+        for i in range(paragrafos)
+    )
+    abre = "".join(f"<div class='nivel-{i}'><span>Seção {i} da página</span>" for i in range(profundidade))
+    return f"<html><body><header>Menu</header>{abre}{corpo}{'</div>' * profundidade}</body></html>".encode("utf-8")
+
+
+def paginas_do_site() -> dict:
+    site = SiteStub(noticias=set(func_scraping_fontes.NOTICIAS))
+    paginas = {}
+    for path in func_scraping_fontes.listar_paginas():
+        partes = urlsplit("/" + path)
+        html = site.pagina(partes.path, parse_qs(partes.query))
+        if html is not None:
+            paginas[path] = html.encode("utf-8")
+    return paginas
+
+
+def medir(extrator, paginas: dict, repeticoes: int) -> tuple:
+    """Saída de cada página e o tempo médio por página (ms)."""
+    saidas = {}
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for path, html in paginas.items():
+            saidas[path] = extrator(path, html)
+    return saidas, (time.perf_counter() - inicio) * 1000 / (repeticoes * len(paginas))
+
+
+def conferir(path: str, antigo: str, novo: str) -> list:
+    if path in PAGINAS_IMAGENS or path.startswith("n.php?ID="):
+        return [] if antigo == novo else [f"{path}: saída diferente"]
+    # Sem espaços: o get_text() antigo grudava o texto de spans vizinhos ("páginaSeção")
+    novo = "".join(novo.split())
+    faltando = [trecho for trecho in antigo.split("\n\n") if "".join(trecho.split()) not in novo]
+    return [f"{path}: {len(faltando)} trecho(s) faltando, ex.: {faltando[0][:60]!r}"] if faltando else []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--profundidade", type=int, default=40, help="divs aninhadas na página sintética")
+    parser.add_argument("--paragrafos", type=int, default=200, help="parágrafos na página sintética")
+    args = parser.parse_args()
+
+    conjuntos = {
+        "site": paginas_do_site(),
+        "aninhada": {"aninhada.php": pagina_aninhada(args.profundidade, args.paragrafos)},
+    }
+    resultados, falhas = {}, []
+    for nome, paginas in conjuntos.items():
+        antigas, ms_antigo = medir(extrair_conteudo_antigo, paginas, args.repeticoes)
+        novas, ms_novo = medir(extrair_conteudo, paginas, args.repeticoes)
+        resultados[nome] = {
+            "paginas": len(paginas),
+            "kb_por_pagina": round(sum(map(len, paginas.values())) / len(paginas) / 1024, 1),
+            "antigo_ms_por_pagina": round(ms_antigo, 3),
+            "lxml_ms_por_pagina": round(ms_novo, 3),
+            "aceleracao": round(ms_antigo / ms_novo, 1),
+            "caracteres_antigo": sum(map(len, antigas.values())),
+            "caracteres_lxml": sum(map(len, novas.values())),
+        }
+        for path in paginas:
+            falhas += conferir(path, antigas[path], novas[path])
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if falhas:
+        raise SystemExit("❌ " + "; ".join(falhas))
+    print("✅ Extração com lxml sem perder texto; notícias e empresas iguais às do BeautifulSoup.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Busca vetorial (MMR) x BM25 x híbrida (RRF) sobre o índice atual.
+
+Mede, por pergunta:
+
+- latência da recuperação (p50/p95 em ms) de cada estratégia. O vetor da
+  pergunta já está no LRU do BatchingEmbeddings, então o tempo do modelo de
+  embeddings fica fora e sobra só o custo da busca;
+- taxa de acerto: fração das perguntas de benchmarks/perguntas_termos.json
+  (termos exatos: telefones, datas, empresas, "LGPD") em que algum dos k
+  chunks devolvidos contém o trecho esperado.
+
+A latência usa as perguntas de perguntas.json + perguntas_termos.json.
+"hibrido" é o retriever com a configuração do chatbot (score_gate_config,
+filtro vetorial desligado por padrão); "hibrido_filtro" liga o filtro com o
+limiar e a margem de --limiar/--margem (ou os do ambiente), para ver quanto
+da taxa de acerto ele custa antes de ligá-lo em produção.
+Com --stub os vetores vêm do StubEmbeddings: a latência vale, mas a taxa de
+acerto da busca vetorial não significa nada.
+
+Uso:
+    python -m benchmarks.bench_hibrido --repeticoes 20
+"""
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+from app.services.answer_cache import normalizar_pergunta
+from app.services.bm25 import BM25_FILE, BM25Index
+from app.services.embedding_service import BatchingEmbeddings, create_base_embeddings
+from app.services.hybrid_retriever import HybridRetriever, score_gate_config
+from app.services.index_versions import IndexVersions
+from app.services.vector_index import load_vectorstore
+
+PERGUNTAS = Path(__file__).parent / "perguntas.json"
+PERGUNTAS_TERMOS = Path(__file__).parent / "perguntas_termos.json"
+
+
+def percentil(valores: list, p: float) -> float:
+    valores = sorted(valores)
+    return valores[max(0, int(len(valores) * p) - 1)]
+
+
+def medir(buscar, perguntas: list, repeticoes: int) -> dict:
+    latencias = []
+    for _ in range(repeticoes):
+        for pergunta in perguntas:
+            inicio = time.perf_counter()
+            buscar(pergunta)
+            latencias.append(time.perf_counter() - inicio)
+    return {
+        "p50_ms": round(statistics.median(latencias) * 1000, 3),
+        "p95_ms": round(percentil(latencias, 0.95) * 1000, 3),
+    }
+
+
+def taxa_acerto(buscar, casos: list) -> float:
+    acertos = 0
+    for caso in casos:
+        textos = [normalizar_pergunta(doc.page_content) for doc in buscar(caso["pergunta"])]
+        esperados = [normalizar_pergunta(e) for e in caso["esperado"]]
+        acertos += any(e in texto for texto in textos for e in esperados)
+    return round(acertos / len(casos), 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--indice", type=Path, default=None, help="pasta do índice (padrão: a versão publicada)")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--repeticoes", type=int, default=10)
+    parser.add_argument("--stub", action="store_true", help="embeddings falsos (só latência)")
+    parser.add_argument("--limiar", type=float, default=0.75, help="limiar do hibrido_filtro, sem RETRIEVAL_SCORE_*")
+    parser.add_argument("--margem", type=float, default=0.05, help="margem do hibrido_filtro, sem RETRIEVAL_SCORE_*")
+    args = parser.parse_args()
+    args.indice = args.indice or IndexVersions().current()
+
+    if args.stub:
+        from benchmarks.stubs import StubEmbeddings
+        base = StubEmbeddings()
+    else:
+        base = create_base_embeddings()
+    embeddings = BatchingEmbeddings(base)
+    vectorstore = load_vectorstore(args.indice, embeddings)
+
+    inicio = time.perf_counter()
+    bm25 = BM25Index.from_vectorstore(vectorstore)
+    t_build = time.perf_counter() - inicio
+    if not (args.indice / BM25_FILE).exists():
+        bm25.save(args.indice / BM25_FILE)
+
+    casos = json.loads(PERGUNTAS_TERMOS.read_text(encoding="utf-8"))
+    perguntas = json.loads(PERGUNTAS.read_text(encoding="utf-8")) + [c["pergunta"] for c in casos]
+    for pergunta in perguntas:  # aquece o LRU: daqui em diante só a busca é medida
+        embeddings.embed_query(pergunta)
+
+    padrao = score_gate_config()
+    filtro = dict(padrao)
+    if filtro["score_threshold"] is None and filtro["score_margin"] is None:
+        filtro.update(score_threshold=args.limiar or None, score_margin=args.margem or None)
+    hibrido = HybridRetriever(vectorstore=vectorstore, bm25=bm25, k=args.k, fetch_k=20, **padrao)
+    hibrido_filtro = HybridRetriever(vectorstore=vectorstore, bm25=bm25, k=args.k, fetch_k=20, **filtro)
+    estrategias = {
+        "vetorial": lambda p: vectorstore.max_marginal_relevance_search(p, k=args.k, fetch_k=20),
+        "bm25": lambda p: [vectorstore.docstore.search(i) for i, _ in bm25.search(p, args.k)],
+        "hibrido": hibrido.invoke,
+        "hibrido_filtro": hibrido_filtro.invoke,
+    }
+
+    resultados = {}
+    for nome, buscar in estrategias.items():
+        resultados[nome] = medir(buscar, perguntas, args.repeticoes)
+        resultados[nome][f"acerto@{args.k}"] = taxa_acerto(buscar, casos)
+
+    print(json.dumps({
+        "chunks": len(bm25),
+        "termos": len(bm25.vocab),
+        "bm25_build_s": round(t_build, 3),
+        "bm25_arquivo_kb": round((args.indice / BM25_FILE).stat().st_size / 1024, 1),
+        "perguntas": len(perguntas),
+        "perguntas_termos": len(casos),
+        "padrao": padrao,
+        "filtro": hibrido_filtro.stats(),
+        "estrategias": resultados,
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
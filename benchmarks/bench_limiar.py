@@ -0,0 +1,247 @@
+"""Calibra RETRIEVAL_SCORE_THRESHOLD, RETRIEVAL_SCORE_MARGIN e RETRIEVAL_BM25_COVERAGE no índice atual.
+
+Para cada pergunta mede o cosseno do melhor chunk e o cosseno médio da
+pergunta com o índice (o produto com o vetor médio). Para cada limiar e
+margem mostra quantas perguntas do escopo passam (melhor >= limiar e
+melhor >= média + margem) e quantas fora do escopo são barradas sem chamar
+o LLM.
+
+- com o modelo (padrão): perguntas do escopo (perguntas.json +
+  perguntas_termos.json) x fora do escopo (perguntas_fora.json);
+- ``--corpus``: só com os vetores do índice, sem baixar o modelo. Escopo:
+  cada chunk contra os outros (sem ele e sem as duplicatas). Fora: vetores
+  sem assunto com a mesma anisotropia dos chunks (a direção média mais ruído)
+  e o próprio vetor médio;
+- ``--bm25``: só a cobertura do BM25 (fração dos termos da pergunta, pesados
+  pelo idf, no melhor chunk do BM25), sem o modelo, nas perguntas reais:
+  perguntas_termos.json, perguntas.json e perguntas_fora.json. É o que deixa
+  uma pergunta passar quando o filtro vetorial barra todos os chunks.
+
+Os vetores do e5-small apontam quase todos para o mesmo lado: no índice
+publicado todo par de chunks tem cosseno >= 0.70 (mediana 0.81) e um vetor
+sem assunto chega a 0.85 com algum chunk, então limiar absoluto nenhum
+separa os dois grupos; a margem sobre a média separa. No fim confere, pelo
+próprio HybridRetriever (filtro vetorial + BM25), que as perguntas fora do
+escopo são barradas e as do escopo passam com a configuração atual
+(score_gate_config) ou, com o filtro desligado (o padrão), com os valores
+candidatos de --limiar e --margem. Só ligue o filtro em produção depois de
+ver esta conferência passar no modo com o modelo.
+
+Referência no índice publicado (--bm25, cobertura 0.5): 0/20 perguntas fora
+do escopo passam pelo BM25, contra 16/20 das de termos exatos e 17/30 das
+gerais; a maior cobertura fora do escopo é 0.33.
+
+Uso:
+    python -m benchmarks.bench_limiar --limiares 0.7 0.75 0.8 --margens 0 0.03 0.05
+    python -m benchmarks.bench_limiar --corpus
+    python -m benchmarks.bench_limiar --bm25 --coberturas 0.3 0.4 0.5 0.6
+"""
+import argparse
+import json
+import statistics
+from pathlib import Path
+
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import FakeEmbeddings
+
+from app.services.bm25 import BM25_FILE, BM25Index
+from app.services.hybrid_retriever import HybridRetriever, cosine_similarity, score_gate_config
+from app.services.index_versions import IndexVersions
+from app.services.vector_index import DOCSTORE_META, load_vectorstore, read_faiss_index
+
+PASTA = Path(__file__).parent
+
+
+def carregar_perguntas() -> tuple:
+    """(termos, gerais, fora): perguntas_termos.json, perguntas.json e perguntas_fora.json."""
+    termos = [c["pergunta"] for c in json.loads((PASTA / "perguntas_termos.json").read_text(encoding="utf-8"))]
+    gerais = json.loads((PASTA / "perguntas.json").read_text(encoding="utf-8"))
+    fora = json.loads((PASTA / "perguntas_fora.json").read_text(encoding="utf-8"))
+    return termos, gerais, fora
+
+
+def carregar_bm25(pasta: Path, vectorstore) -> BM25Index:
+    bm25 = BM25Index.load(pasta / BM25_FILE)
+    if bm25 is None or set(bm25.doc_ids) != set(vectorstore.index_to_docstore_id.values()):
+        bm25 = BM25Index.from_vectorstore(vectorstore)
+    return bm25
+
+
+def melhores_cossenos(vectorstore, vetores: np.ndarray) -> list:
+    scores, _ = vectorstore.index.search(vetores, 1)
+    return [cosine_similarity(vectorstore, score) for score in scores[:, 0]]
+
+
+def perguntas_do_modelo(args):
+    """Vectorstore e vetores das perguntas (escopo, fora) com o modelo de embeddings."""
+    from app.services.embedding_service import create_base_embeddings
+
+    embeddings = create_base_embeddings()
+    vectorstore = load_vectorstore(args.indice, embeddings)
+
+    termos, gerais, fora = carregar_perguntas()
+    escopo = gerais + termos
+    vetores = np.array(embeddings.embed_documents(escopo + fora), dtype=np.float32)
+    return vectorstore, escopo, fora, vetores[:len(escopo)], vetores[len(escopo):]
+
+
+def calibrar_bm25(args):
+    """Cobertura do melhor chunk do BM25 em cada grupo de perguntas reais; não precisa do modelo."""
+    if (args.indice / DOCSTORE_META).exists():
+        vectorstore = load_vectorstore(args.indice, FakeEmbeddings(size=384), use_mmap=False)
+    else:  # formato antigo: lê sem converter a pasta
+        vectorstore = FAISS.load_local(str(args.indice), FakeEmbeddings(size=384), allow_dangerous_deserialization=True)
+    bm25 = carregar_bm25(args.indice, vectorstore)
+
+    def cobertura(pergunta: str) -> float:
+        encontrados = bm25.search(pergunta, 1)
+        return bm25.coverage(pergunta, encontrados[0][0]) if encontrados else 0.0
+
+    termos, gerais, fora = carregar_perguntas()
+    grupos = {nome: [cobertura(p) for p in perguntas]
+              for nome, perguntas in (("termos", termos), ("gerais", gerais), ("fora", fora))}
+    padrao = score_gate_config()["bm25_coverage"]
+    coberturas = sorted(set(args.coberturas) | ({padrao} if padrao else set()))
+
+    print(json.dumps({
+        "modo": "bm25",
+        "grupos": {nome: {"perguntas": len(valores), **resumo(valores)} for nome, valores in grupos.items()},
+        "passam_pelo_bm25": {str(c): {nome: round(np.mean([v >= c for v in valores]), 4)
+                                      for nome, valores in grupos.items()} for c in coberturas},
+        "padrao": padrao,
+    }, indent=2, ensure_ascii=False))
+
+    if padrao is None:
+        print("✅ RETRIEVAL_BM25_COVERAGE=0: o BM25 não deixa passar perguntas barradas pelo filtro vetorial.")
+        return
+    fora_barradas = float(np.mean([v < padrao for v in grupos["fora"]]))
+    if fora_barradas < args.minimo:
+        raise SystemExit(f"❌ com a cobertura {padrao} só {fora_barradas:.0%} das perguntas fora do escopo "
+                         f"ficam barradas pelo BM25")
+    print("✅ Com a cobertura padrão o BM25 não deixa passar as perguntas fora do escopo.")
+
+
+def perguntas_do_corpus(args):
+    """Vectorstore só com o índice, melhores cossenos do escopo (deixando cada chunk de fora) e vetores fora do escopo."""
+    index = read_faiss_index(args.indice / "index.faiss", use_mmap=False)
+    vectorstore = FAISS(embedding_function=FakeEmbeddings(size=index.d), index=index,
+                        docstore=InMemoryDocstore(), index_to_docstore_id={})
+    chunks = index.reconstruct_n(0, index.ntotal)
+
+    similaridade = chunks @ chunks.T
+    np.fill_diagonal(similaridade, -1.0)
+    similaridade[similaridade > 0.995] = -1.0  # duplicatas não contam como vizinho
+    melhores_escopo = similaridade.max(axis=1).tolist()
+
+    direcao = chunks.mean(axis=0)
+    direcao /= np.linalg.norm(direcao)
+    anisotropia = float(np.median(chunks @ direcao))
+    ruido = np.random.default_rng(0).standard_normal((args.sinteticos, chunks.shape[1])).astype(np.float32)
+    ruido -= np.outer(ruido @ direcao, direcao)
+    ruido /= np.linalg.norm(ruido, axis=1, keepdims=True)
+    fora = np.vstack([anisotropia * direcao + np.sqrt(1 - anisotropia ** 2) * ruido, direcao[None, :]])
+    return vectorstore, chunks, melhores_escopo, fora.astype(np.float32)
+
+
+def resumo(cossenos: list) -> dict:
+    return {
+        "min": round(min(cossenos), 4),
+        "p50": round(statistics.median(cossenos), 4),
+        "max": round(max(cossenos), 4),
+    }
+
+
+def passa(melhor: float, media: float, limiar: float, margem: float) -> bool:
+    return melhor >= limiar and melhor >= media + margem
+
+
+def barradas_pelo_retriever(retriever: HybridRetriever, vetores: np.ndarray, perguntas: list = None) -> list:
+    """Para cada vetor, se o HybridRetriever barra a pergunta: nenhum chunk passa no filtro
+    vetorial e (com ``perguntas`` e o BM25) nenhum chunk do BM25 tem a cobertura mínima."""
+    scores, _ = retriever.vectorstore.index.search(vetores, 1)
+    perguntas = perguntas or [None] * len(vetores)
+    return [not retriever._filtrar([(None, score)], vetor)
+            and not (pergunta and retriever.bm25 is not None and retriever._fundir([], pergunta))
+            for vetor, score, pergunta in zip(vetores, scores[:, 0], perguntas)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--indice", type=Path, default=None, help="pasta do índice (padrão: a versão publicada)")
+    parser.add_argument("--limiares", type=float, nargs="+", default=[0.7, 0.75, 0.8, 0.85])
+    parser.add_argument("--margens", type=float, nargs="+", default=[0.0, 0.03, 0.04, 0.05, 0.06])
+    parser.add_argument("--corpus", action="store_true", help="calibra só com os vetores do índice, sem o modelo")
+    parser.add_argument("--sinteticos", type=int, default=500, help="vetores sem assunto no modo --corpus")
+    parser.add_argument("--bm25", action="store_true", help="calibra só a cobertura do BM25, sem o modelo")
+    parser.add_argument("--coberturas", type=float, nargs="+", default=[0.3, 0.4, 0.5, 0.6, 0.7])
+    parser.add_argument("--limiar", type=float, default=0.75, help="limiar candidato, com o filtro desligado")
+    parser.add_argument("--margem", type=float, default=0.05, help="margem candidata, com o filtro desligado")
+    parser.add_argument("--minimo", type=float, default=0.9,
+                        help="fração mínima de escopo aprovado e de fora barrado com os padrões")
+    args = parser.parse_args()
+    args.indice = args.indice or IndexVersions().current()
+
+    if args.bm25:
+        calibrar_bm25(args)
+        return
+
+    perguntas_escopo = perguntas_fora = None
+    if args.corpus:
+        vectorstore, vetores_escopo, melhores_escopo, vetores_fora = perguntas_do_corpus(args)
+    else:
+        vectorstore, perguntas_escopo, perguntas_fora, vetores_escopo, vetores_fora = perguntas_do_modelo(args)
+        melhores_escopo = melhores_cossenos(vectorstore, vetores_escopo)
+    melhores_fora = melhores_cossenos(vectorstore, vetores_fora)
+
+    padrao = score_gate_config()
+    if padrao["score_threshold"] is None and padrao["score_margin"] is None:
+        # Filtro desligado (o padrão): confere os valores candidatos antes de ligá-lo
+        padrao.update(score_threshold=args.limiar or None, score_margin=args.margem or None)
+    bm25 = None if args.corpus else carregar_bm25(args.indice, vectorstore)
+    retriever = HybridRetriever(vectorstore=vectorstore, bm25=bm25, **padrao)
+    medio = retriever._vetor_medio()
+    medias_escopo = (vetores_escopo @ medio).tolist()
+    medias_fora = (vetores_fora @ medio).tolist()
+
+    limiares = {}
+    for limiar in args.limiares:
+        for margem in args.margens:
+            limiares[f"{limiar}+{margem}"] = {
+                "escopo_aprovadas": round(np.mean([passa(c, m, limiar, margem)
+                                                   for c, m in zip(melhores_escopo, medias_escopo)]), 4),
+                "fora_bloqueadas": round(np.mean([not passa(c, m, limiar, margem)
+                                                  for c, m in zip(melhores_fora, medias_fora)]), 4),
+            }
+
+    # Os padrões pelo próprio retriever; o escopo do --corpus está no índice, então vale a conta acima
+    fora_barradas = float(np.mean(barradas_pelo_retriever(retriever, vetores_fora, perguntas_fora)))
+    if args.corpus:
+        escopo_aprovadas = float(np.mean([passa(c, m, padrao["score_threshold"] or -1.0, padrao["score_margin"] or -1.0)
+                                          for c, m in zip(melhores_escopo, medias_escopo)]))
+    else:
+        escopo_aprovadas = 1 - float(np.mean(barradas_pelo_retriever(retriever, vetores_escopo, perguntas_escopo)))
+
+    print(json.dumps({
+        "modo": "corpus" if args.corpus else "modelo",
+        "escopo": {"perguntas": len(melhores_escopo), **resumo(melhores_escopo),
+                   "margem_p50": round(statistics.median(np.subtract(melhores_escopo, medias_escopo)), 4)},
+        "fora": {"perguntas": len(melhores_fora), **resumo(melhores_fora),
+                 "margem_p50": round(statistics.median(np.subtract(melhores_fora, medias_fora)), 4)},
+        "limiar+margem": limiares,
+        "padrao": {**padrao, "escopo_aprovadas": round(escopo_aprovadas, 4), "fora_bloqueadas": round(fora_barradas, 4)},
+    }, indent=2, ensure_ascii=False))
+
+    falhas = []
+    if fora_barradas < args.minimo:
+        falhas.append(f"com os padrões só {fora_barradas:.0%} das perguntas fora do escopo são barradas")
+    if escopo_aprovadas < args.minimo:
+        falhas.append(f"com os padrões só {escopo_aprovadas:.0%} das perguntas do escopo passam")
+    if falhas:
+        raise SystemExit("❌ " + "; ".join(falhas))
+    print("✅ Com esse limiar e margem as perguntas fora do escopo são barradas e as do escopo passam.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Perguntas em lote (chat_batch, /pergunta/batch) x uma pergunta por vez.
+
+Reavalia ``--perguntas`` perguntas (as de benchmarks/perguntas.json
+repetidas com variações) com o StubChatbot:
+
+- individual: ``chat`` de cada pergunta num pool de ``--workers`` threads,
+  como um script mandando POSTs em paralelo;
+- lote: ``chat_batch`` com concorrência ``--workers`` no LLM.
+
+Mede tempo total, chamadas ao modelo de embeddings (``--latencia-embedding``
+por chamada), buscas no FAISS e chamadas ao LLM. Depois repete com o LLM
+limitando ``--limite`` chamadas simultâneas (429 com Retry-After, como o
+Groq): uma pergunta por vez devolve erros, o lote espera e reduz a
+concorrência. Por fim confere /pergunta/batch no Flask e no ASGI, em JSON e
+NDJSON.
+
+Sai com erro se o lote errar alguma resposta ou a rota devolver algo fora de ordem.
+
+Uso:
+    python -m benchmarks.bench_lote --perguntas 500 --workers 8 --limite 3
+"""
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app.services import metrics
+from benchmarks.stubs import StubChatbot, StubChatModel, StubEmbeddings
+
+PERGUNTAS = Path(__file__).parent / "perguntas.json"
+ERRO = "Desculpe, ocorreu um erro. Por favor, tente novamente."
+
+
+class EmbeddingsContados(StubEmbeddings):
+    def __init__(self, latencia: float):
+        super().__init__(latencia=latencia)
+        self.chamadas = 0
+
+    def embed_documents(self, texts):
+        self.chamadas += 1
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.chamadas += 1
+        return super().embed_query(text)
+
+
+def criar_bot(args, limite: int = 0) -> StubChatbot:
+    return StubChatbot(
+        groq=StubChatModel(latencia=args.latencia, limite_simultaneas=limite),
+        gemini=StubChatModel(latencia=args.latencia * 2, resposta="Resposta do Gemini.", limite_simultaneas=limite),
+        embeddings=EmbeddingsContados(args.latencia_embedding),
+    )
+
+
+def buscas_faiss() -> int:
+    return sum(contagem for chave, (contagem, _) in metrics.ETAPA.totals().items() if chave == ("faiss",))
+
+
+def rodar(bot, perguntas: list, modo: str, workers: int) -> tuple:
+    faiss_antes = buscas_faiss()
+    inicio = time.perf_counter()
+    if modo == "lote":
+        respostas = bot.chat_batch(perguntas, concorrencia=workers)
+    else:
+        with ThreadPoolExecutor(workers) as pool:
+            respostas = list(pool.map(bot.chat, perguntas))
+    duracao = time.perf_counter() - inicio
+    return respostas, {
+        "total_s": round(duracao, 3),
+        "perguntas_s": round(len(perguntas) / duracao, 1),
+        "chamadas_embedding": bot.embeddings.chamadas,
+        "buscas_faiss": buscas_faiss() - faiss_antes,
+        "chamadas_llm": bot.groq_model.chamadas + bot.gemini_model.chamadas,
+        "respostas_429": bot.groq_model.limitadas + bot.gemini_model.limitadas,
+        "erros": sum(resposta == ERRO for resposta in respostas),
+    }
+
+
+def conferir_rotas(args, perguntas: list) -> list:
+    import httpx
+    from app import create_app
+    from app.asgi import create_asgi_app
+    from app.controllers import pergunta_controller
+
+    pergunta_controller.chatbot = bot = criar_bot(args)  # já pronto: create_app não dispara a inicialização real
+    pergunta_controller.limitador = None  # todas as requisições vêm do mesmo cliente
+    esperado = bot.chat_batch(perguntas, usar_cache=False)
+    flask_app = create_app()
+    falhas = []
+
+    def conferir(nome, respostas):
+        if respostas != esperado:
+            falhas.append(f"{nome}: respostas diferentes de chat_batch")
+
+    cliente = flask_app.test_client()
+    conferir("flask json", cliente.post("/pergunta/batch", json={"perguntas": perguntas}).get_json()["respostas"])
+    linhas = cliente.post("/pergunta/batch", json={"perguntas": perguntas, "stream": True}).get_data(as_text=True)
+    itens = [json.loads(linha) for linha in linhas.splitlines()]
+    conferir("flask ndjson", [r for _, r in sorted((item["indice"], item["resposta"]) for item in itens)])
+    if cliente.post("/pergunta/batch", json={"perguntas": "uma só"}).status_code != 400:
+        falhas.append("flask: corpo inválido não deu 400")
+
+    async def via_asgi():
+        transporte = httpx.ASGITransport(app=create_asgi_app(flask_app))
+        async with httpx.AsyncClient(transport=transporte, base_url="http://teste") as asgi:
+            resposta = await asgi.post("/pergunta/batch", json={"perguntas": perguntas})
+            conferir("asgi json", resposta.json()["respostas"])
+            resposta = await asgi.post("/pergunta/batch", json={"perguntas": perguntas, "stream": True})
+            itens = [json.loads(linha) for linha in resposta.text.splitlines()]
+            conferir("asgi ndjson", [r for _, r in sorted((item["indice"], item["resposta"]) for item in itens)])
+
+    asyncio.run(via_asgi())
+    return falhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--perguntas", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=8, help="threads (individual) e concorrência do lote")
+    parser.add_argument("--latencia", type=float, default=0.02, help="latência do LLM falso (s); Gemini = 2x")
+    parser.add_argument("--latencia-embedding", type=float, default=0.002, help="latência por chamada de embeddings")
+    parser.add_argument("--limite", type=int, default=3, help="chamadas simultâneas aceitas pelo LLM limitado")
+    args = parser.parse_args()
+
+    base = json.loads(PERGUNTAS.read_text(encoding="utf-8"))
+    perguntas = [f"{base[i % len(base)]} ({i // len(base)})" for i in range(args.perguntas)]
+
+    resultados = {}
+    for cenario, limite in (("sem_limite", 0), ("limite_taxa", args.limite)):
+        for modo in ("individual", "lote"):
+            _, resultados[f"{cenario}_{modo}"] = rodar(criar_bot(args, limite), perguntas, modo, args.workers)
+    falhas = [f"{nome}: {dados['erros']} erros" for nome, dados in resultados.items()
+              if nome.endswith("_lote") and dados["erros"]]
+    falhas += conferir_rotas(args, perguntas[:40])
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if falhas:
+        raise SystemExit("❌ " + "; ".join(falhas))
+    print("✅ Lote sem erros (também com limite de taxa) e /pergunta/batch na ordem, em JSON e NDJSON.")
+
+
+if __name__ == "__main__":
+    main()
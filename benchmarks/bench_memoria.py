@@ -0,0 +1,86 @@
+"""RSS/PSS por worker do gunicorn com e sem compartilhamento de memória.
+
+Sobe o gunicorn duas vezes com WEB_CONCURRENCY workers:
+
+- isolado: sem preload e sem mmap (cada worker carrega modelo e índice);
+- compartilhado: GUNICORN_PRELOAD=1 e FAISS_MMAP=1.
+
+Espera o /pergunta/status ficar pronto e lê /proc/<pid>/smaps_rollup de cada
+worker. O PSS divide as páginas compartilhadas entre os processos, então é a
+medida que mostra o ganho; o RSS conta as páginas compartilhadas em todos.
+
+Uso (Linux):
+    python -m benchmarks.bench_memoria --workers 4
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+
+def _memoria(pid: int) -> dict:
+    valores = {}
+    for linha in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        nome, valor = linha.split(":", 1)
+        valores[nome] = int(valor.split()[0])
+    return {"rss_mb": round(valores["Rss"] / 1024, 1), "pss_mb": round(valores["Pss"] / 1024, 1)}
+
+
+def _filhos(pid: int) -> list:
+    filhos = []
+    for tarefa in Path(f"/proc/{pid}/task").iterdir():
+        filhos += [int(p) for p in (tarefa / "children").read_text().split()]
+    return filhos
+
+
+def _esperar_pronto(porta: int, workers: int, timeout: float = 600):
+    limite = time.time() + timeout
+    prontos = 0
+    while time.time() < limite and prontos < workers * 3:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{porta}/pergunta/status", timeout=5) as r:
+                prontos += r.status == 200
+        except Exception:
+            time.sleep(0.5)
+    # Cada requisição cai num worker qualquer; dá um tempo extra para todos
+    time.sleep(5)
+
+
+def medir(nome: str, env_extra: dict, workers: int, porta: int) -> dict:
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(porta), SERVING_MODE="sync", **env_extra)
+    processo = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"], env=env)
+    try:
+        _esperar_pronto(porta, workers)
+        por_worker = [_memoria(pid) for pid in _filhos(processo.pid)]
+        return {
+            "modo": nome,
+            "master": _memoria(processo.pid),
+            "workers": por_worker,
+            "rss_medio_mb": round(sum(w["rss_mb"] for w in por_worker) / len(por_worker), 1),
+            "pss_total_mb": round(sum(w["pss_mb"] for w in por_worker) + _memoria(processo.pid)["pss_mb"], 1),
+        }
+    finally:
+        processo.send_signal(signal.SIGTERM)
+        processo.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--porta", type=int, default=5055)
+    args = parser.parse_args()
+
+    resultados = [
+        medir("isolado", {"GUNICORN_PRELOAD": "0", "FAISS_MMAP": "0", "CHATBOT_STARTUP": "eager"}, args.workers, args.porta),
+        medir("compartilhado", {"GUNICORN_PRELOAD": "1", "FAISS_MMAP": "1"}, args.workers, args.porta),
+    ]
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Custo da instrumentação (app.services.metrics) e conferência do /metrics.
+
+- micro: custo por chamada de ``Histogram.time()`` e ``Counter.inc()`` com as
+  métricas ligadas e desligadas (METRICS_ENABLED=0), contra um bloco vazio;
+- chain: latência da chain do StubChatbot (busca + contexto + roteador, LLM
+  falso sem espera) com as métricas ligadas x desligadas, em rodadas alternadas;
+- /metrics: faz perguntas pelo Flask e confere que o texto exportado segue o
+  formato do Prometheus e traz as etapas, o provedor e a latência HTTP.
+
+Sai com erro se o /metrics vier inválido ou sem as séries esperadas.
+
+Uso:
+    python -m benchmarks.bench_metricas --perguntas 200
+"""
+import argparse
+import json
+import re
+import statistics
+import time
+
+from app.services import metrics
+from benchmarks.stubs import StubChatbot, StubChatModel
+
+LINHA = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[a-zA-Z_][a-zA-Z0-9_]*="[^"]*"(,[a-zA-Z_][a-zA-Z0-9_]*="[^"]*")*\})? '
+                   r'(-?[0-9.e+-]+|\+Inf|NaN)$')
+ESPERADAS = [
+    'chatbot_etapa_segundos_count{etapa="embedding"}',
+    'chatbot_etapa_segundos_count{etapa="faiss"}',
+    'chatbot_etapa_segundos_count{etapa="mmr"}',
+    'chatbot_etapa_segundos_count{etapa="contexto"}',
+    'chatbot_llm_respostas_total{provedor="groq"}',
+    'chatbot_llm_tokens_total{provedor="groq",tipo="entrada"}',
+    'chatbot_pergunta_segundos_count{metodo="chat",origem="busca"}',
+    'chatbot_cache_respostas_total{resultado="hit_exato"}',
+    'http_requisicao_segundos_count{rota="/pergunta/",status="200"}',
+]
+
+
+def custo_ns(funcao, repeticoes: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1e9
+
+
+def micro(repeticoes: int) -> dict:
+    histograma = metrics.Histogram("bench_segundos", "bench", ["etapa"])
+    contador = metrics.Counter("bench_total", "bench", ["provedor"])
+
+    def cronometro():
+        with histograma.time(etapa="faiss"):
+            pass
+
+    resultado = {"vazio_ns": round(custo_ns(lambda: None, repeticoes), 1)}
+    for ligado in (True, False):
+        metrics.set_enabled(ligado)
+        nome = "ligado" if ligado else "desligado"
+        resultado[f"time_{nome}_ns"] = round(custo_ns(cronometro, repeticoes), 1)
+        resultado[f"inc_{nome}_ns"] = round(custo_ns(lambda: contador.inc(provedor="groq"), repeticoes), 1)
+    metrics.set_enabled(True)
+    return resultado
+
+
+def chain(bot, perguntas: int, rodadas: int) -> dict:
+    tempos = {True: [], False: []}
+    for rodada in range(rodadas * 2):
+        ligado = rodada % 2 == 0
+        metrics.set_enabled(ligado)
+        for i in range(perguntas):
+            inicio = time.perf_counter()
+            bot.chain.invoke(f"Como funciona o programa? {rodada} {i}")
+            tempos[ligado].append(time.perf_counter() - inicio)
+    metrics.set_enabled(True)
+    ligado, desligado = statistics.median(tempos[True]), statistics.median(tempos[False])
+    return {
+        "p50_ligado_ms": round(ligado * 1000, 3),
+        "p50_desligado_ms": round(desligado * 1000, 3),
+        "sobrecusto_us": round((ligado - desligado) * 1e6, 1),
+        "sobrecusto_pct": round((ligado / desligado - 1) * 100, 2),
+    }
+
+
+def conferir_metrics(bot) -> list:
+    from app import create_app
+    from app.controllers import pergunta_controller
+
+    pergunta_controller.chatbot = bot  # já pronto: create_app não dispara a inicialização real
+    cliente = create_app().test_client()
+    for pergunta in ("Quem pode participar?", "Quem pode participar?", "Como funciona o hackathon?"):
+        resposta = cliente.post("/pergunta/", json={"pergunta": pergunta})
+        resposta.close()  # o servidor WSGI fecha a resposta; é aí que a duração é registrada
+        assert resposta.status_code == 200
+
+    texto = cliente.get("/metrics").get_data(as_text=True)
+    falhas = [f"linha inválida: {linha}" for linha in texto.splitlines()
+              if linha and not linha.startswith("#") and not LINHA.match(linha)]
+    falhas += [f"série ausente: {serie}" for serie in ESPERADAS if serie + " " not in texto]
+    return falhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--perguntas", type=int, default=200)
+    parser.add_argument("--rodadas", type=int, default=3)
+    parser.add_argument("--repeticoes", type=int, default=200000, help="chamadas no micro benchmark")
+    args = parser.parse_args()
+
+    bot = StubChatbot(groq=StubChatModel(latencia=0.0))
+    resultados = {"micro": micro(args.repeticoes), "chain": chain(bot, args.perguntas, args.rodadas)}
+    falhas = conferir_metrics(bot)
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if falhas:
+        raise SystemExit("❌ " + "; ".join(falhas))
+    print("✅ /metrics no formato do Prometheus com as etapas, o provedor e a latência HTTP.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Raspagem: threads + requests (caminho antigo) x MotorRaspagem assíncrono.
+
+Roda contra o site falso local (benchmarks.site_stub) com latência por
+requisição, confere que os dois caminhos extraem o mesmo conteúdo e mede:
+
+- antigo: ThreadPoolExecutor(5) chamando func_scraping_fonte (uma conexão por página);
+- async: MotorRaspagem com keep-alive e limite por host;
+- async_condicional: segunda passada com ETag/Last-Modified (tudo 304).
+
+Referência (69 páginas, --por-host 8, loopback):
+
+    latência   antigo   async    condicional
+    0.05 s     0.89 s   0.63 s   0.54 s   (1.4x)
+    0.10 s     1.58 s   1.11 s   1.01 s   (1.4x)
+    0 s        0.19 s   0.28 s   0.20 s   (criar o AsyncClient e o event loop domina)
+
+Com 200 notícias e 0.05 s: 2.72 s x 1.76 s (1.5x). No loopback abrir conexão
+é quase de graça; contra o site real (TLS) o keep-alive pesa mais.
+
+Uso:
+    python -m benchmarks.bench_raspagem --latencia 0.05 --noticias 60
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.site_stub import SiteStub
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latencia", type=float, default=0.05, help="latência do servidor por requisição (s)")
+    parser.add_argument("--noticias", type=int, default=60, help="quantidade de notícias publicadas")
+    parser.add_argument("--por-host", type=int, default=8)
+    args = parser.parse_args()
+
+    noticias = range(1000, 1000 + args.noticias)
+    with SiteStub(latencia=args.latencia, noticias=noticias) as site:
+        os.environ["URL_JOVEM_PROGRAMADOR"] = site.url
+
+        from app.controllers.func_scraping import func_scraping_fontes
+        from app.controllers.func_scraping.func_scraping_async import MotorRaspagem, raspar_fontes
+        from app.controllers.func_scraping.func_scraping_main import func_scraping_fonte
+
+        func_scraping_fontes.NOTICIAS = list(noticias)
+        paths = func_scraping_fontes.listar_paginas()
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            antigo = dict(zip(paths, executor.map(func_scraping_fonte, paths)))
+        t_antigo = time.perf_counter() - inicio
+
+        motor = MotorRaspagem(max_por_host=args.por_host)
+        inicio = time.perf_counter()
+        novo = raspar_fontes({p: (None, None) for p in paths}, motor)
+        t_async = time.perf_counter() - inicio
+
+        erros = [p for p, r in novo.items() if isinstance(r, Exception)]
+        diferentes = [p for p in paths if p not in erros and novo[p].conteudo != antigo[p].conteudo]
+        assert not erros, f"falhas na raspagem assíncrona: {erros}"
+        assert not diferentes, f"conteúdo diferente do caminho antigo: {diferentes}"
+
+        site.respostas_304 = 0
+        inicio = time.perf_counter()
+        condicional = raspar_fontes({p: (r.etag, r.last_modified) for p, r in novo.items()}, motor)
+        t_condicional = time.perf_counter() - inicio
+        assert all(r.status == 304 for r in condicional.values()), "esperava 304 em todas as páginas"
+
+        print(json.dumps({
+            "paginas": len(paths),
+            "latencia_servidor_s": args.latencia,
+            "antigo_s": round(t_antigo, 3),
+            "async_s": round(t_async, 3),
+            "async_condicional_s": round(t_condicional, 3),
+            "respostas_304": site.respostas_304,
+            "ganho": round(t_antigo / t_async, 1),
+            "ganho_condicional": round(t_antigo / t_condicional, 1),
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Fallback sequencial (with_fallbacks) x LLMRouter (hedge + circuit breaker).
+
+LLMs falsos (StubChatModel) com atrasos e falhas injetados, em três cenários:
+
+- normal: Groq rápido, Gemini um pouco mais lento;
+- cauda: uma fração das chamadas ao Groq demora --cauda segundos a mais;
+- queda: o Groq falha depois de --timeout segundos (como um timeout) em toda chamada.
+
+Para cada cenário mede a latência das perguntas (sequenciais), quantas
+respostas vieram de cada provedor e quantas chamadas foram ao Groq (com o
+circuito aberto o roteador nem tenta).
+
+Por último, o meio-aberto: com o circuito do Groq aberto e o cooldown
+vencido, --simultaneas perguntas chegam juntas (threads e asyncio); só uma
+pode testar o Groq e as outras vão para o Gemini. Também confere que a
+chamada de teste cancelada (perdeu o hedge) deixa a próxima testar.
+
+Uso:
+    python -m benchmarks.bench_roteador --perguntas 100
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from app.services.llm_router import CircuitBreaker, LLMRouter, Provider
+from benchmarks.stubs import StubChatModel
+
+PROMPT = ChatPromptTemplate.from_template("Pergunta: {question}")
+
+
+def modelos(cenario: str, args):
+    groq = StubChatModel(resposta="groq", latencia=args.groq)
+    gemini = StubChatModel(resposta="gemini", latencia=args.gemini)
+    if cenario == "cauda":
+        groq.prob_cauda, groq.latencia_cauda = args.prob_cauda, args.cauda
+    elif cenario == "queda":
+        groq.latencia, groq.falhar = args.timeout, True
+    return groq, gemini
+
+
+def medir(chain, groq, perguntas: int) -> dict:
+    latencias, origens = [], {}
+    for i in range(perguntas):
+        inicio = time.perf_counter()
+        resposta = chain.invoke({"question": f"pergunta {i}"})
+        latencias.append(time.perf_counter() - inicio)
+        origens[resposta] = origens.get(resposta, 0) + 1
+    latencias.sort()
+    return {
+        "media_s": round(statistics.mean(latencias), 4),
+        "p50_s": round(statistics.median(latencias), 4),
+        "p95_s": round(latencias[max(0, int(len(latencias) * 0.95) - 1)], 4),
+        "max_s": round(latencias[-1], 4),
+        "respostas": origens,
+        "chamadas_groq": groq.chamadas,
+    }
+
+
+def roteador_aberto(args, groq: StubChatModel, gemini: StubChatModel, cooldown: float = 0.05) -> LLMRouter:
+    """Roteador com o circuito do Groq aberto e o cooldown já vencido (meio-aberto)."""
+    roteador = LLMRouter([Provider("groq", groq, CircuitBreaker(3, cooldown)),
+                          Provider("gemini", gemini, CircuitBreaker(3, cooldown))],
+                         prazo_inicial=args.groq * 4)
+    for _ in range(3):
+        roteador.provedores[0].breaker.falha()
+    time.sleep(cooldown)
+    return roteador
+
+
+def cenario_meio_aberto(args, falhas: list) -> dict:
+    dados = {}
+    for modo in ("threads", "asyncio"):
+        groq = StubChatModel(resposta="groq", latencia=args.timeout, falhar=True)
+        roteador = roteador_aberto(args, groq, StubChatModel(resposta="gemini", latencia=args.gemini))
+        chain = PROMPT | roteador
+        perguntas = [{"question": f"pergunta {i}"} for i in range(args.simultaneas)]
+        if modo == "threads":
+            with ThreadPoolExecutor(args.simultaneas) as executor:
+                respostas = list(executor.map(chain.invoke, perguntas))
+        else:
+            async def rodar():
+                return await asyncio.gather(*(chain.ainvoke(p) for p in perguntas))
+            respostas = asyncio.run(rodar())
+        # Chamadas iniciadas pelo roteador: no asyncio a de teste é cancelada antes de o stub contar
+        chamadas = roteador.provedores[0].chamadas
+        dados[modo] = {"respostas": {r: respostas.count(r) for r in set(respostas)}, "chamadas_groq": chamadas}
+        if chamadas != 1:
+            falhas.append(f"meio-aberto ({modo}): {chamadas} chamadas ao Groq com {args.simultaneas} "
+                          f"perguntas simultâneas (esperava só a de teste)")
+        if respostas.count("gemini") != args.simultaneas:
+            falhas.append(f"meio-aberto ({modo}): respostas {dados[modo]['respostas']}")
+
+    # Teste cancelado: o Groq lento perde o hedge e a vez de testar volta a ficar livre
+    groq = StubChatModel(resposta="groq", latencia=args.timeout)
+    roteador = roteador_aberto(args, groq, StubChatModel(resposta="gemini", latencia=args.gemini))
+    resposta = asyncio.run(roteador.ainvoke("pergunta"))
+    breaker = roteador.provedores[0].breaker
+    dados["teste_cancelado"] = {"resposta": resposta, "circuito_groq": breaker.estado(), "permite": breaker.permite()}
+    if resposta != "gemini" or not breaker.permite():
+        falhas.append(f"meio-aberto: teste cancelado não liberou a próxima chamada ({dados['teste_cancelado']})")
+
+    # Teste com sucesso fecha o circuito
+    groq = StubChatModel(resposta="groq", latencia=args.groq)
+    roteador = roteador_aberto(args, groq, StubChatModel(resposta="gemini", latencia=args.gemini))
+    resposta = roteador.invoke("pergunta")
+    dados["teste_ok"] = {"resposta": resposta, "circuito_groq": roteador.provedores[0].breaker.estado()}
+    if dados["teste_ok"] != {"resposta": "groq", "circuito_groq": "fechado"}:
+        falhas.append(f"meio-aberto: teste com sucesso não fechou o circuito ({dados['teste_ok']})")
+    return dados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--perguntas", type=int, default=60)
+    parser.add_argument("--groq", type=float, default=0.05, help="latência normal do Groq (s)")
+    parser.add_argument("--gemini", type=float, default=0.1, help="latência normal do Gemini (s)")
+    parser.add_argument("--cauda", type=float, default=1.5, help="atraso extra das chamadas lentas do Groq (s)")
+    parser.add_argument("--prob-cauda", type=float, default=0.1)
+    parser.add_argument("--timeout", type=float, default=0.5, help="tempo até o erro no cenário de queda (s)")
+    parser.add_argument("--simultaneas", type=int, default=20, help="perguntas juntas no cenário meio-aberto")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    resultados = {}
+    for cenario in ("normal", "cauda", "queda"):
+        random.seed(args.seed)
+        groq, gemini = modelos(cenario, args)
+        fallback = (PROMPT | groq | StrOutputParser()).with_fallbacks([PROMPT | gemini | StrOutputParser()])
+        resultados.setdefault(cenario, {})["fallback"] = medir(fallback, groq, args.perguntas)
+
+        random.seed(args.seed)
+        groq, gemini = modelos(cenario, args)
+        roteador = LLMRouter(
+            [Provider("groq", groq, CircuitBreaker(3, 30.0)), Provider("gemini", gemini, CircuitBreaker(3, 30.0))],
+            prazo_inicial=args.groq * 4,
+            amostras_minimas=10,
+        )
+        resultados[cenario]["roteador"] = medir(PROMPT | roteador, groq, args.perguntas)
+        resultados[cenario]["roteador"]["hedges"] = roteador.stats()["hedges"]
+
+    falhas = []
+    resultados["meio_aberto"] = cenario_meio_aberto(args, falhas)
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if falhas:
+        raise SystemExit("❌ " + "; ".join(falhas))
+    print("✅ No meio-aberto só uma chamada testa o provedor; as outras vão para o próximo.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Mede o tempo de boot da aplicação em cada modo de CHATBOT_STARTUP.
+
+Para cada modo roda um processo novo (import frio) e reporta:
+
+- import_s: ``from app import create_app`` (o que o gunicorn paga antes do bind);
+- create_app_s: tempo até ``create_app()`` retornar, ou seja, até a porta abrir;
+- pronto_s: tempo total até ``/pergunta/status`` responder 200 (no modo lazy,
+  inclui a inicialização disparada pela primeira pergunta);
+- modulos_pesados: quais de langchain/sklearn/torch já estavam importados
+  quando ``create_app`` retornou.
+
+Uso:
+    python -m benchmarks.bench_startup                # chatbot real
+    python -m benchmarks.bench_startup --stub         # benchmarks.stubs:StubChatbot
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+SCRIPT = r"""
+import json, os, sys, time
+t0 = time.perf_counter()
+from app import create_app
+t_import = time.perf_counter() - t0
+app = create_app()
+t_app = time.perf_counter() - t0
+pesados = sorted(m for m in ("langchain", "langchain_community", "sklearn", "torch") if m in sys.modules)
+if os.environ["CHATBOT_STARTUP"] == "lazy":
+    # No modo lazy quem paga a inicialização é a primeira pergunta
+    from app.controllers.pergunta_controller import obter_chatbot
+    obter_chatbot()
+cliente = app.test_client()
+while True:
+    status = cliente.get("/pergunta/status").get_json()
+    if status["pronto"] or status["erro"]:
+        break
+    time.sleep(0.05)
+t_pronto = time.perf_counter() - t0
+print(json.dumps({"import_s": round(t_import, 3), "create_app_s": round(t_app, 3),
+                  "pronto_s": round(t_pronto, 3), "modulos_pesados": pesados}))
+"""
+
+
+def medir(modo: str, stub: bool) -> dict:
+    env = dict(os.environ, CHATBOT_STARTUP=modo)
+    if stub:
+        env["CHATBOT_CLASS"] = "benchmarks.stubs:StubChatbot"
+    saida = subprocess.run([sys.executable, "-c", SCRIPT], env=env, capture_output=True, text=True, check=True)
+    return {"modo": modo, **json.loads(saida.stdout.strip().splitlines()[-1])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stub", action="store_true", help="usa o chatbot com modelos falsos")
+    args = parser.parse_args()
+
+    resultados = [medir(modo, args.stub) for modo in ("eager", "background", "lazy")]
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
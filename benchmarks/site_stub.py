@@ -0,0 +1,156 @@
+"""Servidor HTTP local que imita o site do Jovem Programador com páginas fixture.
+
+- responde às mesmas rotas do site (sobre.php, patrocinadores.php, n.php?ID=...);
+- envia ETag/Last-Modified e responde 304 a GETs condicionais;
+- aceita latência artificial por requisição e conta as requisições recebidas.
+
+Uso em scripts:
+    with SiteStub(latencia=0.05) as site:
+        os.environ["URL_JOVEM_PROGRAMADOR"] = site.url
+        ...
+"""
+import hashlib
+import threading
+import time
+from collections import Counter
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES = Path(__file__).parent / "fixtures" / "site"
+
+PAGINAS_SIMPLES = {
+    "/sobre.php": "sobre.html",
+    "/duvidas.php": "duvidas.html",
+    "/hackathon/": "hackathon.html",
+    "/lgpd.php": "lgpd.html",
+    "/privacidade.php": "privacidade.html",
+}
+EMPRESAS = {
+    "/patrocinadores.php": "Patrocinadores",
+    "/parceiros.php": "Parceiros",
+    "/apoiadores.php": "Apoiadores",
+}
+
+
+class _Servidor(ThreadingHTTPServer):
+    # O padrão do socketserver é listen(5): com 8+ conexões abrindo juntas o
+    # kernel descarta um SYN e aquela conexão só sai na retransmissão (~1 s)
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def _ler(nome: str) -> str:
+    return (FIXTURES / nome).read_text(encoding="utf-8")
+
+
+class SiteStub:
+    """Site falso servido numa thread; ``noticias`` são os IDs publicados.
+
+    ``listagem`` limita os IDs que aparecem nas páginas de listagem (padrão: todos).
+    ``corpos`` conta, por caminho, as respostas 200 a GET (páginas baixadas inteiras).
+    """
+
+    def __init__(self, latencia: float = 0.0, noticias=range(128, 140), porta: int = 0, listagem=None):
+        self.latencia = latencia
+        self.noticias = set(noticias)
+        self.listagem = None if listagem is None else set(listagem)
+        self.requisicoes = 0
+        self.respostas_304 = 0
+        self.corpos = Counter()
+        self._lock = threading.Lock()
+        self._modificado = formatdate(time.time(), usegmt=True)
+        self._servidor = _Servidor(("127.0.0.1", porta), self._handler())
+        self._thread = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._servidor.server_address[1]}/"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def pagina(self, caminho: str, query: dict):
+        """HTML da rota ou None (404)."""
+        if caminho in PAGINAS_SIMPLES:
+            corpo = _ler(PAGINAS_SIMPLES[caminho])
+        elif caminho in EMPRESAS:
+            corpo = _ler("_empresas.html").replace("{TITULO}", EMPRESAS[caminho])
+        elif caminho in ("/", "/index.php", "/noticias.php"):
+            links = "\n".join(
+                f'    <div class="col-md-4"><a href="n.php?ID={i}">Notícia {i}</a></div>'
+                for i in sorted(self.noticias if self.listagem is None else self.listagem, reverse=True)
+            )
+            corpo = _ler("index.html").replace("{NOTICIAS}", links)
+        elif caminho == "/n.php":
+            try:
+                noticia_id = int(query.get("ID", [""])[0])
+            except ValueError:
+                return None
+            if noticia_id not in self.noticias:
+                return None
+            corpo = _ler("noticia.html").replace("{ID}", str(noticia_id)).replace("{DATA}", f"{noticia_id % 28 + 1:02d}/03/2025")
+        else:
+            return None
+        return _ler("_layout_topo.html") + corpo + _ler("_layout_rodape.html")
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+            # Cabeçalhos e corpo saem em dois send(); com Nagle o segundo espera o
+            # ACK atrasado do cliente (~40 ms) em toda resposta da conexão reaproveitada
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, corpo_ou_nada: bool):
+                with site._lock:
+                    site.requisicoes += 1
+                if site.latencia:
+                    time.sleep(site.latencia)
+
+                partes = urlsplit(self.path)
+                html = site.pagina(partes.path, parse_qs(partes.query))
+                if html is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                dados = html.encode("utf-8")
+                etag = '"' + hashlib.md5(dados).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    with site._lock:
+                        site.respostas_304 += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(dados)))
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", site._modificado)
+                self.end_headers()
+                if corpo_ou_nada:
+                    self.wfile.write(dados)
+                    with site._lock:
+                        site.corpos[self.path.lstrip("/")] += 1
+
+            def do_GET(self):
+                self._responder(True)
+
+            def do_HEAD(self):
+                self._responder(False)
+
+        return Handler
@@ -0,0 +1,218 @@
+"""Modelos falsos para rodar o chatbot sem rede, sem GPU e sem chaves de API.
+
+``StubChatModel`` substitui Groq/Gemini com latência configurável e
+``StubEmbeddings`` substitui o e5-small com vetores determinísticos, de modo
+que os benchmarks medem só o nosso código.
+"""
+import asyncio
+import hashlib
+import random
+import re
+import threading
+import time
+from typing import Any, List, Optional
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from app.chatbot_class import JovemProgramadorChatbot
+from app.services.admission import MemoryBucketBackend
+from app.services.answer_cache import AnswerCache
+from app.services.context_builder import estimate_tokens
+
+
+DOCUMENTOS_FIXTURE = [
+    ("sobre.php", "O Programa Jovem Programador é uma iniciativa do Seac, Sindicato das Empresas de "
+                  "Informática, com o Senac/SC. Ele oferece formação gratuita em programação para jovens "
+                  "de 16 a 39 anos em diversas cidades de Santa Catarina."),
+    ("duvidas.php", "As inscrições para o Programa Jovem Programador abrem normalmente no início do ano, "
+                    "pelo site oficial. Para participar é preciso ter concluído ou estar cursando o ensino médio."),
+    ("patrocinadores.php", "Estas são as empresas Patrocinadores do Projeto Jovem Programador ou 'PJP': "
+                           "Softplan, WEG, Senior Sistemas, Ambev Tech, Involves."),
+    ("lgpd.php", "A LGPD, Lei Geral de Proteção de Dados, orienta como o Programa Jovem Programador "
+                 "coleta e trata os dados pessoais dos alunos inscritos."),
+    ("hackathon/", "O Hackathon do Jovem Programador reúne alunos de todas as unidades para resolver "
+                   "desafios propostos pelas empresas parceiras durante um fim de semana."),
+    ("extras.txt", "Telefones das unidades do Senac/SC: Florianópolis (48) 3229-3200, Blumenau (47) 3035-9999, "
+                   "Criciúma (48) 3437-9801, Joinville (47) 3431-6666."),
+]
+
+
+class StubRateLimitError(Exception):
+    """Como o RateLimitError do Groq: HTTP 429 com Retry-After."""
+
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__("stub: limite de taxa")
+        self.response = type("Resposta", (), {"status_code": 429, "headers": {"retry-after": str(retry_after)}})()
+
+
+class StubRedis:
+    """Redis falso para o RedisBucketBackend: o script do token bucket roda em Python.
+
+    Vários RateLimiter com o mesmo StubRedis fazem o papel de workers
+    compartilhando um Redis; ``fora_do_ar`` faz toda chamada falhar.
+    """
+
+    def __init__(self):
+        self.baldes = MemoryBucketBackend()
+        self.chamadas = 0
+        self.fora_do_ar = False
+
+    def register_script(self, script: str):
+        def rodar(keys, args):
+            self.chamadas += 1
+            if self.fora_do_ar:
+                raise ConnectionError("stub: Redis fora do ar")
+            permitido, fichas, espera = self.baldes.take(keys[0], *map(float, args))
+            return [int(permitido), str(fichas), str(espera)]
+        return rodar
+
+
+class StubChatModel(BaseChatModel):
+    """LLM falso: espera ``latencia`` segundos (+ ``latencia_token_entrada`` por token
+    do prompt, como o prefill de um LLM de verdade, e ``latencia_cauda`` em uma fração
+    ``prob_cauda`` das chamadas) e devolve ``resposta`` em tokens.
+
+    Com ``limite_simultaneas``, chamadas além desse número ao mesmo tempo
+    falham com StubRateLimitError (429, Retry-After de ``retry_after`` s)."""
+
+    resposta: str = "O Programa Jovem Programador oferece formação gratuita em programação."
+    latencia: float = 0.5
+    latencia_token_entrada: float = 0.0
+    prob_cauda: float = 0.0
+    latencia_cauda: float = 0.0
+    intervalo_token: float = 0.0
+    falhar: bool = False
+    limite_simultaneas: int = 0
+    retry_after: float = 0.05
+    chamadas: int = 0
+    limitadas: int = 0
+    tokens_entrada: int = 0
+
+    _simultaneas: int = PrivateAttr(default=0)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _tokens(self) -> List[str]:
+        return re.findall(r"\S+\s*", self.resposta)
+
+    def _espera(self, messages) -> float:
+        tokens = sum(estimate_tokens(str(m.content)) for m in messages)
+        self.tokens_entrada += tokens
+        cauda = self.latencia_cauda if random.random() < self.prob_cauda else 0.0
+        return self.latencia + cauda + self.latencia_token_entrada * tokens
+
+    def _inicio(self):
+        self.chamadas += 1
+        if self.falhar:
+            raise RuntimeError("stub: provedor indisponível")
+
+    def _entrar(self):
+        with self._lock:
+            self._simultaneas += 1
+            if self.limite_simultaneas and self._simultaneas > self.limite_simultaneas:
+                self._simultaneas -= 1
+                self.limitadas += 1
+                raise StubRateLimitError(self.retry_after)
+
+    def _sair(self):
+        with self._lock:
+            self._simultaneas -= 1
+
+    def _generate(self, messages, stop=None, run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self._espera(messages))
+        self._inicio()
+        time.sleep(self.intervalo_token * len(self._tokens()))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.resposta))])
+
+    async def _agenerate(self, messages, stop=None, run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self._espera(messages))
+        self._inicio()
+        await asyncio.sleep(self.intervalo_token * len(self._tokens()))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.resposta))])
+
+    def _stream(self, messages, stop=None, run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any):
+        self._entrar()
+        try:
+            time.sleep(self._espera(messages))
+            self._inicio()
+            for token in self._tokens():
+                yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+                time.sleep(self.intervalo_token)
+        finally:
+            self._sair()
+
+    async def _astream(self, messages, stop=None, run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any):
+        self._entrar()
+        try:
+            await asyncio.sleep(self._espera(messages))
+            self._inicio()
+            for token in self._tokens():
+                yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+                await asyncio.sleep(self.intervalo_token)
+        finally:
+            self._sair()
+
+
+class StubEmbeddings(Embeddings):
+    """Embeddings determinísticos (hash de palavras), normalizados como os do e5-small."""
+
+    def __init__(self, dim: int = 384, latencia: float = 0.0):
+        self.dim = dim
+        self.latencia = latencia
+
+    def _vetor(self, texto: str) -> List[float]:
+        vetor = np.zeros(self.dim, dtype=np.float32)
+        for palavra in re.findall(r"\w+", texto.lower()):
+            h = int(hashlib.md5(palavra.encode("utf-8")).hexdigest(), 16)
+            vetor[h % self.dim] += 1.0 if (h >> 20) % 2 else -1.0
+        norma = np.linalg.norm(vetor)
+        return (vetor / norma if norma else vetor).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.latencia)
+        return [self._vetor(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self.latencia)
+        return self._vetor(text)
+
+
+class StubChatbot(JovemProgramadorChatbot):
+    """Chatbot real com LLMs, embeddings e índice falsos (documentos de DOCUMENTOS_FIXTURE)."""
+
+    def __init__(self, groq: StubChatModel = None, gemini: StubChatModel = None, embeddings: Embeddings = None,
+                 limiar: float = None):
+        self._stub_groq = groq or StubChatModel()
+        self._stub_gemini = gemini or StubChatModel(resposta="Resposta do Gemini.")
+        self._stub_embeddings = embeddings or StubEmbeddings()
+        super().__init__()
+        # Vetores de hash não têm a escala de cosseno do e5-small: sem limiar nem margem por padrão
+        self.retriever.score_threshold = limiar
+        self.retriever.score_margin = None
+
+    def _initialize_models(self):
+        self.groq_model = self._stub_groq
+        self.gemini_model = self._stub_gemini
+        self.embeddings = self._stub_embeddings
+
+    def _load_or_create_vectorstore(self):
+        from langchain_community.vectorstores import FAISS
+        from langchain_core.documents import Document
+
+        documentos = [Document(page_content=texto, metadata={"source": fonte}) for fonte, texto in DOCUMENTOS_FIXTURE]
+        return FAISS.from_documents(self._split_documents(documentos), self.embeddings)
+
+    def _setup_answer_cache(self):
+        # Sem persistência: benchmarks não devem ler nem gravar data/cache
+        return AnswerCache(embeddings=self.embeddings)
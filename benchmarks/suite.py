@@ -0,0 +1,353 @@
+"""Suíte de benchmarks do pipeline RAG inteiro, offline e reproduzível.
+
+Nada sai da máquina: o site é o SiteStub (páginas fixture em
+benchmarks/fixtures/site, com latência configurável), Groq/Gemini são o
+StubChatModel e os embeddings são o StubEmbeddings. Índice, fronteira de
+notícias e manifesto ficam num diretório temporário (data/ do repositório
+não é tocado). Cenários:
+
+- extracao: extratores de func_scraping (genérico, notícia, imagens) sobre o
+  HTML fixture, sem rede;
+- indice_frio: chatbot criado sem índice (descoberta, raspagem, dedup,
+  embeddings, FAISS, gravação), com o tempo de cada etapa;
+- inicio_quente: chatbot criado de novo sobre o mesmo diretório (GET
+  condicional nas páginas, índice lido do disco);
+- consulta: perguntas uma a uma, com a latência de cada etapa (embedding,
+  FAISS, MMR, BM25, contexto, LLM) tirada dos histogramas de app.services.metrics;
+- concorrencia: perguntas simultâneas em POST /pergunta/ pelo ASGI (achat) e
+  pelo Flask com threads (workers síncronos).
+
+O resultado é um JSON (--saida grava em arquivo). Com --comparar, cada
+número em segundos/ms/rps é comparado ao de uma execução anterior e a suíte
+sai com erro se algum piorar mais que --tolerancia.
+
+Uso:
+    python -m benchmarks.suite --saida resultados.json
+    python -m benchmarks.suite --comparar resultados.json --tolerancia 0.2
+    python -m benchmarks.suite --cenarios consulta concorrencia
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from app.chatbot_class import JovemProgramadorChatbot
+from app.controllers.func_scraping import func_scraping_fontes
+from app.services import metrics
+from benchmarks.site_stub import SiteStub
+from benchmarks.stubs import StubChatbot, StubChatModel, StubEmbeddings
+
+RAIZ = Path(__file__).resolve().parent.parent
+PERGUNTAS = Path(__file__).parent / "perguntas.json"
+CENARIOS = ["extracao", "indice_frio", "inicio_quente", "consulta", "concorrencia"]
+
+
+class ChatbotOffline(StubChatbot):
+    """StubChatbot com o pipeline de indexação de verdade (raspa o SiteStub)."""
+
+    _load_or_create_vectorstore = JovemProgramadorChatbot._load_or_create_vectorstore
+
+
+def percentil(valores: list, p: float) -> float:
+    valores = sorted(valores)
+    return valores[max(0, min(len(valores) - 1, int(round(p * len(valores))) - 1))]
+
+
+def resumo_latencias(latencias: list, duracao: float = None) -> dict:
+    dados = {
+        "p50_ms": round(statistics.median(latencias) * 1000, 2),
+        "p95_ms": round(percentil(latencias, 0.95) * 1000, 2),
+    }
+    if duracao is not None:
+        dados["vazao_rps"] = round(len(latencias) / duracao, 1)
+    return dados
+
+
+@contextlib.contextmanager
+def medir_histograma(histograma: metrics.Histogram, resultado: dict, escala: float = 1.0, por: str = "soma"):
+    """Preenche ``resultado`` com a variação do histograma durante o bloco (soma ou média por série)."""
+    antes = histograma.totals()
+    yield
+    for chave, (contagem, soma) in histograma.totals().items():
+        contagem_antes, soma_antes = antes.get(chave, (0, 0.0))
+        if contagem == contagem_antes:
+            continue
+        valor = soma - soma_antes
+        if por == "media":
+            valor /= contagem - contagem_antes
+        resultado["_".join(chave)] = round(valor * escala, 4)
+
+
+def criar_chatbot(args) -> ChatbotOffline:
+    return ChatbotOffline(
+        groq=StubChatModel(latencia=args.latencia, intervalo_token=args.intervalo_token),
+        gemini=StubChatModel(latencia=args.latencia * 2, resposta="Resposta do Gemini."),
+        embeddings=StubEmbeddings(latencia=args.latencia_embedding),
+    )
+
+
+# ---------------------------------------------------------------------- cenários
+
+def cenario_extracao(site: SiteStub, args) -> dict:
+    from app.controllers.func_scraping.func_scraping_main import PAGINAS_IMAGENS, extrair_conteudo
+
+    paginas = {}
+    for path in func_scraping_fontes.listar_paginas():
+        partes = urlsplit("/" + path)
+        html = site.pagina(partes.path, parse_qs(partes.query))
+        if html is not None:
+            paginas[path] = html
+
+    def extrator(path):
+        if path in PAGINAS_IMAGENS:
+            return "imagens"
+        return "noticia" if path.startswith("n.php?ID=") else "generico"
+
+    tempos = {}
+    inicio_total = time.perf_counter()
+    for _ in range(args.repeticoes):
+        for path, html in paginas.items():
+            inicio = time.perf_counter()
+            extrair_conteudo(path, html)
+            tempos.setdefault(extrator(path), []).append(time.perf_counter() - inicio)
+    total = time.perf_counter() - inicio_total
+    return {
+        "paginas": len(paginas),
+        "por_pagina_ms": {nome: round(statistics.mean(t) * 1000, 3) for nome, t in sorted(tempos.items())},
+        "todas_paginas_ms": round(total / args.repeticoes * 1000, 2),
+    }
+
+
+def cenario_inicializacao(site: SiteStub, args) -> tuple:
+    etapas = {}
+    requisicoes, respostas_304 = site.requisicoes, site.respostas_304
+    inicio = time.perf_counter()
+    with medir_histograma(metrics.INDEXACAO, etapas):
+        bot = criar_chatbot(args)
+    return bot, {
+        "total_s": round(time.perf_counter() - inicio, 3),
+        "etapas_s": etapas,
+        "chunks": bot.vectorstore.index.ntotal,
+        "requisicoes_http": site.requisicoes - requisicoes,
+        "respostas_304": site.respostas_304 - respostas_304,
+    }
+
+
+def cenario_consulta(bot, perguntas: list, args) -> dict:
+    etapas, primeiro_token, llm = {}, {}, {}
+    latencias = []
+    with medir_histograma(metrics.ETAPA, etapas, 1000, "media"), \
+            medir_histograma(metrics.LLM_PRIMEIRO_TOKEN, primeiro_token, 1000, "media"), \
+            medir_histograma(metrics.LLM_DURACAO, llm, 1000, "media"):
+        for rodada in range(args.repeticoes):
+            for pergunta in perguntas:
+                # Perguntas únicas: sem cache de respostas nem coalescência
+                inicio = time.perf_counter()
+                bot.chat(f"{pergunta} ({rodada})")
+                latencias.append(time.perf_counter() - inicio)
+    etapas.update({f"llm_primeiro_token_{p}": v for p, v in primeiro_token.items()})
+    etapas.update({f"llm_{p}": v for p, v in llm.items()})
+    return {"perguntas": len(latencias), **resumo_latencias(latencias), "etapas_ms": etapas}
+
+
+def cenario_concorrencia(bot, perguntas: list, args) -> dict:
+    import httpx
+
+    from app import create_app
+    from app.asgi import create_asgi_app
+    from app.controllers import pergunta_controller
+
+    pergunta_controller.chatbot = bot  # já pronto: create_app não dispara a inicialização real
+    flask_app = create_app()
+    lote = [f"{perguntas[i % len(perguntas)]} [{i}]" for i in range(args.clientes)]
+
+    async def rodar_async():
+        transporte = httpx.ASGITransport(app=create_asgi_app(flask_app))
+        async with httpx.AsyncClient(transport=transporte, base_url="http://suite", timeout=120) as cliente:
+            async def uma(pergunta):
+                inicio = time.perf_counter()
+                resposta = await cliente.post("/pergunta/", json={"pergunta": f"async {pergunta}"})
+                assert resposta.status_code == 200, resposta.text
+                return time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            latencias = await asyncio.gather(*(uma(p) for p in lote))
+            return list(latencias), time.perf_counter() - inicio
+
+    def rodar_sync():
+        from concurrent.futures import ThreadPoolExecutor
+
+        local = threading.local()
+
+        def uma(pergunta, enviada):
+            if not hasattr(local, "cliente"):
+                local.cliente = flask_app.test_client()
+            resposta = local.cliente.post("/pergunta/", json={"pergunta": f"sync {pergunta}"})
+            resposta.close()
+            assert resposta.status_code == 200, resposta.get_data(as_text=True)
+            return time.perf_counter() - enviada
+
+        # Latência desde o envio, como no async: inclui a espera por um worker livre
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            futuros = [executor.submit(uma, pergunta, time.perf_counter()) for pergunta in lote]
+            latencias = [futuro.result() for futuro in futuros]
+        return latencias, time.perf_counter() - inicio
+
+    limitador = pergunta_controller.limitador
+    pergunta_controller.limitador = None  # todas as perguntas vêm do mesmo cliente
+    try:
+        latencias_async, duracao_async = asyncio.run(rodar_async())
+        latencias_sync, duracao_sync = rodar_sync()
+    finally:
+        pergunta_controller.limitador = limitador
+    return {
+        "clientes": args.clientes,
+        "async": resumo_latencias(latencias_async, duracao_async),
+        f"sync_{args.workers}_workers": resumo_latencias(latencias_sync, duracao_sync),
+    }
+
+
+# ---------------------------------------------------------------------- comparação
+
+UNIDADES = {"_s": 1000.0, "_ms": 1.0, "_rps": None}  # fator para ms; rps: quanto maior, melhor
+
+
+def achatar(dados: dict, prefixo: str = "", unidade: str = None) -> dict:
+    """{caminho.da.chave: (valor, unidade)}; a unidade vem do sufixo da chave ou de quem a contém."""
+    numeros = {}
+    for chave, valor in dados.items():
+        nome = f"{prefixo}.{chave}" if prefixo else chave
+        propria = next((u for u in UNIDADES if str(chave).endswith(u)), unidade)
+        if isinstance(valor, dict):
+            numeros.update(achatar(valor, nome, propria))
+        elif isinstance(valor, (int, float)) and not isinstance(valor, bool) and propria:
+            numeros[nome] = (valor, propria)
+    return numeros
+
+
+def comparar(atual: dict, base: dict, tolerancia: float, minimo_ms: float) -> list:
+    """Números que pioraram mais que ``tolerancia`` (e mais que ``minimo_ms``, para ignorar ruído)."""
+    anteriores = achatar(base["cenarios"])
+    regressoes = []
+    for nome, (valor, unidade) in sorted(achatar(atual["cenarios"]).items()):
+        anterior = anteriores.get(nome, (0, None))[0]
+        if not anterior:
+            continue
+        if unidade == "_rps":
+            piora = anterior / valor - 1 if valor else float("inf")
+        else:
+            piora = valor / anterior - 1
+            if (valor - anterior) * UNIDADES[unidade] <= minimo_ms:
+                continue
+        if piora > tolerancia:
+            regressoes.append(f"{nome}: {anterior} -> {valor} (+{piora:.0%})")
+    return regressoes
+
+
+def versao_git() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@contextlib.contextmanager
+def diretorio_temporario():
+    """Roda dentro de um diretório descartável com data/extras.txt, como a raiz do projeto."""
+    anterior = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="suite-rag-") as pasta:
+        (Path(pasta) / "data").mkdir()
+        extras = RAIZ / "data" / "extras.txt"
+        if extras.exists():
+            shutil.copy(extras, Path(pasta) / "data" / "extras.txt")
+        os.chdir(pasta)
+        try:
+            yield Path(pasta)
+        finally:
+            os.chdir(anterior)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cenarios", nargs="+", choices=CENARIOS, default=CENARIOS)
+    parser.add_argument("--latencia", type=float, default=0.05, help="latência do LLM falso (s); Gemini = 2x")
+    parser.add_argument("--intervalo-token", type=float, default=0.0, help="intervalo entre tokens do LLM falso (s)")
+    parser.add_argument("--latencia-embedding", type=float, default=0.0, help="latência por chamada de embeddings (s)")
+    parser.add_argument("--latencia-site", type=float, default=0.01, help="latência do site falso por requisição (s)")
+    parser.add_argument("--noticias-novas", type=int, default=5, help="notícias publicadas além das conhecidas")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--clientes", type=int, default=100, help="perguntas simultâneas no cenário de concorrência")
+    parser.add_argument("--workers", type=int, default=4, help="threads do Flask no cenário de concorrência")
+    parser.add_argument("--saida", type=Path, help="grava o JSON do resultado neste arquivo")
+    parser.add_argument("--comparar", type=Path, help="JSON de uma execução anterior")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="piora relativa aceita na comparação")
+    parser.add_argument("--minimo-ms", type=float, default=1.0, help="diferenças menores que isso não contam")
+    args = parser.parse_args()
+
+    metrics.set_enabled(True)
+    os.environ["ANSWER_CACHE_PERSIST"] = "0"
+    perguntas = json.loads(PERGUNTAS.read_text(encoding="utf-8"))
+    conhecidas = set(func_scraping_fontes.NOTICIAS)
+    publicadas = conhecidas | set(range(max(conhecidas) + 1, max(conhecidas) + 1 + args.noticias_novas))
+    saida = args.saida.resolve() if args.saida else None
+    base = json.loads(args.comparar.read_text(encoding="utf-8")) if args.comparar else None
+
+    cenarios = {}
+    with SiteStub(latencia=args.latencia_site, noticias=publicadas) as site, diretorio_temporario():
+        os.environ["URL_JOVEM_PROGRAMADOR"] = site.url
+        if "extracao" in args.cenarios:
+            cenarios["extracao"] = cenario_extracao(site, args)
+
+        bot = None
+        if {"indice_frio", "inicio_quente", "consulta", "concorrencia"} & set(args.cenarios):
+            bot, frio = cenario_inicializacao(site, args)
+            if "indice_frio" in args.cenarios:
+                cenarios["indice_frio"] = frio
+        if "inicio_quente" in args.cenarios:
+            bot, cenarios["inicio_quente"] = cenario_inicializacao(site, args)
+        if "consulta" in args.cenarios:
+            cenarios["consulta"] = cenario_consulta(bot, perguntas, args)
+        if "concorrencia" in args.cenarios:
+            cenarios["concorrencia"] = cenario_concorrencia(bot, perguntas, args)
+
+    resultado = {
+        "meta": {
+            "commit": versao_git(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "data": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "parametros": {k: v for k, v in vars(args).items() if k not in ("saida", "comparar")},
+        },
+        "cenarios": cenarios,
+    }
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False, default=str)
+    print(texto)
+    if saida:
+        saida.write_text(texto + "\n", encoding="utf-8")
+
+    if base is not None:
+        ignorar = {"cenarios", "tolerancia", "minimo_ms"}
+        diferentes = sorted(k for k, v in resultado["meta"]["parametros"].items()
+                            if k not in ignorar and base.get("meta", {}).get("parametros", {}).get(k) != v)
+        if diferentes:
+            print(f"⚠️ Parâmetros diferentes da execução anterior: {', '.join(diferentes)}")
+        regressoes = comparar(resultado, base, args.tolerancia, args.minimo_ms)
+        if regressoes:
+            raise SystemExit("❌ Regressões em relação a " + str(args.comparar) + ":\n  " + "\n  ".join(regressoes))
+        print(f"✅ Nenhuma piora acima de {args.tolerancia:.0%} em relação a {args.comparar}.")
+
+
+if __name__ == "__main__":
+    main()
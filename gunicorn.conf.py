@@ -0,0 +1,41 @@
+import gc
+import os
+
+# Configuração do gunicorn usada pelo Procfile.
+#
+# SERVING_MODE=async (padrão): workers uvicorn servindo asgi:app; cada processo
+# atende muitas perguntas ao mesmo tempo enquanto espera o LLM.
+# SERVING_MODE=sync: comportamento antigo, workers síncronos servindo app:app.
+#
+# GUNICORN_PRELOAD=1: o master carrega o app e o chatbot (modelo de embeddings
+# + índice) antes do fork, e os workers compartilham essa memória por
+# copy-on-write. O índice FAISS e o docstore já são mapeados em memória
+# (FAISS_MMAP=1), então essas páginas são compartilhadas em qualquer modo.
+
+serving_mode = os.getenv("SERVING_MODE", "async")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "1" if serving_mode == "async" else "2"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+keepalive = 5
+
+if serving_mode == "async":
+    wsgi_app = "asgi:app"
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    wsgi_app = "app:app"
+    worker_class = "sync"
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "0") == "1"
+if preload_app:
+    # Threads não sobrevivem ao fork: o chatbot precisa estar pronto no master.
+    # Evite construir o índice no master (rode a indexação antes do deploy);
+    # o pool OpenMP do torch usado antes do fork pode travar nos workers.
+    os.environ.setdefault("CHATBOT_STARTUP", "eager")
+
+
+def pre_fork(server, worker):
+    # Objetos que já existem no master saem do GC; sem isso a coleta nos
+    # workers toca os cabeçalhos dos objetos e duplica as páginas.
+    if preload_app:
+        gc.freeze()
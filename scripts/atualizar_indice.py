@@ -0,0 +1,63 @@
+"""Atualiza o índice fora do servidor (cron, deploy) sem derrubar quem está atendendo.
+
+Faz a mesma sincronização da inicialização do chatbot (descoberta de
+notícias, GET condicional, reindexação incremental ou completa) e, se algo
+mudou, grava uma versão nova em data/faiss_versions e publica o ponteiro
+CURRENT. Os workers em execução percebem a troca em até
+INDEX_WATCH_INTERVAL_S segundos e trocam o índice sem reiniciar. No fim
+apaga as versões aposentadas há mais de --carencia segundos.
+
+Só carrega o modelo de embeddings (não precisa das chaves dos LLMs).
+
+Uso:
+    python -m scripts.atualizar_indice
+    # crontab: a cada 6 horas
+    0 */6 * * * cd /app && python -m scripts.atualizar_indice >> data/atualizacao.log 2>&1
+"""
+import argparse
+import json
+import os
+import time
+
+from app.chatbot_class import JovemProgramadorChatbot
+from app.services.embedding_service import create_base_embeddings
+from app.services.index_versions import IndexVersions
+
+
+class AtualizadorIndice(JovemProgramadorChatbot):
+    """Só a parte de indexação do chatbot: sem LLMs, chain nem cache de respostas."""
+
+    def __init__(self):
+        self.answer_cache = None
+        self.index_versions = IndexVersions()
+        self.embeddings = create_base_embeddings()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--carencia", type=float, default=float(os.getenv("INDEX_GC_GRACE_S", "600")),
+                        help="segundos antes de apagar uma versão aposentada")
+    parser.add_argument("--esperar", action="store_true",
+                        help="espera outra atualização em andamento terminar em vez de sair")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    atualizador = AtualizadorIndice()
+    with atualizador.index_versions.lock(esperar=args.esperar) as obtido:
+        if not obtido:
+            print("⏭️ Atualização do índice já em andamento em outro processo.")
+            return
+        index_path, config_indice, alterado = atualizador._update_index()
+        removidas = atualizador.index_versions.collect_garbage(args.carencia)
+
+    print(json.dumps({
+        "versao": str(index_path),
+        "alterado": alterado,
+        "indice": config_indice,
+        "versoes_apagadas": [p.name for p in removidas],
+        "tempo_s": round(time.perf_counter() - inicio, 2),
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Constrói cada tipo de índice FAISS com os mesmos chunks e compara recall x latência x memória.
+
+Os vetores dos chunks vêm do índice publicado (index.faiss da versão atual,
+reconstruídos) ou de um chunk_vectors.npz; as consultas são as perguntas
+de benchmarks/perguntas.json, vetorizadas com o modelo de EMBEDDING_BACKEND.
+A referência é a busca exata: recall@k é a fração dos k vizinhos devolvidos
+que estão entre os k mais próximos de verdade (empates de distância, comuns
+com chunks repetidos, contam como acerto).
+
+Para simular um corpus maior, --extra acrescenta vetores sintéticos
+(variações dos chunks reais). Os parâmetros de cada tipo vêm das mesmas
+variáveis FAISS_* usadas pelo chatbot.
+
+Uso:
+    python -m scripts.avaliar_indices --k 3 20 --extra 50000
+    FAISS_HNSW_EF_SEARCH=128 python -m scripts.avaliar_indices --tipos hnsw
+"""
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+from app.services.dedup import normalize_rows
+from app.services.embedding_service import create_base_embeddings
+from app.services.index_versions import IndexVersions
+from app.services.vector_index import INDEX_TYPES, build_faiss_index, index_config, read_faiss_index
+
+PERGUNTAS = Path(__file__).resolve().parent.parent / "benchmarks" / "perguntas.json"
+
+
+def carregar_vetores(caminho: Path) -> np.ndarray:
+    if caminho.suffix == ".npz":
+        return np.load(caminho, allow_pickle=False)["vetores"]
+    index = read_faiss_index(caminho, use_mmap=False)
+    if not isinstance(index, faiss.IndexFlat):
+        raise SystemExit(f"{caminho} não é flat (vetores aproximados); use o chunk_vectors.npz da mesma pasta")
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def sinteticos(vetores: np.ndarray, n: int, seed: int = 0) -> np.ndarray:
+    """Vetores novos perto dos reais (mistura de dois chunks + ruído), para crescer o corpus."""
+    rng = np.random.default_rng(seed)
+    a = vetores[rng.integers(0, len(vetores), n)]
+    b = vetores[rng.integers(0, len(vetores), n)]
+    peso = rng.uniform(0, 1, (n, 1)).astype(np.float32)
+    ruido = rng.normal(scale=0.05, size=a.shape).astype(np.float32)
+    return normalize_rows(peso * a + (1 - peso) * b + ruido)
+
+
+def avaliar(tipo: str, vetores: np.ndarray, consultas: np.ndarray, limites: dict, ks: list) -> dict:
+    inicio = time.perf_counter()
+    index, config = build_faiss_index(vetores, index_config(tipo))
+    index.add(vetores)
+    t_build = time.perf_counter() - inicio
+
+    latencias, vizinhos = [], []
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        _, ids = index.search(consulta[None, :], max(ks))
+        latencias.append(time.perf_counter() - inicio)
+        vizinhos.append(ids[0])
+    latencias.sort()
+
+    resultado = {
+        "config": config,
+        "build_s": round(t_build, 3),
+        "memoria_mb": round(len(faiss.serialize_index(index)) / 2 ** 20, 2),
+        "latencia_p50_ms": round(statistics.median(latencias) * 1000, 3),
+        "latencia_p95_ms": round(latencias[max(0, int(len(latencias) * 0.95) - 1)] * 1000, 3),
+    }
+    for k in ks:
+        acertos = []
+        for consulta, ids, limite in zip(consultas, vizinhos, limites[k]):
+            ids = ids[:k][ids[:k] >= 0]
+            distancias = ((vetores[ids] - consulta) ** 2).sum(axis=1)
+            acertos.append(min(k, int((distancias <= limite + 1e-5).sum())) / k)
+        resultado[f"recall@{k}"] = round(float(np.mean(acertos)), 4)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vetores", type=Path, default=None,
+                        help="índice flat ou chunk_vectors.npz (padrão: index.faiss da versão publicada)")
+    parser.add_argument("--tipos", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    parser.add_argument("--k", type=int, nargs="+", default=[3, 20], help="valores de k do recall (k e fetch_k)")
+    parser.add_argument("--extra", type=int, default=0, help="vetores sintéticos acrescentados ao corpus")
+    parser.add_argument("--saida", type=Path, help="grava o relatório JSON neste arquivo")
+    args = parser.parse_args()
+    args.vetores = args.vetores or IndexVersions().current() / "index.faiss"
+
+    vetores = normalize_rows(carregar_vetores(args.vetores))
+    reais = len(vetores)
+    if args.extra:
+        vetores = np.vstack([vetores, sinteticos(vetores, args.extra)])
+
+    perguntas = json.loads(PERGUNTAS.read_text(encoding="utf-8"))
+    consultas = normalize_rows(create_base_embeddings().embed_documents(perguntas))
+
+    # Distância do k-ésimo vizinho exato de cada pergunta
+    exato = faiss.IndexFlatL2(vetores.shape[1])
+    exato.add(vetores)
+    distancias, _ = exato.search(consultas, max(args.k))
+    limites = {k: distancias[:, k - 1] for k in args.k}
+
+    relatorio = {
+        "chunks_reais": reais,
+        "chunks_total": len(vetores),
+        "perguntas": len(perguntas),
+        "indices": {tipo: avaliar(tipo, vetores, consultas, limites, args.k) for tipo in args.tipos},
+    }
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        args.saida.write_text(texto, encoding="utf-8")
+    print(texto)
+
+
+if __name__ == "__main__":
+    main()
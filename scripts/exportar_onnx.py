@@ -0,0 +1,93 @@
+"""Exporta o e5-small para ONNX (fp32 e int8) para EMBEDDING_BACKEND=onnx/onnx-int8.
+
+Precisa de torch, transformers e onnx só aqui, na exportação; em produção o backend
+ONNX usa apenas onnxruntime e tokenizers. Gera em --saida (padrão
+data/onnx/e5-small, ou EMBEDDING_ONNX_DIR):
+
+- model.onnx: grafo fp32 (saída last_hidden_state);
+- model_int8.onnx: pesos quantizados em int8 (quantização dinâmica);
+- tokenizer.json: tokenizer rápido do modelo.
+
+No fim compara os vetores dos dois modelos com os do HuggingFaceEmbeddings.
+
+Uso:
+    python -m scripts.exportar_onnx
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from app.services.onnx_embeddings import MODELO_FP32, MODELO_INT8, TOKENIZER, OnnxEmbeddings, onnx_dir
+
+MODELO = "intfloat/e5-small"
+
+TEXTOS_TESTE = [
+    "O que é o Jovem Programador?",
+    "Qual o telefone da unidade de Joinville?",
+    "O programa é gratuito e oferece certificado ao final do curso. " * 20,
+]
+
+
+def exportar(saida: Path, opset: int):
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    saida.mkdir(parents=True, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(MODELO)
+    modelo = AutoModel.from_pretrained(MODELO).eval()
+    tokenizer.backend_tokenizer.save(str(saida / TOKENIZER))
+
+    exemplo = tokenizer(["exemplo de entrada"], return_tensors="pt")
+    nomes = ["input_ids", "attention_mask", "token_type_ids"]
+    eixos = {nome: {0: "lote", 1: "tokens"} for nome in nomes}
+    eixos["last_hidden_state"] = {0: "lote", 1: "tokens"}
+    with torch.no_grad():
+        torch.onnx.export(
+            modelo,
+            tuple(exemplo[nome] for nome in nomes),
+            str(saida / MODELO_FP32),
+            input_names=nomes,
+            output_names=["last_hidden_state"],
+            dynamic_axes=eixos,
+            opset_version=opset,
+            dynamo=False,
+        )
+    print(f"✅ {saida / MODELO_FP32}")
+
+
+def quantizar(saida: Path):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(str(saida / MODELO_FP32), str(saida / MODELO_INT8), weight_type=QuantType.QInt8)
+    print(f"✅ {saida / MODELO_INT8}")
+
+
+def comparar(saida: Path):
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    referencia = np.array(HuggingFaceEmbeddings(
+        model_name=MODELO, model_kwargs={"device": "cpu"}, encode_kwargs={"normalize_embeddings": True}
+    ).embed_documents(TEXTOS_TESTE))
+
+    for quantizado in (False, True):
+        vetores = np.array(OnnxEmbeddings(saida, quantizado=quantizado).embed_documents(TEXTOS_TESTE))
+        cossenos = (vetores * referencia).sum(axis=1)
+        print(f"🔎 {'int8' if quantizado else 'fp32'}: cosseno mínimo com o PyTorch = {cossenos.min():.5f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--saida", type=Path, default=onnx_dir())
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--sem-comparar", action="store_true", help="não compara com o PyTorch no fim")
+    args = parser.parse_args()
+
+    exportar(args.saida, args.opset)
+    quantizar(args.saida)
+    if not args.sem_comparar:
+        comparar(args.saida)
+
+
+if __name__ == "__main__":
+    main()